@@ -0,0 +1,123 @@
+'''
+The flat Arena against the object tree on large checked programs:
+memory held by each (names and literal values are shared by both and
+not counted), time to convert between them, time to visit every node
+(a walk over the object tree, a linear scan of the arena's columns and
+a walk over its children), and time to check the program through the
+object tree and through arena views. Conversions are checked to be
+lossless first.
+
+usage: python benchmarks/arena.py [decls ...]
+'''
+import gc
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.programs     import program
+from core.parser.arena       import Arena, CLASSES, KINDS
+from core.parser.incremental import image
+from core.parser.model       import Node, values
+from core.parser.parser      import parse
+from core.semantic.checker   import Check
+from core.session            import CompilerSession
+
+REPEAT = 3
+
+def best(run):
+  result = float('inf')
+
+  for _ in range(REPEAT):
+    gc.collect()
+    start = time.perf_counter()
+    run()
+    result = min(result, time.perf_counter() - start)
+
+  return result
+
+def retained(build):
+  gc.collect()
+  tracemalloc.start()
+  kept = build()
+  gc.collect()
+  size, _ = tracemalloc.get_traced_memory()
+  tracemalloc.stop()
+
+  return size
+
+def walk_tree(ast):
+  counts = [0] * len(CLASSES)
+  stack = [ast]
+
+  while stack:
+    node = stack.pop()
+
+    if isinstance(node, Node):
+      counts[KINDS[type(node)]] += 1
+      stack.extend(values(node))
+    elif isinstance(node, (list, tuple)):
+      stack.extend(node)
+
+  return counts
+
+def scan_arena(arena):
+  counts = [0] * len(CLASSES)
+
+  for kind in arena.kinds:
+    counts[kind] += 1
+
+  return counts
+
+def walk_arena(arena):
+  counts = [0] * len(CLASSES)
+  kinds = arena.kinds
+  stack = [0]
+
+  while stack:
+    index = stack.pop()
+    counts[kinds[index]] += 1
+    stack.extend(arena.children(index))
+
+  return counts
+
+def check(root):
+  with CompilerSession('<bench>', file = io.StringIO()):
+    Check.checker(root)
+
+def main():
+  sizes = [int(n) for n in sys.argv[1:]] or [2000, 10000]
+
+  print(f"{'decls':>6} {'nodes':>8} {'memory (MB)':>12} {'from/to (ms)':>13} {'walk/scan/walk (ms)':>20} "
+        f"{'check (ms)':>12}")
+
+  for decls in sizes:
+    with CompilerSession('<bench>', file = io.StringIO()) as session:
+      ast = parse(program(decls))
+      Check.checker(ast)
+
+    if session.errors:
+      raise AssertionError("the generated program does not check")
+
+    arena = Arena.from_tree(ast)
+
+    if image(arena.to_tree()) != image(ast) or not walk_tree(ast) == scan_arena(arena) == walk_arena(arena):
+      raise AssertionError("the arena differs from the object tree")
+
+    tree_size = retained(arena.to_tree)
+    arena_size = retained(lambda: Arena.from_tree(ast))
+
+    build, rebuild = best(lambda: Arena.from_tree(ast)), best(arena.to_tree)
+    walked, scanned, arena_walked = best(lambda: walk_tree(ast)), best(lambda: scan_arena(arena)), best(lambda: walk_arena(arena))
+    tree_check, view_check = best(lambda: check(ast)), best(lambda: check(arena.view()))
+
+    print(f"{decls:>6} {len(arena):>8} {f'{tree_size / 2**20:.1f} / {arena_size / 2**20:.1f}':>12} "
+          f"{f'{build * 1000:.0f} / {rebuild * 1000:.0f}':>13} "
+          f"{f'{walked * 1000:.0f} / {scanned * 1000:.0f} / {arena_walked * 1000:.0f}':>20} "
+          f"{f'{tree_check * 1000:.0f} / {view_check * 1000:.0f}':>12}")
+
+if __name__ == '__main__':
+  main()
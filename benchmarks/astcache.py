@@ -0,0 +1,87 @@
+'''
+Loading a checked AST from the binary cache versus producing it from
+source: lexing and parsing with the SLY parser or the hand-written one,
+then checking, against store() and load() of core.parser.cache on large
+generated files. The loaded tree is checked to be the stored one, line
+numbers and checker types included.
+
+usage: python benchmarks/astcache.py [decls ...]
+'''
+import gc
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.programs   import program
+from core.parser.cache     import load, path, store
+from core.parser.model     import Node, values
+from core.parser.parser    import parse
+from core.semantic.checker import Check
+from core.session          import CompilerSession
+
+REPEAT = 3
+
+def image(node):
+  '''
+  A comparable image of a tree with line numbers and checker types.
+  '''
+  if isinstance(node, (list, tuple)):
+    return [image(item) for item in node]
+
+  if isinstance(node, Node):
+    return (type(node).__name__, node.lineno, getattr(node, 'type', None), image(values(node)))
+
+  return node
+
+def best(run, **options):
+  result = float('inf')
+
+  for _ in range(REPEAT):
+    with CompilerSession('<bench>', file = io.StringIO(), **options) as session:
+      gc.collect()
+      start = time.perf_counter()
+      value = run()
+      result = min(result, time.perf_counter() - start)
+
+    if session.errors:
+      raise AssertionError("the generated program does not check")
+
+  return result, value
+
+def checked(source):
+  ast = parse(source)
+  Check.checker(ast)
+  return ast
+
+def main():
+  sizes = [int(n) for n in sys.argv[1:]] or [2000, 10000]
+
+  print(f"{'decls':>6} {'source (KB)':>12} {'cache (KB)':>11} {'parse+check (ms)':>17} {'descent (ms)':>13} "
+        f"{'store (ms)':>11} {'load (ms)':>10} {'speedup':>8}")
+
+  with tempfile.TemporaryDirectory() as directory:
+    for decls in sizes:
+      filename = os.path.join(directory, f"program{decls}.bminor")
+      source = program(decls)
+
+      with open(filename, 'w') as file:
+        file.write(source)
+
+      sly, ast = best(lambda: checked(source))
+      descent, _ = best(lambda: checked(source), descent = True)
+      stored, _ = best(lambda: store(filename, source, ast))
+      loaded, cached = best(lambda: load(filename, source))
+
+      if cached is None or image(cached) != image(ast):
+        raise AssertionError("the cached AST differs from the parsed one")
+
+      print(f"{decls:>6} {len(source) / 1024:>12.0f} {os.path.getsize(path(filename)) / 1024:>11.0f} "
+            f"{sly * 1000:>17.0f} {descent * 1000:>13.0f} {stored * 1000:>11.0f} {loaded * 1000:>10.0f} "
+            f"{sly / loaded:>7.1f}x")
+
+if __name__ == '__main__':
+  main()
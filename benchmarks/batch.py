@@ -0,0 +1,67 @@
+'''
+Batch compilation of generated programs with one worker and with
+several. First two directories that each hold a file of the same name
+are checked to be refused, since both would be written to one output,
+and the same directory given twice to be compiled once.
+
+usage: python benchmarks/batch.py [files] [jobs]
+'''
+import io
+import os
+import sys
+import tempfile
+import time
+
+from contextlib import redirect_stdout, redirect_stderr
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.programs import program
+from core.batch          import run
+
+def write(directory, count, decls = 50):
+  os.makedirs(directory, exist_ok = True)
+  source = program(decls)
+
+  for i in range(count):
+    with open(os.path.join(directory, f"p{i}.bminor"), 'w', encoding = 'utf-8') as file:
+      file.write(source)
+
+def quiet(*args):
+  with redirect_stdout(io.StringIO()), redirect_stderr(io.StringIO()):
+    return run(*args)
+
+def clashes(root):
+  a, b = os.path.join(root, 'a'), os.path.join(root, 'b')
+  write(a, 1)
+  write(b, 1)
+  output = os.path.join(root, 'out')
+
+  if not quiet([a, b], 'codegen', output, 2) or os.path.exists(output):
+    raise AssertionError("files with the same output were not refused")
+
+  if quiet([a, a], 'codegen', output, 2) or os.listdir(output) != ['p0.ll']:
+    raise AssertionError("the same directory given twice did not compile once")
+
+def main():
+  count = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+  jobs = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count()
+
+  with tempfile.TemporaryDirectory() as root:
+    clashes(os.path.join(root, 'clash'))
+
+    sources = os.path.join(root, 'src')
+    write(sources, count)
+
+    print(f"{'workers':>8} {'files':>6} {'time (s)':>9}")
+
+    for workers in sorted({1, jobs}):
+      start = time.perf_counter()
+
+      if quiet([sources], 'codegen', os.path.join(root, f"out{workers}"), workers):
+        raise AssertionError("a generated program failed to compile")
+
+      print(f"{workers:>8} {count:>6} {time.perf_counter() - start:>9.2f}")
+
+if __name__ == '__main__':
+  main()
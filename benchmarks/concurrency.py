@@ -0,0 +1,66 @@
+'''
+Stress test for CompilerSession: compile many programs concurrently
+on a thread pool and check that every result (LLVM IR, diagnostics and
+symbol table scope names) is identical to a serial run.
+
+usage: python benchmarks/concurrency.py [programs] [threads] [rounds]
+'''
+import io
+import os
+import random
+import sys
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.programs import program
+from core.session        import CompilerSession
+
+def scopes(env):
+  return [env.name, [scopes(child) for child in env.children]]
+
+def run(source):
+  session = CompilerSession('<stress>', file = io.StringIO())
+  ast = session.parse(source)
+  env = ir = None
+
+  if not session.errors:
+    env = session.check(ast)
+
+  if not session.errors:
+    ir = str(session.codegen(ast))
+
+  return ir, list(session.diagnostics), scopes(env) if env else None, session.console.file.getvalue()
+
+def main():
+  count = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+  threads = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+  rounds = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+
+  sources = [program(20, seed = i, errors = i % 3) for i in range(count)]
+
+  start = time.perf_counter()
+  expected = [run(source) for source in sources]
+  serial = time.perf_counter() - start
+
+  jobs = [i for i in range(count) for _ in range(rounds)]
+  random.Random(0).shuffle(jobs)
+
+  start = time.perf_counter()
+
+  with ThreadPoolExecutor(max_workers = threads) as pool:
+    results = list(pool.map(lambda i: run(sources[i]), jobs))
+
+  concurrent = time.perf_counter() - start
+  mismatches = sum(1 for i, result in zip(jobs, results) if result != expected[i])
+
+  print(f"serial     : {count} compilations in {serial:.2f} s")
+  print(f"concurrent : {len(jobs)} compilations on {threads} threads in {concurrent:.2f} s")
+  print(f"mismatches : {mismatches}")
+
+  sys.exit(1 if mismatches else 0)
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,162 @@
+'''
+Visiting deep trees. First a stress test: a left-associated sum of
+tens of thousands of terms and ifs and blocks nested thousands deep are
+parsed, checked, compiled to LLVM IR, turned into a rich Tree by
+ast_to_tree and rendered with ASTPrinter, all under Python's default
+recursion limit. (rich prints such trees without recursion too, but
+each line carries a guide for every level above it, so printing them
+takes time quadratic in the depth.) The hand-written parser, which
+recurses on nesting, is checked to report the nested ifs and blocks as
+too deep rather than fail.
+Then the cost per node of running the visitors on the explicit stack
+of Node.accept() versus driving the same visit generators through
+Python recursion, on large ordinary programs.
+
+usage: python benchmarks/depth.py [terms] [depth] [decls ...]
+'''
+import gc
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.programs    import program
+from core.parser.model      import Node, GeneratorType, values
+from core.parser.parser     import parse, ast_to_tree
+from core.parser.dot_render import ASTPrinter
+from core.semantic.checker  import Check
+from core.codegen.codegen   import CodeGenerator
+from core.session           import CompilerSession
+
+REPEAT = 3
+
+def chain(terms):
+  return f"x: integer = 1;\nmain: function integer () = {{\n  y: integer = {' + '.join(['x'] * terms)};\n  return y;\n}};\n"
+
+def nested(depth):
+  opening = "".join("if (x > 0) {\n" if i % 2 else "{\n" for i in range(depth))
+  return f"x: integer = 1;\nmain: function integer () = {{\n{opening}print x;\n{'}' * depth}\nreturn x;\n}};\n"
+
+def count(ast):
+  nodes = 0
+  stack = [ast]
+
+  while stack:
+    node = stack.pop()
+
+    if isinstance(node, Node):
+      nodes += 1
+      stack.extend(values(node))
+    elif isinstance(node, (list, tuple)):
+      stack.extend(node)
+
+  return nodes
+
+def compile(source):
+  '''
+  Every stage that walks the tree, on source.
+  '''
+  with CompilerSession('<bench>', file = io.StringIO()) as session:
+    ast = parse(source)
+    Check.checker(ast)
+    CodeGenerator().visit(ast)
+    ast_to_tree(ast)
+    ASTPrinter.render(ast)
+
+  if session.errors:
+    raise AssertionError("the generated program does not compile")
+
+  return count(ast)
+
+def too_deep(source):
+  '''
+  Whether the hand-written parser reports source as nested too deep.
+  '''
+  output = io.StringIO()
+
+  with CompilerSession('<bench>', file = output, descent = True) as session:
+    ast = parse(source)
+
+  return ast is None and session.errors == 1 and "Nesting too deep" in output.getvalue()
+
+def recursive(visitor, result):
+  '''
+  Result of a visit, with the children each generator yields visited
+  through Python recursion.
+  '''
+  if type(result) is not GeneratorType:
+    return result
+
+  value = None
+
+  while True:
+    try:
+      request = result.send(value)
+    except StopIteration as stop:
+      return stop.value
+
+    value = recursive(visitor, visitor.visit(*request) if type(request) is tuple else visitor.visit(request))
+
+def accept_recursive(self, v, *args, **kwargs):
+  return recursive(v, v.visit(self, *args, **kwargs))
+
+def best(run):
+  result = float('inf')
+
+  for _ in range(REPEAT):
+    gc.collect()
+    start = time.perf_counter()
+    run()
+    result = min(result, time.perf_counter() - start)
+
+  return result
+
+def stages(ast):
+  def check():
+    with CompilerSession('<bench>', file = io.StringIO()):
+      Check.checker(ast)
+
+  def codegen():
+    with CompilerSession('<bench>', file = io.StringIO()):
+      CodeGenerator().visit(ast)
+
+  return {'check': best(check), 'codegen': best(codegen), 'dot': best(lambda: ASTPrinter.render(ast))}
+
+def main():
+  terms = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+  depth = int(sys.argv[2]) if len(sys.argv) > 2 else 10000
+  sizes = [int(n) for n in sys.argv[3:]] or [2000]
+
+  for name, source in (('chain', chain(terms)), ('nested', nested(depth))):
+    start = time.perf_counter()
+    nodes = compile(source)
+    print(f"{name:>6}: {nodes} nodes compiled in {time.perf_counter() - start:.1f} s "
+          f"(recursion limit {sys.getrecursionlimit()})")
+
+  if not too_deep(nested(depth)):
+    raise AssertionError("the hand-written parser does not report deep nesting")
+
+  print(f"\n{'decls':>6} {'nodes':>8} {'stage':>8} {'stack (us/node)':>16} {'recursive (us/node)':>20} {'ratio':>6}")
+
+  for decls in sizes:
+    with CompilerSession('<bench>', file = io.StringIO()):
+      ast = parse(program(decls))
+
+    nodes = count(ast)
+    stack = stages(ast)
+    accept = Node.accept
+    Node.accept = accept_recursive
+
+    try:
+      recursion = stages(ast)
+    finally:
+      Node.accept = accept
+
+    for stage in stack:
+      print(f"{decls:>6} {nodes:>8} {stage:>8} {stack[stage] / nodes * 1e6:>16.2f} "
+            f"{recursion[stage] / nodes * 1e6:>20.2f} {stack[stage] / recursion[stage]:>6.2f}")
+
+if __name__ == '__main__':
+  main()
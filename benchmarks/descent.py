@@ -0,0 +1,110 @@
+'''
+Throughput of the hand-written DescentParser versus the SLY Parser.
+
+Before timing, both parsers run on the examples and on generated
+programs, and must give the same AST, down to the line number of every
+node, and the same diagnostics. The inputs are a program mixing every
+kind of statement and an expression-heavy one, where the LALR parser
+spends most of its time reducing through the nine levels of the
+expression grammar. Tokens are lexed beforehand, so only parsing is
+timed.
+
+usage: python benchmarks/descent.py [decls]
+'''
+import gc
+import glob
+import io
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+sys.path.insert(0, ROOT)
+
+from dataclasses import fields, is_dataclass
+
+from benchmarks.programs import expressions, program
+from core.lexer.lexer    import Lexer
+from core.parser.descent import DescentParser
+from core.parser.parser  import Parser
+from core.session        import CompilerSession
+
+REPEAT = 3
+
+def dump(node):
+  '''
+  A comparable image of node that includes every line number.
+  '''
+  if isinstance(node, (list, tuple)):
+    return [dump(item) for item in node]
+
+  if is_dataclass(node):
+    return (type(node).__name__, getattr(node, 'lineno', None),
+            [(f.name, dump(getattr(node, f.name))) for f in fields(node)])
+
+  return node
+
+def parse(parser, tokens):
+  with CompilerSession('<bench>', file = io.StringIO()) as session:
+    ast = parser().parse(iter(tokens))
+
+  return ast, session.diagnostics
+
+def check(name, source):
+  with CompilerSession('<bench>', file = io.StringIO()):
+    tokens = list(Lexer().tokenize(source))
+
+  expected, diagnostics = parse(Parser, tokens)
+  ast, found = parse(DescentParser, tokens)
+
+  if diagnostics:
+    raise AssertionError(f"{name} does not parse")
+
+  if dump(ast) != dump(expected) or found != diagnostics:
+    raise AssertionError(f"the parsers disagree on {name}")
+
+def timed(parser, tokens):
+  best = float('inf')
+
+  for _ in range(REPEAT):
+    gc.collect()
+    gc.disable()
+
+    try:
+      start = time.perf_counter()
+      parse(parser, tokens)
+      best = min(best, time.perf_counter() - start)
+    finally:
+      gc.enable()
+
+  return best
+
+def main():
+  decls = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+  sources = {os.path.basename(path): open(path).read() for path in sorted(glob.glob(os.path.join(ROOT, 'examples', '*.bminor')))}
+
+  for seed in range(5):
+    sources[f"program {seed}"] = program(50, seed)
+    sources[f"expressions {seed}"] = expressions(50, seed)
+
+  for name, source in sources.items():
+    check(name, source)
+
+  print(f"parity: {len(sources)} programs parse to identical ASTs\n")
+  print(f"{'input':>12} {'tokens':>8} {'SLY (ms)':>10} {'SLY (tok/s)':>12} {'descent (ms)':>13} "
+        f"{'descent (tok/s)':>16} {'speedup':>8}")
+
+  for name, source in (('program', program(decls)), ('expressions', expressions(decls))):
+    with CompilerSession('<bench>', file = io.StringIO()):
+      tokens = list(Lexer().tokenize(source))
+
+    sly = timed(Parser, tokens)
+    hand = timed(DescentParser, tokens)
+
+    print(f"{name:>12} {len(tokens):>8} {sly * 1000:>10.0f} {len(tokens) / sly:>12,.0f} {hand * 1000:>13.0f} "
+          f"{len(tokens) / hand:>16,.0f} {sly / hand:>7.1f}x")
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,118 @@
+'''
+Cost per node of choosing a visit method: the table VisitorMeta builds
+for each Visitor class, reached through Visitor.visit() or indexed
+directly as Node.accept() and drive() do, against multimethod's
+multimeta, which visitors were built on before. Every node of a large
+program, and every node of an arena view of it (classes the table only
+meets at run time), is dispatched to a visitor with one trivial visit
+per node class, taking (node, env) as the checker's do.
+
+usage: python benchmarks/dispatch.py [decls]
+'''
+import gc
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.programs   import program
+from core.parser.arena     import Arena, CLASSES
+from core.parser.model     import Node, Visitor, VisitorMeta, values
+from core.parser.parser    import parse
+from core.semantic.symtab  import Symtab
+from core.session          import CompilerSession
+
+REPEAT = 5
+
+try:
+  from multimethod import multimeta
+except ImportError:
+  multimeta = None
+
+def trivial(cls):
+  def visit(self, n, env):
+    return None
+
+  visit.__annotations__ = {'n': cls, 'env': Symtab}
+  return visit
+
+def visitor(meta, bases):
+  '''
+  A visitor made by meta, with a trivial visit for every node class.
+  '''
+  namespace = meta.__prepare__('Trivial', bases)
+
+  for cls in CLASSES:
+    namespace['visit'] = trivial(cls)
+
+  return meta('Trivial', bases, namespace)()
+
+def nodes(root):
+  found = []
+  stack = [root]
+
+  while stack:
+    node = stack.pop()
+
+    if isinstance(node, Node):
+      found.append(node)
+      stack.extend(values(node))
+    elif isinstance(node, (list, tuple)):
+      stack.extend(node)
+
+  return found
+
+def best(run, items, env):
+  result = float('inf')
+
+  for _ in range(REPEAT):
+    gc.collect()
+    start = time.perf_counter()
+    run(items, env)
+    result = min(result, time.perf_counter() - start)
+
+  return result / len(items) * 1e9
+
+def through_visit(v):
+  def run(items, env):
+    visit = v.visit
+
+    for n in items:
+      visit(n, env)
+
+  return run
+
+def through_table(v):
+  def run(items, env):
+    table = v._table
+
+    for n in items:
+      table[type(n)](v, n, env)
+
+  return run
+
+def main():
+  decls = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+  with CompilerSession('<bench>', file = io.StringIO()):
+    ast = parse(program(decls))
+
+  arena = Arena.from_tree(ast)
+  env = Symtab('global')
+  table = visitor(VisitorMeta, (Visitor,))
+  runs = {'Visitor.visit': through_visit(table), 'table': through_table(table)}
+
+  if multimeta is not None:
+    runs['multimethod'] = through_visit(visitor(multimeta, ()))
+  else:
+    print("multimethod is not installed; only the table is measured\n")
+
+  print(f"{'nodes':>8} {'':>6} " + " ".join(f"{name + ' (ns)':>18}" for name in runs))
+
+  for kind, items in (('tree', nodes(ast)), ('views', nodes(arena.view()))):
+    print(f"{len(items):>8} {kind:>6} " + " ".join(f"{best(run, items, env):>18.0f}" for run in runs.values()))
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,96 @@
+'''
+What --dot costs on large ASTs: printing the tree with rich versus as
+plain text with write_tree, and building the whole graphviz.Digraph in
+memory before writing its source versus streaming the statements to the
+file with a DotWriter, in time and, for the graphs, peak memory (timed
+and traced in separate runs). Both graphs are checked to be the same
+text first. Laying the graph out with Graphviz (--pdf) is not timed:
+that is what takes minutes on graphs this size.
+
+usage: python benchmarks/dot.py [decls ...]
+'''
+import gc
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rich.console import Console
+
+from benchmarks.programs    import program
+from core.parser.arena      import Arena
+from core.parser.dot_render import ASTPrinter
+from core.parser.parser     import parse, ast_to_tree, write_tree
+from core.session           import CompilerSession
+
+def elapsed(run):
+  gc.collect()
+  start = time.perf_counter()
+  run()
+  return time.perf_counter() - start
+
+def peak(run):
+  gc.collect()
+  tracemalloc.start()
+  run()
+  _, size = tracemalloc.get_traced_memory()
+  tracemalloc.stop()
+
+  return size
+
+def main():
+  sizes = [int(n) for n in sys.argv[1:]] or [1000, 4000]
+
+  print(f"{'decls':>6} {'nodes':>8} {'rich / text tree (s)':>21} {'digraph / stream (s)':>21} "
+        f"{'graph peak (MB)':>16} {'DOT (MB)':>9}")
+
+  with tempfile.TemporaryDirectory() as directory:
+    target = os.path.join(directory, "ast.dot")
+
+    def write_digraph(ast):
+      with open(target, "w", encoding="utf-8") as file:
+        file.write(ASTPrinter.render(ast).source)
+
+    def write_stream(ast):
+      with open(target, "w", encoding="utf-8") as file:
+        ASTPrinter.render(ast, file)
+
+    def print_rich(ast):
+      Console(file = io.StringIO(), width = 120, color_system = None).print(ast_to_tree(ast))
+
+    def print_text(ast):
+      with open(os.devnull, "w") as file:
+        write_tree(ast, file)
+
+    for decls in sizes:
+      with CompilerSession('<bench>', file = io.StringIO()) as session:
+        ast = parse(program(decls))
+
+      if session.errors:
+        raise AssertionError("the generated program does not parse")
+
+      write_digraph(ast)
+
+      with open(target, encoding = "utf-8") as file:
+        expected = file.read()
+
+      write_stream(ast)
+
+      with open(target, encoding = "utf-8") as file:
+        if file.read() != expected:
+          raise AssertionError("the streamed graph differs from the Digraph")
+
+      rich, text = elapsed(lambda: print_rich(ast)), elapsed(lambda: print_text(ast))
+      digraph, stream = elapsed(lambda: write_digraph(ast)), elapsed(lambda: write_stream(ast))
+      digraph_peak, stream_peak = peak(lambda: write_digraph(ast)), peak(lambda: write_stream(ast))
+
+      print(f"{decls:>6} {len(Arena.from_tree(ast)):>8} {f'{rich:.1f} / {text:.1f}':>21} "
+            f"{f'{digraph:.1f} / {stream:.1f}':>21} "
+            f"{f'{digraph_peak / 2**20:.1f} / {stream_peak / 2**20:.1f}':>16} {len(expected) / 2**20:>9.1f}")
+
+if __name__ == '__main__':
+  main()
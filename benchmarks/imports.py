@@ -0,0 +1,52 @@
+'''
+Report which heavy modules each CLI mode imports, and how long its
+imports take, using 'python -X importtime'.
+
+usage: python benchmarks/imports.py [filename]
+'''
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODES = {
+  'scan'   : ['--scan'],
+  'sym'    : ['--sym'],
+  'dot'    : ['--dot'],
+  'codegen': [],
+}
+
+HEAVY = ('llvmlite', 'graphviz')
+
+def importtime(args):
+  proc = subprocess.run(
+    [sys.executable, '-X', 'importtime', 'main.py', *args],
+    cwd = ROOT, stdout = subprocess.DEVNULL, stderr = subprocess.PIPE, text = True
+  )
+
+  modules = {}
+
+  for line in proc.stderr.splitlines():
+    if not line.startswith('import time:') or 'cumulative' in line:
+      continue
+
+    self_us, _, name = line[len('import time:'):].split('|')
+    modules[name.strip()] = int(self_us)
+
+  return modules
+
+def main():
+  filename = sys.argv[1] if len(sys.argv) > 1 else os.path.join('examples', 'sum.bminor')
+
+  print(f"{'mode':<8} {'imports (ms)':>12}  heavy modules loaded")
+
+  for mode, flags in MODES.items():
+    modules = importtime([*flags, filename])
+    total = sum(modules.values()) / 1000
+    heavy = sorted({m.split('.')[0] for m in modules if m.split('.')[0] in HEAVY})
+
+    print(f"{mode:<8} {total:>12.1f}  {', '.join(heavy) or '-'}")
+
+if __name__ == '__main__':
+  main()
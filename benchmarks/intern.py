@@ -0,0 +1,119 @@
+'''
+Savings of the interning pool on a large program: memory held by the
+AST after parsing, time to resolve every name used in a function in
+its symbol table, and time to check the program and generate code,
+with every name shared through the session's pool versus a pool that
+hands back the lexer's own strings.
+
+usage: python benchmarks/intern.py [decls ...]
+'''
+import gc
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dataclasses import fields, is_dataclass
+
+from benchmarks.programs   import program
+from core.parser.model     import FuncDecl, VarLoc
+from core.parser.parser    import parse
+from core.semantic.checker import Check
+from core.codegen.codegen  import CodeGenerator
+from core.session          import CompilerSession
+
+REPEAT = 3
+
+def session(shared):
+  session = CompilerSession('<bench>', file = io.StringIO())
+
+  if not shared:
+    session.pool.intern = str
+
+  return session
+
+def retained(source, shared):
+  with session(shared):
+    gc.collect()
+    tracemalloc.start()
+    ast = parse(source)
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+  return size
+
+def uses(node):
+  '''
+  Names of every VarLoc under node.
+  '''
+  if isinstance(node, list):
+    for item in node:
+      yield from uses(item)
+  elif is_dataclass(node):
+    if isinstance(node, VarLoc):
+      yield node.name
+
+    for f in fields(node):
+      yield from uses(getattr(node, f.name))
+
+def lookups(source, shared):
+  with session(shared):
+    ast = parse(source)
+    env = Check.checker(ast)
+
+  scopes = {table.name: table for table in env.children}
+  pairs = [(scopes[decl.name], name) for decl in ast.body if isinstance(decl, FuncDecl) for name in uses(decl.body)]
+  best = float('inf')
+
+  for _ in range(REPEAT * 3):
+    start = time.perf_counter()
+
+    for table, name in pairs:
+      table.get(name)
+
+    best = min(best, time.perf_counter() - start)
+
+  return best, len(pairs)
+
+def timed(source, shared):
+  check = codegen = float('inf')
+
+  for _ in range(REPEAT):
+    with session(shared):
+      ast = parse(source)
+
+      start = time.perf_counter()
+      Check.checker(ast)
+      check = min(check, time.perf_counter() - start)
+
+      start = time.perf_counter()
+      CodeGenerator().visit(ast)
+      codegen = min(codegen, time.perf_counter() - start)
+
+  return check, codegen
+
+def main():
+  sizes = [int(n) for n in sys.argv[1:]] or [2000, 10000]
+
+  print(f"{'decls':>6} {'AST (MB)':>16} {'saved':>6} {'lookups':>8} {'lookup (ns)':>12} {'check (ms)':>16} "
+        f"{'codegen (ms)':>16}")
+
+  for decls in sizes:
+    source = program(decls)
+
+    plain, shared = retained(source, False), retained(source, True)
+    (plain_lookup, count), (shared_lookup, _) = lookups(source, False), lookups(source, True)
+    plain_check, plain_codegen = timed(source, False)
+    shared_check, shared_codegen = timed(source, True)
+
+    print(f"{decls:>6} {f'{plain / 2**20:.1f} / {shared / 2**20:.1f}':>16} {1 - shared / plain:>6.1%} "
+          f"{count:>8} {f'{plain_lookup / count * 1e9:.0f} / {shared_lookup / count * 1e9:.0f}':>12} "
+          f"{f'{plain_check * 1000:.0f} / {shared_check * 1000:.0f}':>16} "
+          f"{f'{plain_codegen * 1000:.0f} / {shared_codegen * 1000:.0f}':>16}")
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,87 @@
+'''
+Latency of the language server on large generated documents: opening
+the document, typing inside a function body (one didChange per
+keystroke, diagnostics included), go-to-definition and hover.
+
+usage: python benchmarks/lsp.py [decls ...]
+'''
+import io
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.programs import program
+from core.lsp            import LanguageServer
+
+URI = 'file:///bench.bminor'
+
+def timed(server, message):
+  start = time.perf_counter()
+  server.dispatch(message)
+  return (time.perf_counter() - start) * 1000
+
+def keystrokes(source, text):
+  '''
+  didChange notifications typing text inside an expression in the
+  middle of the document, one character at a time.
+  '''
+  offset = source.index(' - ', len(source) // 2)
+  line = source.count('\n', 0, offset)
+  character = offset - source.rfind('\n', 0, offset) - 1
+
+  for version, char in enumerate(text, 2):
+    position = {'line': line, 'character': character + version - 2}
+    yield {
+      'method': 'textDocument/didChange',
+      'params': {
+        'textDocument': {'uri': URI, 'version': version},
+        'contentChanges': [{'range': {'start': position, 'end': position}, 'text': char}],
+      },
+    }
+
+def positions(source, count = 200):
+  lines = source.split('\n')
+  step = max(1, len(lines) // count)
+
+  for i in range(0, len(lines), step):
+    column = lines[i].find('x')
+
+    if column >= 0:
+      yield {'line': i, 'character': column}
+
+def main():
+  sizes = [int(n) for n in sys.argv[1:]] or [500, 2000]
+
+  print(f"{'decls':>6} {'lines':>6} {'open (ms)':>10} {'keystroke mean/max (ms)':>24} "
+        f"{'definition (ms)':>16} {'hover (ms)':>11}")
+
+  for size in sizes:
+    source = program(size)
+    server = LanguageServer(io.BytesIO(), io.BytesIO())
+
+    opened = timed(server, {
+      'method': 'textDocument/didOpen',
+      'params': {'textDocument': {'uri': URI, 'version': 1, 'text': source}},
+    })
+
+    # Intermediate states such as 'b * 2 * (a - 5' do not parse
+    typing = [timed(server, change) for change in keystrokes(source, ' * (a + 3)')]
+
+    requests = {'textDocument/definition': [], 'textDocument/hover': []}
+
+    for position in positions(source):
+      for method, times in requests.items():
+        params = {'textDocument': {'uri': URI}, 'position': position}
+        times.append(timed(server, {'id': 1, 'method': method, 'params': params}))
+
+    definition = statistics.mean(requests['textDocument/definition'])
+    hover = statistics.mean(requests['textDocument/hover'])
+
+    print(f"{size:>6} {source.count(chr(10)):>6} {opened:>10.1f} {f'{statistics.mean(typing):.1f} / {max(typing):.1f}':>24} "
+          f"{definition:>16.2f} {hover:>11.2f}")
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,83 @@
+'''
+Peak memory of parsing a file that is read into a string versus one
+that is memory-mapped and streamed through the lexer.
+
+Each measurement runs in a fresh interpreter and reports the growth of
+its peak RSS over the baseline after imports. 'padded' sources hold
+the same declarations as 'dense' ones plus long comment lines, so
+their AST is the same size while the source is much larger.
+
+usage: python benchmarks/memory.py [decls] [padding MB]
+'''
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.programs import program
+
+CHILD = '''
+import resource, sys
+from core.parser.parser import parse
+from core.cli           import read_source
+
+def peak():
+  # ru_maxrss survives exec and would report the parent's peak
+  try:
+    with open('/proc/self/status') as status:
+      return next(int(line.split()[1]) for line in status if line.startswith('VmHWM')) / 1024
+  except OSError:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024 if sys.platform != 'darwin' else rss / 1024 / 1024
+
+before = peak()
+
+if sys.argv[2] == 'read':
+  with open(sys.argv[1], encoding = 'utf-8') as file:
+    ast = parse(file.read())
+else:
+  with read_source(sys.argv[1]) as source:
+    ast = parse(source)
+
+print(before, peak())
+'''
+
+def measure(path, method):
+  out = subprocess.run([sys.executable, '-c', CHILD, path, method], cwd = ROOT,
+                       capture_output = True, text = True, check = True).stdout
+  before, after = map(float, out.split())
+  return before, after
+
+def pad(source, megabytes):
+  lines = source.split('\n')
+  comment = '\n// ' + 'x' * 1000
+  repeat = -(-(megabytes << 20) // (len(comment) * len(lines)))
+  return '\n'.join(line + comment * repeat for line in lines)
+
+def main():
+  decls = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+  padding = int(sys.argv[2]) if len(sys.argv) > 2 else 64
+
+  dense = program(decls)
+  sources = {'dense': dense, 'padded': pad(dense, padding)}
+
+  print(f"{'source':>8} {'size (MB)':>10} {'imports (MB)':>13} {'read +MB':>10} {'mmap +MB':>10}")
+
+  with tempfile.TemporaryDirectory() as tmp:
+    for name, source in sources.items():
+      path = os.path.join(tmp, f'{name}.bminor')
+
+      with open(path, 'w', encoding = 'utf-8') as file:
+        file.write(source)
+
+      base, read = measure(path, 'read')
+      _, mapped = measure(path, 'mmap')
+      size = os.path.getsize(path) / (1 << 20)
+
+      print(f"{name:>8} {size:>10.1f} {base:>13.1f} {read - base:>10.1f} {mapped - base:>10.1f}")
+
+if __name__ == '__main__':
+  main()
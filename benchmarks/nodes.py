@@ -0,0 +1,126 @@
+'''
+Memory of the AST with slotted node classes versus the same classes
+with a __dict__, as they were before: bytes per node and total size of
+the tree of a large checked program (nodes and their lists; names and
+literals are shared by both trees and not counted), and the time to
+build it.
+
+The dict-based tree is a copy of the parsed one made of plain classes
+named after the node classes, with attributes set in the order the
+parser and checker set them (fields, lineno, then type), so instance
+dictionaries share their keys exactly as they did.
+
+usage: python benchmarks/nodes.py [decls ...]
+'''
+import gc
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dataclasses import fields
+
+from benchmarks.programs   import program
+from core.parser.model     import Node, values
+from core.parser.parser    import parse
+from core.semantic.checker import Check
+from core.session          import CompilerSession
+
+REPEAT = 3
+
+_plain = {}   # node class -> class of the same name with a __dict__
+
+def plain(node, names):
+  cls = type(node)
+
+  if cls not in _plain:
+    _plain[cls] = type(cls.__name__, (), {})
+
+  copy = _plain[cls]()
+
+  for name, value in zip(names, values(node)):
+    setattr(copy, name, clone(value, plain))
+
+  copy.lineno = node.lineno
+
+  if hasattr(node, 'type') and 'type' not in names:
+    copy.type = node.type
+
+  return copy
+
+def slotted(node, names):
+  copy = type(node)(*[clone(value, slotted) for value in values(node)])
+  copy.lineno = node.lineno
+
+  if hasattr(node, 'type') and 'type' not in names:
+    copy.type = node.type
+
+  return copy
+
+def clone(value, make):
+  if isinstance(value, list):
+    return [clone(item, make) for item in value]
+
+  if isinstance(value, tuple):
+    return tuple(clone(item, make) for item in value)
+
+  if isinstance(value, Node):
+    return make(value, [f.name for f in fields(value)])
+
+  return value
+
+def count(value):
+  if isinstance(value, (list, tuple)):
+    return sum(count(item) for item in value)
+
+  if isinstance(value, Node):
+    return 1 + sum(count(item) for item in values(value))
+
+  return 0
+
+def measure(ast, make):
+  gc.collect()
+  tracemalloc.start()
+  tree = clone(ast, make)
+  gc.collect()
+  size, _ = tracemalloc.get_traced_memory()
+  tracemalloc.stop()
+  del tree
+
+  best = float('inf')
+
+  for _ in range(REPEAT):
+    gc.collect()
+    start = time.perf_counter()
+    tree = clone(ast, make)
+    best = min(best, time.perf_counter() - start)
+    del tree
+
+  return size, best
+
+def main():
+  sizes = [int(n) for n in sys.argv[1:]] or [2000, 10000]
+
+  print(f"{'decls':>6} {'nodes':>8} {'bytes/node':>12} {'AST (MB)':>14} {'saved':>6} {'build (ms)':>12}")
+
+  for decls in sizes:
+    with CompilerSession('<bench>', file = io.StringIO()) as session:
+      ast = parse(program(decls))
+      Check.checker(ast)
+
+    if session.errors:
+      raise AssertionError("the generated program does not check")
+
+    nodes = count(ast)
+    before, before_time = measure(ast, plain)
+    after, after_time = measure(ast, slotted)
+
+    print(f"{decls:>6} {nodes:>8} {f'{before / nodes:.0f} / {after / nodes:.0f}':>12} "
+          f"{f'{before / 2**20:.1f} / {after / 2**20:.1f}':>14} {1 - after / before:>6.1%} "
+          f"{f'{before_time * 1000:.0f} / {after_time * 1000:.0f}':>12}")
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,178 @@
+'''
+Large array initializers packed into typed buffers versus one Literal
+node per element: memory held by the parsed tree and the time to parse
+(with the hand-written parser), check and generate LLVM IR for a
+function whose body is a table of a million integers (all positive, or
+of both signs), floats or chars.
+Unpacked runs raise PACK_MIN past the table size, so both go through
+exactly the same code otherwise.
+
+Before timing, a smaller table of each type, local and then global, is
+compiled both ways and run with llvmlite's JIT, summing it from B-Minor,
+and the packed tree is checked to iterate to the same Literal nodes, line numbers included,
+and to survive the binary AST cache.
+
+usage: python benchmarks/packed.py [elements]
+'''
+import ctypes
+import gc
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import llvmlite.binding as llvm
+
+import core.parser.parser as parser
+
+from core.codegen.codegen  import CodeGenerator
+from core.parser.cache     import load, store
+from core.parser.model     import ArrayDecl, PackedLiterals
+from core.parser.parser    import parse
+from core.semantic.checker import Check
+from core.session          import CompilerSession
+
+PACK_MIN = parser.PACK_MIN
+PARITY = 5000
+PER_LINE = 16
+
+_literals = {
+  'integer': lambda i: str(i * 7919 % 1000003),
+  'signed' : lambda i: str(i * 7919 % 1000003 - 500000),
+  'float'  : lambda i: repr(i * 0.37),
+  'char'   : lambda i: f"'{chr(97 + i % 26)}'",
+}
+
+# B-Minor expression adding up element i of the table
+_term = {'integer': "t[i]", 'signed': "t[i]", 'float': "(t[i] > 1000.0)", 'char': "(t[i] == 'q')"}
+
+def source(type, elements, glob = False):
+  literal = _literals[type]
+  rows = (", ".join(literal(i) for i in range(start, min(start + PER_LINE, elements)))
+          for start in range(0, elements, PER_LINE))
+  table = ",\n    ".join(rows)
+  add = f"s = s + {_term[type]};" if _term[type] == "t[i]" else f"if {_term[type]} {{ s = s + 1; }}"
+  declaration = f"t: array [{elements}] {'integer' if type == 'signed' else type} = {{\n    {table}\n  }};\n"
+
+  return (f"{declaration if glob else ''}main: function integer () = {{\n"
+          f"{'' if glob else '  ' + declaration}"
+          f"  s: integer = 0;\n  i: integer = 0;\n"
+          f"  while (i < {elements}) {{ {add} i = i + 1; }}\n"
+          f"  return s;\n}};\n")
+
+def packed(on):
+  parser.PACK_MIN = PACK_MIN if on else sys.maxsize
+
+def retained(text):
+  with CompilerSession('<bench>', file = io.StringIO(), descent = True):
+    gc.collect()
+    tracemalloc.start()
+    ast = parse(text)
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+  return size
+
+def stages(text):
+  '''
+  (tree, parse, check and codegen seconds, IR text).
+  '''
+  with CompilerSession('<bench>', file = io.StringIO(), descent = True) as session:
+    gc.collect()
+    start = time.perf_counter()
+    ast = parse(text)
+    parsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    Check.checker(ast)
+    checked = time.perf_counter() - start
+
+    start = time.perf_counter()
+    cg = CodeGenerator()
+    cg.visit(ast)
+    ir = str(cg.module)
+    generated = time.perf_counter() - start
+
+  if session.errors:
+    raise AssertionError("the table does not compile")
+
+  return ast, parsed, checked, generated, ir
+
+def run(ir):
+  module = llvm.parse_assembly(ir)
+  module.verify()
+  machine = llvm.Target.from_default_triple().create_target_machine()
+
+  with llvm.create_mcjit_compiler(module, machine) as engine:
+    engine.finalize_object()
+    return ctypes.CFUNCTYPE(ctypes.c_int)(engine.get_function_address('main'))()
+
+def table(ast):
+  first = ast.body[0]
+  return first.value if isinstance(first, ArrayDecl) else first.body[0].value
+
+def parity(type, glob):
+  text = source(type, PARITY, glob)
+  where = f"{'global' if glob else 'local'} {type}"
+  results = []
+
+  for on in (True, False):
+    packed(on)
+    ast, *_, ir = stages(text)
+    results.append((ast, run(ir)))
+
+  (ast, packed_sum), (plain, plain_sum) = results
+
+  if not isinstance(table(ast), PackedLiterals) or isinstance(table(plain), PackedLiterals):
+    raise AssertionError(f"the {where} table was not packed as expected")
+
+  if packed_sum != plain_sum:
+    raise AssertionError(f"the packed {where} table sums to {packed_sum}, not {plain_sum}")
+
+  literals = [(n, n.lineno) for n in table(ast)]
+
+  if literals != [(n, n.lineno) for n in table(plain)]:
+    raise AssertionError(f"the packed {where} table iterates to other literals")
+
+  with tempfile.TemporaryDirectory() as directory, CompilerSession('<bench>', file = io.StringIO()):
+    filename = os.path.join(directory, "table.bminor")
+    store(filename, text, ast)
+    cached = load(filename, text)
+
+    if cached is None or [(n, n.lineno) for n in table(cached)] != literals:
+      raise AssertionError(f"the packed {where} table does not survive the AST cache")
+
+def main():
+  elements = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+  llvm.initialize_native_target()
+  llvm.initialize_native_asmprinter()
+
+  for type in _literals:
+    for glob in (False, True):
+      parity(type, glob)
+
+  print(f"{'type':>8} {'elements':>9} {'memory (MB)':>16} {'parse (s)':>12} {'check (s)':>14} {'codegen (s)':>14}")
+
+  for type in _literals:
+    text = source(type, elements)
+    columns = []
+
+    for on in (False, True):
+      packed(on)
+      columns.append((retained(text), *stages(text)[1:4]))
+      gc.collect()
+
+    (size, parsed, checked, generated), (packed_size, packed_parsed, packed_checked, packed_generated) = columns
+    print(f"{type:>8} {elements:>9} {f'{size / 2**20:.1f} / {packed_size / 2**20:.1f}':>16} "
+          f"{f'{parsed:.1f} / {packed_parsed:.1f}':>12} {f'{checked:.2f} / {packed_checked:.4f}':>14} "
+          f"{f'{generated:.1f} / {packed_generated:.1f}':>14}")
+
+  packed(True)
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,111 @@
+'''
+Generators of synthetic B-Minor programs used by the benchmarks.
+'''
+import random
+
+def function(i, kind):
+  if kind == 0:
+    return f"""f{i}: function integer (a: integer, b: integer) = {{
+  x: integer = a + b * 2 - {i};
+  arr: array [4] integer = {{1, 2, 3, {i}}};
+  if (x > b && a >= 3) {{
+    x = x - 1;
+  }} else {{
+    x = arr[2] + x % 7;
+  }}
+  while (x > 100) {{
+    x = x / 2;
+  }}
+  return x;
+}};"""
+
+  if kind == 1:
+    return f"""f{i}: function float (y: float) = {{
+  z: float = y * 2.5 + gf;
+  c: char = 'q';
+  counter: integer;
+  for (counter = 0; counter < 10; counter++) {{
+    z = z + 1.0;
+  }}
+  do {{
+    z = z - 0.5;
+  }} while (z > 3.0);
+  print z, c, counter;
+  return -z;
+}};"""
+
+  if kind == 2:
+    return f"g{i}: integer = {i} * 2 + (4 - 1) * 3;"
+
+  return f"""f{i}: function boolean (p: boolean, q: integer) = {{
+  t: boolean;
+  t = !p || q >= {i};
+  if (t) {{
+    print q;
+  }}
+  return t == p;
+}};"""
+
+def program(decls, seed = 1, errors = 0):
+  '''
+  A valid program with about 'decls' top-level declarations mixing
+  every statement kind. 'errors' declarations reference an undefined
+  name, producing one semantic error each.
+  '''
+  rnd = random.Random(seed)
+  out = ["g0: integer = 3;", "gf: float = 1.5;"]
+
+  for i in range(decls):
+    out.append(function(i, rnd.randrange(4)))
+
+  for i in range(errors):
+    out.append(f"e{i}: function integer () = {{\n  return undefined{i};\n}};")
+
+  out.append("main: function void () = {\n  print g0;\n};")
+  return "\n".join(out) + "\n"
+
+def expression(rnd, depth):
+  '''
+  A random integer expression nested up to depth levels.
+  '''
+  if depth == 0 or rnd.random() < 0.2:
+    return rnd.choice(["a", "b", "v[i]", "i", str(rnd.randrange(100)), "h(a, i)"])
+
+  kind = rnd.random()
+
+  if kind < 0.75:
+    oper = rnd.choice(["+", "-", "*", "/", "%", "^", "+", "-", "*"])
+    return f"{expression(rnd, depth - 1)} {oper} {expression(rnd, depth - 1)}"
+
+  if kind < 0.9:
+    return f"({expression(rnd, depth - 1)})"
+
+  operand = expression(rnd, depth - 1)
+
+  # '--' would be scanned as a decrement
+  return f"-({operand})" if operand[0] == "-" else f"-{operand}"
+
+def expressions(decls, seed = 1, depth = 5):
+  '''
+  A valid program of about 'decls' functions whose bodies are mostly
+  long arithmetic and boolean expressions.
+  '''
+  rnd = random.Random(seed)
+  out = ["v: array [8] integer = {1, 2, 3, 4, 5, 6, 7, 8};",
+         "h: function integer (x: integer, y: integer) = {\n  return x + y;\n};"]
+
+  for n in range(decls):
+    lines = [f"f{n}: function integer (a: integer, b: integer) = {{", "  i: integer = 3;"]
+
+    for _ in range(6):
+      lines.append(f"  a = {expression(rnd, depth)};")
+
+    lines.append(f"  if ({expression(rnd, 2)} < {expression(rnd, 2)} && b >= {expression(rnd, 2)} || !(a == b)) {{")
+    lines.append(f"    b = {expression(rnd, depth)};")
+    lines.append("  }")
+    lines.append(f"  return {expression(rnd, depth)};")
+    lines.append("};")
+    out.append("\n".join(lines))
+
+  out.append("main: function void () = {\n  print f0(1, 2);\n};")
+  return "\n".join(out) + "\n"
@@ -0,0 +1,82 @@
+'''
+Single-character edits in a large program: incremental relexing versus
+lexing the edited source again, with both the SLY Lexer and the Scanner.
+
+'random' edits insert or delete one character at random offsets, each
+one applied to the result of the previous one; 'typing' inserts
+characters one after another at the same place. Every result is
+checked against a full relex.
+
+usage: python benchmarks/relex.py [decls ...]
+'''
+import io
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.programs     import program
+from core.lexer.buffer       import TokenBuffer
+from core.lexer.incremental  import relex
+from core.lexer.lexer        import Lexer
+from core.lexer.scanner      import Scanner
+from core.session            import CompilerSession
+
+EDITS = 20
+
+def edits(source, kind):
+  rand = random.Random(0)
+  size = len(source)
+  typing = rand.randrange(size)
+
+  for n in range(EDITS):
+    if kind == 'typing':
+      yield typing + n, 0, 'x'
+    elif rand.random() < 0.5:
+      yield rand.randrange(size), 0, rand.choice('x1 ;(')
+    else:
+      yield rand.randrange(size - 1), 1, ''
+      size -= 2
+
+    size += 1
+
+def run(lexer, source, kind):
+  tokens = TokenBuffer.scan(source, lexer)
+  incremental = full = 0
+
+  for offset, removed, inserted in edits(tokens.source, kind):
+    start = time.perf_counter()
+    edited = relex(tokens, offset, removed, inserted, lexer)
+    incremental += time.perf_counter() - start
+
+    start = time.perf_counter()
+    expected = TokenBuffer.scan(edited.source, lexer)
+    full += time.perf_counter() - start
+
+    if [(t.type, t.value, t.lineno, t.index) for t in edited] != [(t.type, t.value, t.lineno, t.index) for t in expected]:
+      raise AssertionError(f"relex differs from a full relex after editing offset {offset}")
+
+    tokens = edited
+
+  return len(tokens), incremental / EDITS, full / EDITS
+
+def main():
+  sizes = [int(n) for n in sys.argv[1:]] or [2000, 10000]
+
+  print(f"{'decls':>6} {'lexer':>8} {'edits':>7} {'tokens':>8} {'relex (ms)':>11} {'full (ms)':>10} {'speedup':>8}")
+
+  for decls in sizes:
+    source = program(decls)
+
+    for name, lexer in (('SLY', Lexer()), ('scanner', Scanner())):
+      for kind in ('random', 'typing'):
+        with CompilerSession('<bench>', file = io.StringIO()):
+          count, incremental, full = run(lexer, source, kind)
+
+        print(f"{decls:>6} {name:>8} {kind:>7} {count:>8} {incremental * 1000:>11.3f} {full * 1000:>10.1f} "
+              f"{full / incremental:>7.0f}x")
+
+if __name__ == '__main__':
+  main()
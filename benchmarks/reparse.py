@@ -0,0 +1,88 @@
+'''
+Edits inside single functions of a program with thousands of them:
+incremental reparsing versus parsing the whole edited program again,
+with both the SLY Parser and the DescentParser.
+
+'literal' edits change a number in a random function, 'newline' edits
+add an empty line to a function body, which moves every declaration
+after it down a line, and 'statement' edits insert a statement into a
+function body. Each edit is applied to the result of the previous one.
+Incremental times include relexing; full times only parse the edited
+tokens. Every result is checked against the full parse.
+
+usage: python benchmarks/reparse.py [decls ...]
+'''
+import io
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.programs     import program
+from core.lexer.buffer       import TokenBuffer
+from core.lexer.lexer        import Lexer
+from core.parser.incremental import image, parse, reparse
+from core.session            import CompilerSession
+
+EDITS = 10
+
+def edit(source, kind, rand):
+  '''
+  (offset, removed, inserted) of an edit of the given kind.
+  '''
+  if kind == 'literal':
+    m = rand.choice(list(re.finditer(r"\b\d+\b", source)))
+    return m.start(), m.end() - m.start(), str(rand.randrange(1000))
+
+  m = rand.choice(list(re.finditer(r"\{\n", source)))
+
+  if kind == 'newline':
+    return m.end(), 0, "\n"
+
+  return m.end(), 0, "  x = x + 1;\n"
+
+def run(source, kind):
+  rand = random.Random(0)
+  tokens = TokenBuffer.scan(source, Lexer())
+  ast = parse(tokens)
+  incremental = full = 0
+
+  for _ in range(EDITS):
+    offset, removed, inserted = edit(tokens.source, kind, rand)
+
+    start = time.perf_counter()
+    ast, tokens = reparse(ast, tokens, offset, removed, inserted, Lexer())
+    incremental += time.perf_counter() - start
+
+    scanned = TokenBuffer.scan(tokens.source, Lexer())
+
+    start = time.perf_counter()
+    expected = parse(scanned)
+    full += time.perf_counter() - start
+
+    if ast is None or image(ast) != image(expected):
+      raise AssertionError(f"reparse differs from a full parse after editing offset {offset}")
+
+  return len(tokens), incremental / EDITS, full / EDITS
+
+def main():
+  sizes = [int(n) for n in sys.argv[1:]] or [1000, 3000]
+
+  print(f"{'decls':>6} {'parser':>8} {'edits':>10} {'tokens':>8} {'reparse (ms)':>13} {'full (ms)':>10} {'speedup':>8}")
+
+  for decls in sizes:
+    source = program(decls)
+
+    for parser, options in (('SLY', {}), ('descent', {'descent': True})):
+      for kind in ('literal', 'newline', 'statement'):
+        with CompilerSession('<bench>', file = io.StringIO(), **options):
+          count, incremental, full = run(source, kind)
+
+        print(f"{decls:>6} {parser:>8} {kind:>10} {count:>8} {incremental * 1000:>13.2f} {full * 1000:>10.0f} "
+              f"{full / incremental:>7.0f}x")
+
+if __name__ == '__main__':
+  main()
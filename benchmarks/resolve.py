@@ -0,0 +1,172 @@
+'''
+Name lookups in deeply nested scopes: walking the chain of symbol
+tables for every name, as the checker did, versus binding every name
+once with core.semantic.resolver and reading the result off the node.
+
+Each generated function nests ifs depth levels deep, declaring a
+variable at every level, and its innermost body assigns sums of
+variables from the outermost levels, a param and globals, then returns.
+Before timing, a pass that looks every name up in a chain of Symtabs
+is checked to bind each location, call and return to exactly the
+declaration the resolver binds it to. Then both passes are timed on
+their own, along with the whole check (resolution included).
+
+usage: python benchmarks/resolve.py [depth ...]
+'''
+import gc
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.programs    import program
+from core.parser.model      import *
+from core.parser.parser     import parse
+from core.semantic.checker  import Check
+from core.semantic.resolver import Resolver
+from core.semantic.symtab   import Symtab
+from core.session           import CompilerSession
+
+FUNCTIONS = 20
+STATEMENTS = 50
+GLOBALS = 10
+REPEAT = 3
+
+def nested(depth):
+  source = [f"g{i}: integer = {i};" for i in range(GLOBALS)]
+
+  for f in range(FUNCTIONS):
+    lines = [f"f{f}: function integer (p: integer) = {{", "v0: integer = p;"]
+
+    for level in range(1, depth + 1):
+      lines.append(f"if (v{level - 1} > {level}) {{ v{level}: integer = v{level - 1} + g{level % GLOBALS};")
+
+    for i in range(STATEMENTS):
+      lines.append(f"v{depth} = v{depth} + v{i % (depth + 1) // 4} + p + g{i % GLOBALS};")
+
+    lines.append(f"return v{depth};")
+    lines.append("}" * depth)
+    lines.append("return v0;\n};")
+    source.append("\n".join(lines))
+
+  return "\n".join(source) + "\n"
+
+class Chains(Resolver):
+  '''
+  The resolver's walk with the checker's former lookups: a Symtab for
+  every scope, searched up its parents for each name, and two walks up
+  the tables for each return, to the function's table and then to the
+  function.
+  '''
+  def resolve(self, decl, env):
+    self.env = env
+    decl.accept(self)
+
+  def open(self):
+    self.env = Symtab(self.function.name, self.env)
+
+    if self.env.parent.parent is None:
+      self.env.has_return = False
+
+  def close(self):
+    self.env = self.env.parent
+
+  def declare(self, n):
+    try:
+      self.env.add(n.name, n)
+    except (Symtab.SymbolDefinedError, Symtab.SymbolConflictError):
+      pass
+
+  def lookup(self, name):
+    return self.env.get(name)
+
+  def visit(self, n: ReturnStmt):
+    current_env = self.env
+    n.function = None
+
+    while current_env is not None:
+      if hasattr(current_env, "has_return"):
+        current_env.has_return = True
+        break
+      current_env = current_env.parent
+
+    while current_env is not None:
+      possible = current_env.get(current_env.name)
+
+      if isinstance(possible, FuncDecl):
+        n.function = possible
+        break
+      current_env = current_env.parent
+
+    if n.value:
+      yield n.value
+
+def bound(ast):
+  '''
+  What every location, call and return under ast is bound to, in
+  preorder.
+  '''
+  found = []
+  stack = [ast]
+
+  while stack:
+    node = stack.pop()
+
+    if isinstance(node, Node):
+      if isinstance(node, Reference):
+        found.append(node.symbol)
+      elif isinstance(node, ReturnStmt):
+        found.append(node.function)
+
+      stack.extend(reversed(values(node)))
+    elif isinstance(node, (list, tuple)):
+      stack.extend(reversed(node))
+
+  return found
+
+def best(stage):
+  result = float('inf')
+
+  for _ in range(REPEAT):
+    gc.collect()
+    start = time.perf_counter()
+    stage()
+    result = min(result, time.perf_counter() - start)
+
+  return result
+
+def check(ast):
+  with CompilerSession('<bench>', file = io.StringIO()) as session:
+    Check.checker(ast)
+
+  if session.errors:
+    raise AssertionError("the generated program does not check")
+
+def main():
+  depths = [int(n) for n in sys.argv[1:]] or [1, 8, 32, 128, 512]
+
+  print(f"{'depth':>6} {'names':>7} {'chains (ms)':>12} {'resolver (ms)':>14} {'ratio':>6} {'check (ms)':>11}")
+
+  # An ordinary program first, for comparison
+  for depth, source in [('-', program(200))] + [(depth, nested(depth)) for depth in depths]:
+    with CompilerSession('<bench>', file = io.StringIO()):
+      ast = parse(source)
+
+    Chains.resolver(ast)
+    expected = bound(ast)
+    Resolver.resolver(ast)
+
+    if any(a is not b for a, b in zip(bound(ast), expected)) or None in expected:
+      raise AssertionError("the resolver binds names differently from the symbol tables")
+
+    chains = best(lambda: Chains.resolver(ast))
+    resolver = best(lambda: Resolver.resolver(ast))
+    checked = best(lambda: check(ast))
+
+    print(f"{depth:>6} {len(expected):>7} {chains * 1e3:>12.1f} {resolver * 1e3:>14.1f} "
+          f"{chains / resolver:>6.2f} {checked * 1e3:>11.1f}")
+
+if __name__ == '__main__':
+  main()
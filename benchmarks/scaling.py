@@ -0,0 +1,62 @@
+'''
+Parse time versus program size: N top-level declarations, one function
+with N statements and one print with N arguments, for N growing by
+tenfold steps. The source is lexed into a TokenBuffer first, so only
+parsing is timed; with linear-time list construction the time per item
+stays flat as N grows.
+
+usage: python benchmarks/scaling.py [largest N]
+'''
+import gc
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.lexer.buffer  import TokenBuffer
+from core.lexer.lexer   import Lexer
+from core.parser.parser import Parser
+from core.session       import CompilerSession
+
+CASES = {
+  'decls': lambda n: "".join(f"g{i}: integer = {i};\n" for i in range(n)),
+  'stmts': lambda n: "f: function void () = {\n" + "".join(f"  x = x + {i};\n" for i in range(n)) + "};\n",
+  'args' : lambda n: "f: function void () = {\n  print " + ", ".join(str(i) for i in range(n)) + ";\n};\n",
+}
+
+def run(source):
+  with CompilerSession('<bench>', file = io.StringIO()) as session:
+    tokens = TokenBuffer.scan(source, Lexer())
+
+    gc.collect()
+    gc.disable()
+
+    try:
+      start = time.perf_counter()
+      Parser().parse(iter(tokens))
+      elapsed = time.perf_counter() - start
+    finally:
+      gc.enable()
+
+  if session.errors:
+    raise AssertionError("the generated program does not parse")
+
+  return len(tokens), elapsed
+
+def main():
+  largest = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+
+  print(f"{'case':>6} {'N':>9} {'tokens':>9} {'parse (s)':>10} {'us/item':>8}")
+
+  for name, generate in CASES.items():
+    n = 1000
+
+    while n <= largest:
+      tokens, elapsed = run(generate(n))
+      print(f"{name:>6} {n:>9} {tokens:>9} {elapsed:>10.3f} {elapsed / n * 1e6:>8.1f}")
+      n *= 10
+
+if __name__ == '__main__':
+  main()
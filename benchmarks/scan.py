@@ -0,0 +1,74 @@
+'''
+Throughput of the --scan output formats: streaming JSONL, the binary
+token format and the rich table, each written to a file from a
+memory-mapped source as main.py does. Peak traced memory is measured
+in a separate run, since tracing slows allocation down. The table is
+only built for sources up to TABLE tokens.
+
+usage: python benchmarks/scan.py [decls ...]
+'''
+import gc
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.programs import program
+from core.cli            import read_source
+from core.lexer.lexer    import tokenize
+from core.session        import CompilerSession
+
+TABLE = 20000
+
+def write(path, format, output):
+  with read_source(path) as source, CompilerSession('<bench>', file = io.StringIO()):
+    with open(output, 'wb' if format == 'binary' else 'w') as file:
+      tokenize(source, format, file)
+
+def measure(path, format, output):
+  start = time.perf_counter()
+  write(path, format, output)
+  elapsed = time.perf_counter() - start
+
+  gc.collect()
+  tracemalloc.start()
+  write(path, format, output)
+  _, peak = tracemalloc.get_traced_memory()
+  tracemalloc.stop()
+
+  return elapsed, peak, os.path.getsize(output)
+
+def main():
+  sizes = [int(n) for n in sys.argv[1:]] or [200, 2000, 10000]
+
+  print(f"{'decls':>6} {'tokens':>8} {'format':>7} {'time (ms)':>10} {'tok/s':>11} {'output (KB)':>12} "
+        f"{'B/token':>8} {'peak (MB)':>10}")
+
+  with tempfile.TemporaryDirectory() as tmp:
+    for decls in sizes:
+      path = os.path.join(tmp, 'program.bminor')
+      output = os.path.join(tmp, 'tokens')
+
+      with open(path, 'w', encoding = 'utf-8') as file:
+        file.write(program(decls))
+
+      write(path, 'jsonl', output)
+
+      with open(output) as file:
+        tokens = sum(1 for _ in file)
+
+      for format in ('jsonl', 'binary', 'table'):
+        if format == 'table' and tokens > TABLE:
+          continue
+
+        elapsed, peak, size = measure(path, format, output)
+
+        print(f"{decls:>6} {tokens:>8} {format:>7} {elapsed * 1000:>10.1f} {tokens / elapsed:>11,.0f} "
+              f"{size / 1024:>12.0f} {size / tokens:>8.1f} {peak / 2**20:>10.1f}")
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,57 @@
+'''
+Throughput of the hand-written Scanner versus the SLY Lexer.
+
+Besides a large generated program, the inputs include pathological
+cases: thousands of comments, one very long string, unterminated
+comment openers and runs of escaped quotes that never close. The last
+two make the SLY rules rescan the rest of the file at every attempt.
+SLY counts differ on comments: its greedy rule turns everything from
+the first '/*' to the last '*/' into a single comment.
+
+usage: python benchmarks/scanner.py [decls] [size]
+'''
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.programs import program
+from core.lexer.lexer    import Lexer
+from core.lexer.scanner  import Scanner
+from core.session        import CompilerSession
+
+def inputs(decls, size):
+  yield 'program', program(decls)
+  yield 'comments', "".join(f"x{i}: integer = {i}; /* comment {i} */\n" for i in range(size))
+  yield 'long string', 's: string = "' + 'abc\\n' * (size * 50) + '";\n'
+  yield 'open comments', "a /*\n" * size
+  yield 'open strings', '"' + ('\\"' + 'y' * 60) * (size // 5) + '\\\n'
+
+def run(lexer, source):
+  session = CompilerSession('<bench>', file = io.StringIO())
+
+  with session:
+    start = time.perf_counter()
+    count = sum(1 for _ in lexer.tokenize(source))
+    elapsed = time.perf_counter() - start
+
+  return count, elapsed
+
+def main():
+  decls = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+  size = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+
+  print(f"{'input':>14} {'size (KB)':>10} {'SLY tokens':>11} {'SLY (ms)':>10} {'SLY (tok/s)':>12} "
+        f"{'tokens':>8} {'scanner (ms)':>13} {'scanner (tok/s)':>16}")
+
+  for name, source in inputs(decls, size):
+    tokens, sly = run(Lexer(), source)
+    count, hand = run(Scanner(), source)
+
+    print(f"{name:>14} {len(source) / 1024:>10.0f} {tokens:>11} {sly * 1000:>10.1f} {tokens / sly:>12,.0f} "
+          f"{count:>8} {hand * 1000:>13.1f} {count / hand:>16,.0f}")
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,49 @@
+'''
+Compare startup time with and without the parser table cache.
+
+usage: python benchmarks/startup.py [runs]
+
+Each sample is a fresh interpreter, so the numbers include the
+interpreter itself and every import done by the compiler.
+'''
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def sample(code, env, runs):
+  times = []
+
+  for _ in range(runs):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-c', code], cwd = ROOT, env = env, check = True)
+    times.append(time.perf_counter() - start)
+
+  return statistics.median(times) * 1000
+
+def main():
+  runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+
+  with tempfile.TemporaryDirectory() as cache:
+    env = dict(os.environ, BMINOR_CACHE_DIR = cache)
+    cold = dict(env, BMINOR_NO_CACHE = '1')
+
+    # Populate the cache once before timing warm starts
+    subprocess.run([sys.executable, '-c', 'import core.parser.parser'], cwd = ROOT, env = env, check = True)
+
+    cases = [
+      ('import parser', 'import core.parser.parser'),
+      ('parse sum.bminor', "from core.parser.parser import parse; parse(open('examples/sum.bminor').read())"),
+    ]
+
+    print(f"{'case':<20} {'cold (ms)':>10} {'cached (ms)':>12}")
+
+    for label, code in cases:
+      print(f"{label:<20} {sample(code, cold, runs):>10.1f} {sample(code, env, runs):>12.1f}")
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,68 @@
+'''
+Memory held by the tokens of a large program: a list of SLY Token
+objects versus a TokenBuffer, plus the time to build each and to parse
+from it.
+
+usage: python benchmarks/tokens.py [decls ...]
+'''
+import gc
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.programs import program
+from core.lexer.lexer    import Lexer
+from core.lexer.buffer   import TokenBuffer
+from core.parser.parser  import Parser
+from core.session        import CompilerSession
+
+def measure(build):
+  start = time.perf_counter()
+  build()
+  elapsed = time.perf_counter() - start
+
+  # Traced separately: tracemalloc slows allocation down
+  gc.collect()
+  tracemalloc.start()
+  tokens = build()
+  size, _ = tracemalloc.get_traced_memory()
+  tracemalloc.stop()
+
+  return tokens, size, elapsed
+
+def parse(tokens):
+  start = time.perf_counter()
+
+  with CompilerSession('<bench>', file = io.StringIO()):
+    Parser().parse(iter(tokens))
+
+  return time.perf_counter() - start
+
+def main():
+  sizes = [int(n) for n in sys.argv[1:]] or [2000, 10000]
+
+  print(f"{'decls':>6} {'tokens':>8} {'objects (MB)':>13} {'buffer (MB)':>12} {'B/token':>14} "
+        f"{'build (ms)':>16} {'parse (ms)':>16}")
+
+  for decls in sizes:
+    source = program(decls)
+
+    with CompilerSession('<bench>', file = io.StringIO()):
+      objects, objects_size, objects_time = measure(lambda: list(Lexer().tokenize(source)))
+      buffer, buffer_size, buffer_time = measure(lambda: TokenBuffer.scan(source, Lexer()))
+
+    count = len(buffer)
+    objects_parse = parse(objects)
+    buffer_parse = parse(buffer)
+
+    print(f"{decls:>6} {count:>8} {objects_size / 2**20:>13.1f} {buffer_size / 2**20:>12.1f} "
+          f"{f'{objects_size / count:.0f} / {buffer_size / count:.1f}':>14} "
+          f"{f'{objects_time * 1000:.0f} / {buffer_time * 1000:.0f}':>16} "
+          f"{f'{objects_parse * 1000:.0f} / {buffer_parse * 1000:.0f}':>16}")
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,170 @@
+'''
+Interned type objects against type names. First the operator tables
+indexed by type id are checked to give, for every operator and every
+pair of primitive types, the result the name-keyed capability tables
+give. Then, over the expressions of large checked programs, each of
+the checker's steps is timed both ways: finding the result of every
+binary operator, comparing every call's arguments with the callee's
+params, and building the LLVM type of every function, which the code
+generator used to do for each function and now takes from a cache.
+Last, the whole check of an ordinary program with as many declarations.
+
+usage: python benchmarks/typecheck.py [decls ...]
+'''
+import gc
+import io
+import itertools
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llvmlite import ir
+
+import core.semantic.typesys as typesys
+
+from benchmarks.programs   import expressions, program
+from core.codegen.codegen  import llvm_type, _typemap
+from core.parser.model     import *
+from core.parser.parser    import parse
+from core.semantic.checker import Check
+from core.session          import CompilerSession
+
+REPEAT = 5
+
+def parity():
+  names = sorted(typesys.typenames)
+  operators = {op for _, op, _ in typesys._bin_ops}
+
+  for left, op, right in itertools.product(names, operators, names):
+    expected = typesys._bin_ops.get((left, op, right))
+    found = typesys.check_binop(op, typesys.lookup_type(left), typesys.lookup_type(right))
+
+    if found is not typesys.lookup_type(expected):
+      raise AssertionError(f"{left} {op} {right} gives {found}, not {expected}")
+
+  for (op, operand), expected in typesys._unary_ops.items():
+    if typesys.check_unaryop(op, typesys.lookup_type(operand)) is not typesys.lookup_type(expected):
+      raise AssertionError(f"{op}{operand} does not give {expected}")
+
+def nodes(ast, cls):
+  found = []
+  stack = [ast]
+
+  while stack:
+    node = stack.pop()
+
+    if isinstance(node, cls):
+      found.append(node)
+
+    if isinstance(node, Node):
+      stack.extend(values(node))
+    elif isinstance(node, (list, tuple)):
+      stack.extend(node)
+
+  return found
+
+# Type of a checked expression by name, and as a type object: literals
+# keep the name of theirs
+def named(n):
+  return n.type if isinstance(n, Literal) else n.type.name
+
+def typed(n):
+  return typesys.lookup_type(n.type) if isinstance(n, Literal) else getattr(n, 'type', None)
+
+# check_binop as it was, on type names
+def check_names(op, left_type, right_type):
+  return typesys._bin_ops.get((left_type, op, right_type))
+
+def best(run):
+  result = float('inf')
+
+  for _ in range(REPEAT):
+    gc.collect()
+    start = time.perf_counter()
+    run()
+    result = min(result, time.perf_counter() - start)
+
+  return result
+
+def main():
+  sizes = [int(n) for n in sys.argv[1:]] or [500, 2000]
+  parity()
+
+  print(f"{'decls':>6} {'step':>10} {'count':>7} {'names (ms)':>11} {'types (ms)':>11} {'ratio':>6}")
+
+  for decls in sizes:
+    # The generated expressions use '^', which no type has, so some of
+    # them fail to check; only operators on operands that did are timed
+    with CompilerSession('<bench>', file = io.StringIO()):
+      ast = parse(expressions(decls))
+      Check.checker(ast)
+
+    binops = [n for n in nodes(ast, BinOper) if typed(n.left) not in (None, typesys.INVALID)
+              and typed(n.right) not in (None, typesys.INVALID)]
+    calls = [n for n in nodes(ast, FuncCall) if hasattr(n, 'type')]
+    functions = nodes(ast, FuncDecl)
+
+    # What the checker compared before, and what it compares now
+    named_binops = [(n.oper, named(n.left), named(n.right)) for n in binops]
+    typed_binops = [(n.oper, typed(n.left), typed(n.right)) for n in binops]
+    named_calls = [([named(arg) for arg in n.args], n.symbol.params) for n in calls]
+    typed_calls = [([typed(arg) for arg in n.args], n.symbol.declared_type.params) for n in calls]
+
+    def names_binops():
+      for op, left, right in named_binops:
+        check_names(op, left, right)
+
+    def types_binops():
+      check = typesys.check_binop
+
+      for op, left, right in typed_binops:
+        check(op, left, right)
+
+    def names_calls():
+      for args, params in named_calls:
+        for i in range(0, len(args)):
+          if args[i] != params[i].type:
+            break
+
+    def types_calls():
+      for args, params in typed_calls:
+        for i in range(0, len(args)):
+          if args[i] is not params[i].base:
+            break
+
+    def names_functions():
+      for n in functions:
+        ir.FunctionType(_typemap[n.type], [_typemap[p.type] for p in n.params])
+
+    def types_functions():
+      for n in functions:
+        llvm_type(n.declared_type)
+
+    steps = [
+      ('operators', len(binops), names_binops, types_binops),
+      ('calls', len(calls), names_calls, types_calls),
+      ('llvm', len(functions), names_functions, types_functions),
+    ]
+
+    for step, count, names, types in steps:
+      before, after = best(names), best(types)
+      print(f"{decls:>6} {step:>10} {count:>7} {before * 1e3:>11.2f} {after * 1e3:>11.2f} {before / after:>6.2f}")
+
+    # Reporting errors would dominate the whole check, so it is timed on
+    # an ordinary program, which has none
+    with CompilerSession('<bench>', file = io.StringIO()):
+      ast = parse(program(decls))
+
+    def check():
+      with CompilerSession('<bench>', file = io.StringIO()) as session:
+        Check.checker(ast)
+
+      if session.errors:
+        raise AssertionError("the generated program does not check")
+
+    print(f"{decls:>6} {'check':>10} {len(ast.body):>7} {'':>11} {best(check) * 1e3:>11.2f}")
+
+if __name__ == '__main__':
+  main()
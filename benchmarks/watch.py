@@ -0,0 +1,46 @@
+'''
+Rebuild latency of watch mode versus a full compilation.
+
+usage: python benchmarks/watch.py [decls ...]
+'''
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.programs import program
+from core.session        import CompilerSession
+from core.watch          import IncrementalCompiler
+
+def timed(compiler, source):
+  start = time.perf_counter()
+  compiler.rebuild(source, CompilerSession('<bench>', file = io.StringIO()))
+  return (time.perf_counter() - start) * 1000
+
+def main():
+  sizes = [int(n) for n in sys.argv[1:]] or [500, 2000]
+
+  print(f"{'decls':>6} {'full (ms)':>10} {'edit body (ms)':>15} {'insert line (ms)':>17} {'no change (ms)':>15}")
+
+  for size in sizes:
+    source = program(size)
+    compiler = IncrementalCompiler('<bench>')
+    full = timed(compiler, source)
+
+    # Change one function body in the middle of the file
+    middle = source.index('x: integer = a + b * 2', len(source) // 2)
+    edited = source[:middle] + 'x: integer = a + b * 3' + source[middle + 22:]
+    edit = timed(compiler, edited)
+
+    # Shift every declaration down by one line
+    shifted = '\n' + edited
+    insert = timed(compiler, shifted)
+
+    same = timed(compiler, shifted)
+
+    print(f"{size:>6} {full:>10.1f} {edit:>15.1f} {insert:>17.1f} {same:>15.1f}")
+
+if __name__ == '__main__':
+  main()
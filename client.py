@@ -0,0 +1,4 @@
+import core.client as client
+
+if __name__ == "__main__":
+  client.main()
\ No newline at end of file
@@ -0,0 +1,120 @@
+'''
+Batch compilation of many B-Minor files across a process pool.
+
+Directories are searched recursively for *.bminor files. Every worker
+imports the compiler stages once (see core.worker.warm_up), compiles
+the files it is handed, and writes the result under the output
+directory, mirroring each file's path relative to the directory it
+was found in. Two files that would be written to the same output are
+refused before anything is compiled. Results are reported as soon as
+each file finishes.
+'''
+import os
+import sys
+import time
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from core.worker import warm_up, compile_request
+
+from rich.markup import escape
+from rich        import print
+
+EXTENSIONS = {
+  'scan'   : '.scan',
+  'sym'    : '.sym',
+  'codegen': '.ll',
+}
+
+def collect(paths):
+  '''
+  Expand the given files and directories into (path, output name) pairs.
+  '''
+  for path in paths:
+    if os.path.isdir(path):
+      for root, dirs, files in os.walk(path):
+        dirs.sort()
+
+        for name in sorted(files):
+          if name.endswith('.bminor'):
+            full = os.path.join(root, name)
+            yield full, os.path.relpath(full, path)
+    else:
+      yield path, os.path.basename(path)
+
+def targets(files, mode, output):
+  '''
+  Map each output file to the source file compiled into it. Files that
+  would share an output are reported, and None returned.
+  '''
+  found = {}
+  clashes = 0
+
+  for path, name in files:
+    target = os.path.join(output, os.path.splitext(name)[0] + EXTENSIONS[mode])
+    other = found.setdefault(target, path)
+
+    # The same file given twice is compiled once
+    if os.path.realpath(other) != os.path.realpath(path):
+      clashes += 1
+      print(f"[red][bold]Error:[/] {escape(path)} and {escape(other)} would both be written to {escape(target)}[/]", file = sys.stderr)
+
+  return None if clashes else found
+
+def compile_file(path, target, mode, options = None):
+  start = time.perf_counter()
+
+  try:
+    with open(path, encoding = 'utf-8') as file:
+      source = file.read()
+  except OSError as err:
+    return {'output': f"{err}\n", 'status': 1, 'errors': 0, 'time': 0}
+
+  result = compile_request({'mode': mode, 'filename': path, 'source': source, 'options': options or {}})
+
+  if result['status'] == 0 and result['errors'] == 0:
+    os.makedirs(os.path.dirname(target) or '.', exist_ok = True)
+
+    with open(target, 'w', encoding = 'utf-8') as file:
+      file.write(result['output'])
+
+    result['output'] = ''
+
+  result['time'] = time.perf_counter() - start
+  return result
+
+def run(paths, mode, output, jobs = None, options = None):
+  '''
+  Compile every file under paths and return the number of failures.
+  '''
+  jobs = jobs or os.cpu_count()
+  files = targets(collect(paths), mode, output)
+
+  if files is None:
+    return 1
+
+  failed = 0
+  start = time.perf_counter()
+
+  with ProcessPoolExecutor(max_workers = jobs, initializer = warm_up) as pool:
+    futures = {}
+
+    for target, path in files.items():
+      futures[pool.submit(compile_file, path, target, mode, options)] = (path, target)
+
+    for future in as_completed(futures):
+      path, target = futures[future]
+      result = future.result()
+      elapsed = f"[dim]({result['time'] * 1000:.0f} ms)[/]"
+
+      if result['status'] or result['errors']:
+        failed += 1
+        print(f"[red][bold]FAIL[/] {escape(path)}[/] {elapsed}")
+        sys.stdout.write(result['output'])
+      else:
+        print(f"[green][bold]ok[/][/]   {escape(path)} -> [blue]{escape(target)}[/] {elapsed}")
+
+  total = time.perf_counter() - start
+  print(f"\n[bold]{len(files)} files, {failed} failed in {total:.2f} s using {jobs} workers[/]")
+
+  return failed
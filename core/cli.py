@@ -1,5 +1,9 @@
 '''
-usage: main.py [-h] [-v] [--scan | --dot | --sym] [filename]
+usage: main.py [-h] [-v] [--scan | --dot | --sym] [--scanner] [--token-buffer]
+               [--format {jsonl,binary,table}] [--descent] [--ast-cache]
+               [--depth N] [--function NAME] [--tree {rich,text,none}] [--pdf]
+               [--batch PATH [PATH ...] | --watch PATH [PATH ...] | --lsp]
+               [-o PATH] [-j N] [filename]
 
 Compiler for B-Minor programs
 
@@ -12,20 +16,62 @@ Formatting options:
   --scan          Store output of lexer
   --dot           Generate AST graph as DOT format
   --sym           Dump the symbol table
+  --scanner       Use the hand-written scanner instead of the SLY lexer
+  --token-buffer  Keep tokens in a compact array-backed buffer
+  --format {jsonl,binary,table}
+                  Token format written by --scan (default: jsonl)
+  --descent       Use the hand-written parser instead of the SLY parser
+  --ast-cache     Reuse the checked AST cached next to an unchanged source
+  --depth N       Only expand the --dot graph and tree N levels deep
+  --function NAME
+                  Only show the subtree of function NAME with --dot
+  --tree {rich,text,none}
+                  How --dot prints the AST tree (default: rich)
+  --pdf           Also render the --dot graph to PDF with Graphviz
+
+Build options:
+  --batch PATH [PATH ...]
+                  Compile every .bminor file in the given files and directories
+  --watch PATH [PATH ...]
+                  Recompile the given files and directories incrementally on change
+  --lsp           Run a language server over stdio
+  -o, --output PATH
+                  Directory where batch and watch outputs are written
+                  (default: out), or the file --scan writes tokens to
+                  or --dot writes the graph to (default: out/ast.dot)
+  -j, --jobs N    Number of worker processes used by --batch
 '''
 import argparse
+import contextlib
+import mmap
 import sys
 import os
 
-from core.parser.dot_render import ASTPrinter
-from core.semantic.checker  import Check
-from core.codegen.codegen   import CodeGenerator
-from core.parser.parser     import parse, ast_to_tree
-from core.lexer.lexer       import tokenize
-from core.errors            import errors_detected
+from core.errors  import errors_detected
+from core.session import CompilerSession, current_session
 
 from rich import print
 
+# Each mode imports only the stages it runs, so '--scan' and '--sym'
+# never pay for loading llvmlite or graphviz.
+
+@contextlib.contextmanager
+def read_source(filename):
+  '''
+  Map filename into memory so the lexer can stream it without reading
+  the whole text into a string. Files that cannot be mapped (empty
+  files, pipes) are read as usual.
+  '''
+  with open(filename, 'rb') as file:
+    try:
+      buffer = mmap.mmap(file.fileno(), 0, access = mmap.ACCESS_READ)
+    except (ValueError, OSError):
+      yield file.read().decode('utf-8')
+      return
+
+    with buffer:
+      yield buffer
+
 def usage(exit_code = 1):
   print("[blue]Usage: main.py --option filename[/blue]", file = sys.stderr)
   sys.exit(exit_code)
@@ -73,67 +119,324 @@ def parse_args():
     help='Dump the symbol table'
   )
 
+  fgroup.add_argument(
+    '--scanner',
+    action = 'store_true',
+    default = False,
+    help = 'Use the hand-written scanner instead of the SLY lexer'
+  )
+
+  fgroup.add_argument(
+    '--token-buffer',
+    action = 'store_true',
+    default = False,
+    help = 'Keep tokens in a compact array-backed buffer'
+  )
+
+  fgroup.add_argument(
+    '--format',
+    choices = ['jsonl', 'binary', 'table'],
+    default = 'jsonl',
+    help = 'Token format written by --scan (default: jsonl)'
+  )
+
+  fgroup.add_argument(
+    '--descent',
+    action = 'store_true',
+    default = False,
+    help = 'Use the hand-written parser instead of the SLY parser'
+  )
+
+  fgroup.add_argument(
+    '--ast-cache',
+    action = 'store_true',
+    default = False,
+    help = 'Reuse the checked AST cached next to an unchanged source'
+  )
+
+  fgroup.add_argument(
+    '--depth',
+    type = int,
+    default = None,
+    metavar = 'N',
+    help = 'Only expand the --dot graph and tree N levels deep'
+  )
+
+  fgroup.add_argument(
+    '--function',
+    type = str,
+    default = None,
+    metavar = 'NAME',
+    help = 'Only show the subtree of function NAME with --dot'
+  )
+
+  fgroup.add_argument(
+    '--tree',
+    choices = ['rich', 'text', 'none'],
+    default = 'rich',
+    help = 'How --dot prints the AST tree (default: rich)'
+  )
+
+  fgroup.add_argument(
+    '--pdf',
+    action = 'store_true',
+    default = False,
+    help = 'Also render the --dot graph to PDF with Graphviz'
+  )
+
+  bgroup = cli.add_argument_group('Build options')
+  bmutex = bgroup.add_mutually_exclusive_group()
+
+  bmutex.add_argument(
+    '--batch',
+    type = str,
+    nargs = '+',
+    metavar = 'PATH',
+    help = 'Compile every .bminor file in the given files and directories'
+  )
+
+  bmutex.add_argument(
+    '--watch',
+    type = str,
+    nargs = '+',
+    metavar = 'PATH',
+    help = 'Recompile the given files and directories incrementally on change'
+  )
+
+  bmutex.add_argument(
+    '--lsp',
+    action = 'store_true',
+    default = False,
+    help = 'Run a language server over stdio'
+  )
+
+  bgroup.add_argument(
+    '-o', '--output',
+    type = str,
+    default = None,
+    metavar = 'PATH',
+    help = 'Directory where batch and watch outputs are written (default: out), '
+           'or the file --scan writes tokens to or --dot writes the graph to (default: out/ast.dot)'
+  )
+
+  bgroup.add_argument(
+    '-j', '--jobs',
+    type = int,
+    default = None,
+    metavar = 'N',
+    help = 'Number of worker processes used by --batch'
+  )
+
   return cli.parse_args()
 
+def mode(args):
+  if args.scan:
+    return 'scan'
+  elif args.dot:
+    return 'dot'
+  elif args.sym:
+    return 'sym'
+  
+  return 'codegen'
+
+def options(args):
+  '''
+  CompilerSession options selected on the command line.
+  '''
+  return {'scanner': args.scanner, 'token_buffer': args.token_buffer, 'scan_format': args.format,
+          'descent': args.descent, 'ast_cache': args.ast_cache, 'dot_depth': args.depth,
+          'dot_function': args.function, 'dot_tree': args.tree, 'dot_pdf': args.pdf}
+
+def diagnostics(args):
+  '''
+  Where the session prints diagnostics: stderr while --scan streams
+  tokens, so they never end up in the token stream.
+  '''
+  return sys.stderr if args.scan and args.format != 'table' else None
+
+def scan(filename, source, output = None):
+  from core.lexer.lexer import tokenize
+
+  format = current_session().options.get('scan_format', 'jsonl')
+
+  if output is None:
+    tokenize(source, format)
+    return
+
+  with open(output, 'wb' if format == 'binary' else 'w', encoding = None if format == 'binary' else 'utf-8') as file:
+    tokenize(source, format, file)
+
+def dot(filename, source, output = None):
+  from core.parser.model      import FuncDecl
+  from core.parser.parser     import parse, ast_to_tree, write_tree
+  from core.parser.dot_render import ASTPrinter
+
+  options = current_session().options
+  depth = options.get('dot_depth')
+  function = options.get('dot_function')
+
+  print(f"[bold]Source code: [magenta]{filename}[/]\n")
+  ast = parse(source)
+
+  if errors_detected() < 1:
+    if function is not None:
+      ast = next((decl for decl in ast.body if isinstance(decl, FuncDecl) and decl.name == function), None)
+
+      if ast is None:
+        print(f"[red]Error: no function named '{function}'[/red]", file = sys.stderr)
+        sys.exit(2)
+
+    match options.get('dot_tree', 'rich'):
+      case 'rich':
+        print(ast_to_tree(ast, depth=depth))
+      case 'text':
+        write_tree(ast, sys.stdout, depth=depth)
+
+    # The graph is written out as it is visited; Graphviz only runs when
+    # a PDF is asked for, since laying out a large graph takes minutes
+    output_path = output or os.path.join("out", "ast.dot")
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+
+    with open(output_path, "w", encoding="utf-8") as file:
+      ASTPrinter.render(ast, file, depth)
+
+    if options.get('dot_pdf'):
+      import graphviz
+
+      pdf_path = os.path.splitext(output_path)[0] + ".pdf"
+      graphviz.render("dot", "pdf", output_path, outfile=pdf_path)
+      print(f"\n[bold]The AST graph as dot format was created as [blue]{output_path}[/] and it can be viewed in [blue]{pdf_path}[/]\n")
+    else:
+      print(f"\n[bold]The AST graph as dot format was created as [blue]{output_path}[/]\n")
+
+def cached(filename, source):
+  '''
+  The checked AST cached for source when --ast-cache is on, else None.
+  '''
+  if not current_session().options.get('ast_cache'):
+    return None
+
+  from core.parser.cache import load
+
+  return load(filename, source)
+
+def checked(filename, source, ast):
+  '''
+  Cache ast, which parsed and checked cleanly, when --ast-cache is on.
+  '''
+  if current_session().options.get('ast_cache'):
+    from core.parser.cache import store
+
+    store(filename, source, ast)
+
+def sym(filename, source):
+  from core.parser.parser    import parse
+  from core.semantic.checker import Check
+
+  print(f"[bold]Source code: [magenta]{filename}[/]\n")
+
+  # The symbol tables are rebuilt by checking even a cached AST
+  ast = cached(filename, source)
+  hit = ast is not None
+
+  if not hit:
+    ast = parse(source)
+
+  if ast is not None and errors_detected() < 1:
+    env = Check.checker(ast)
+
+    if errors_detected() < 1:    
+      if not hit:
+        checked(filename, source, ast)
+
+      print(f"[bold green]Symbol Tables:[/bold green]")
+      env.print()
+
+def codegen(filename, source):
+  from core.parser.parser     import parse
+  from core.semantic.checker  import Check
+  from core.semantic.resolver import Resolver
+  from core.codegen.codegen   import CodeGenerator
+
+  # A cached AST already parsed and checked without errors, but its
+  # names still need binding
+  ast = cached(filename, source)
+
+  if ast is not None:
+    Resolver.resolver(ast)
+  else:
+    ast = parse(source)
+
+    if ast is not None and errors_detected() < 1:
+      env = Check.checker(ast)
+
+      if errors_detected() < 1:
+        checked(filename, source, ast)
+
+  if errors_detected() < 1:
+    cg = CodeGenerator()
+    cg.visit(ast)
+
+    print(cg.module)
+
+MODES = {
+  'scan'   : scan,
+  'dot'    : dot,
+  'sym'    : sym,
+  'codegen': codegen,
+}
+
+def run_mode(mode, filename, source, output = None):
+  '''
+  Compile source in mode; --scan and --dot write to output if given.
+  '''
+  if mode in ('scan', 'dot'):
+    MODES[mode](filename, source, output)
+  else:
+    MODES[mode](filename, source)
+
 def main():
   if len(sys.argv) == 1:
     usage()
 
   args = parse_args()
 
-  if not args.filename:
-    print('[red]Error: missing filename[/red]', file = sys.stderr)
-    sys.exit(2)
+  if args.batch:
+    from core.batch import run
 
-  filename = args.filename
+    if args.dot:
+      print('[red]Error: --dot cannot be combined with --batch[/red]', file = sys.stderr)
+      sys.exit(2)
 
-  with open(filename, encoding = 'utf-8') as file:
-    source = file.read()
+    if args.scan and args.format == 'binary':
+      print('[red]Error: --format binary cannot be combined with --batch[/red]', file = sys.stderr)
+      sys.exit(2)
 
-    if args.scan:
-      tokenize(source)
-    elif args.dot:
-      print(f"[bold]Source code: [magenta]{filename}[/]\n")
-      ast = parse(source)
+    sys.exit(1 if run(args.batch, mode(args), args.output or 'out', args.jobs, options(args)) else 0)
 
-      if errors_detected() < 1:
-        tree = ast_to_tree(ast)
-        print(tree)
+  if args.watch:
+    from core.watch import watch
 
-        dot = ASTPrinter.render(ast)
-        output_path = os.path.join("out", "ast")
-        dot.render(filename=output_path, format="pdf", cleanup=True)
-        dot.render(filename=output_path, format="dot", cleanup=True)
+    if mode(args) != 'codegen':
+      print('[red]Error: --watch only supports code generation[/red]', file = sys.stderr)
+      sys.exit(2)
 
-        print(f"\n[bold]The AST graph as dot format was created as [blue]./out/ast.dot[/] and it can be viewed in [blue]./out/ast.pdf[/]\n")
-    elif args.sym:
-      print(f"[bold]Source code: [magenta]{filename}[/]\n")
+    watch(args.watch, args.output or 'out', options(args))
+    return
 
-      try:
-        ast = parse(source)
-      except:
-        pass
+  if args.lsp:
+    from core.lsp import main as lsp
 
-      if errors_detected() < 1:
-        env = Check.checker(ast)
+    lsp()
 
-        if errors_detected() < 1:    
-          print(f"[bold green]Symbol Tables:[/bold green]")
-          env.print()
-    else:
-      try:
-        ast = parse(source)
-      except:
-        pass
-        
-      if errors_detected() < 1:
-        env = Check.checker(ast)
+  if not args.filename:
+    print('[red]Error: missing filename[/red]', file = sys.stderr)
+    sys.exit(2)
 
-        if errors_detected() < 1:    
-          cg = CodeGenerator()
-          cg.visit(ast)
+  filename = args.filename
 
-          print(cg.module)
+  with read_source(filename) as source, CompilerSession(filename, file = diagnostics(args), **options(args)):
+    run_mode(mode(args), filename, source, args.output)
 
 if __name__ == '__main__':
   main()
\ No newline at end of file
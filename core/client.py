@@ -0,0 +1,92 @@
+'''
+Thin client for core.server. Accepts exactly the same arguments as
+main.py, sends the program to a running server and prints its reply.
+When no server is listening the file is compiled in-process instead.
+
+The client deliberately avoids importing asyncio or any compiler
+stage, since its own startup is paid on every invocation.
+'''
+import json
+import os
+import shutil
+import socket
+import struct
+import sys
+
+from core         import cli
+from core.session import CompilerSession
+
+from rich import print
+
+# Length prefix of every message exchanged with core.server
+HEADER = struct.Struct('!I')
+
+def socket_path():
+  return os.environ.get('BMINOR_SOCKET') or f"/tmp/bminor-{os.getuid()}.sock"
+
+def recv_exactly(sock, size):
+  data = bytearray()
+
+  while len(data) < size:
+    chunk = sock.recv(size - len(data))
+
+    if not chunk:
+      raise ConnectionError('server closed the connection')
+
+    data += chunk
+
+  return bytes(data)
+
+def request(message, path = None):
+  data = json.dumps(message).encode('utf-8')
+
+  with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+    sock.connect(path or socket_path())
+    sock.sendall(HEADER.pack(len(data)) + data)
+
+    size, = HEADER.unpack(recv_exactly(sock, HEADER.size))
+    return json.loads(recv_exactly(sock, size))
+
+def main():
+  if len(sys.argv) == 1:
+    cli.usage()
+
+  args = cli.parse_args()
+
+  # Batch, watch and language server modes are long-running and run
+  # in-process, and so do scans written to a file or as binary
+  if args.batch or args.watch or args.lsp or (args.scan and (args.output or args.format == 'binary')):
+    cli.main()
+    return
+
+  if not args.filename:
+    print('[red]Error: missing filename[/red]', file = sys.stderr)
+    sys.exit(2)
+
+  with open(args.filename, encoding = 'utf-8') as file:
+    source = file.read()
+
+  message = {
+    'mode'    : cli.mode(args),
+    'filename': args.filename,
+    'source'  : source,
+    'options' : cli.options(args),
+    'output'  : args.output,
+    'cwd'     : os.getcwd(),
+    'color'   : sys.stdout.isatty(),
+    'width'   : shutil.get_terminal_size().columns if sys.stdout.isatty() else None,
+  }
+
+  try:
+    response = request(message)
+  except (FileNotFoundError, ConnectionRefusedError):
+    with CompilerSession(args.filename, file = cli.diagnostics(args), **message['options']):
+      cli.run_mode(message['mode'], args.filename, source, args.output)
+
+    return
+
+  sys.stdout.write(response['output'])
+  sys.exit(response['status'])
+
+if __name__ == '__main__':
+  main()
@@ -1,7 +1,11 @@
 from core.codegen.operations import * 
 from core.parser.model       import *
+from core.semantic.typesys   import ArrayType, FunctionType
+from core.session            import current_session
 from llvmlite                import ir
 
+from array import array
+
 # LLVM types corresponding to the B-Minor types
 int_type   = ir.IntType(32)
 float_type = ir.DoubleType()
@@ -17,11 +21,39 @@ _typemap = {
   "void"   : void_type
 }
 
+# Bytes of each element of an array in memory
+_itemsize = {"integer": 4, "float": 8, "boolean": 1, "char": 1}
+
+_llvm = {}   # B-Minor type -> LLVM type, built once each
+
+def llvm_type(t):
+  '''
+  LLVM type of the B-Minor type t. A function takes the base type of
+  each param, as it always has: arrays are passed by element.
+  '''
+  ty = _llvm.get(t)
+
+  if ty is None:
+    if isinstance(t, FunctionType):
+      ty = ir.FunctionType(llvm_type(t.base), [llvm_type(param.base) for param in t.params])
+    elif isinstance(t, ArrayType):
+      ty = llvm_type(t.base).as_pointer() if t.size is None else ir.ArrayType(llvm_type(t.base), t.size)
+    else:
+      ty = _typemap[t.name]
+
+    _llvm[t] = ty
+
+  return ty
+
 class CodeGenerator(Visitor):
   def __init__(self):
     self.module = ir.Module(name="bminor_module")
     self.builder = None
     self.symbols = {}
+    self.globals = {}
+    self.locals = {}    # symbol id -> alloca of a local variable, array or param
+    self.strings = {}   # pool id -> constant holding the string
+    self.tables = {}    # name -> (PackedLiterals, constant holding them)
     self.init_global = True
 
     printi_ty = ir.FunctionType(void_type, [int_type])
@@ -36,6 +68,9 @@ class CodeGenerator(Visitor):
     printc_ty = ir.FunctionType(void_type, [char_type])
     self.printc = ir.Function(self.module, printc_ty, "_printc")
 
+    prints_ty = ir.FunctionType(void_type, [char_type.as_pointer()])
+    self.prints = ir.Function(self.module, prints_ty, "_prints")
+
   def visit(self, node: Program):
     global_decls = []
     func_decls = []
@@ -46,6 +81,12 @@ class CodeGenerator(Visitor):
       else:
         global_decls.append(decl)
 
+    self.emit_globals(global_decls)
+
+    for func_decl in func_decls:
+      func_decl.accept(self)
+
+  def emit_globals(self, global_decls):
     func_ty = ir.FunctionType(void_type, [])
     func = ir.Function(self.module, func_ty, name="_global_init")
     block = func.append_basic_block(name="entry")
@@ -57,58 +98,161 @@ class CodeGenerator(Visitor):
     self.init_global = False
 
     for decl in global_decls:
-      val = decl.value.accept(self)
-      ptr = self.symbols.get(f"{decl.name}.global")
-      self.builder.store(val, ptr)
+      ptr = self.globals.get(decl.name)
+
+      if isinstance(decl, ArrayDecl):
+        # A packed table is already the global's initializer
+        if not isinstance(decl.value, PackedLiterals):
+          for i, val_node in enumerate(decl.value):
+            val = val_node.accept(self)
+            self.builder.store(val, self.builder.gep(ptr, [ir.Constant(int_type, i)]))
+      elif decl.value is not None:
+        val = decl.value.accept(self)
+        self.builder.store(val, ptr)
 
     if not self.builder.block.is_terminated:
       self.builder.ret_void()
 
-    for func_decl in func_decls:
-      func_decl.accept(self)
+  def string(self, value):
+    '''
+    Pointer to a constant holding value, emitted once per pooled string.
+    '''
+    key = current_session().pool.id(value)
+    constant = self.strings.get(key)
+
+    if constant is None:
+      data = bytearray(value.encode('utf-8')) + b'\0'
+      ty = ir.ArrayType(char_type, len(data))
+      constant = ir.GlobalVariable(self.module, ty, name=f".str.{key}")
+      constant.linkage = "private"
+      constant.global_constant = True
+      constant.initializer = ir.Constant(ty, data)
+      self.strings[key] = constant
+
+    zero = ir.Constant(int_type, 0)
+    return constant.gep([zero, zero])
+
+  def packed(self, packed, size = None):
+    '''
+    LLVM array constant of size elements (by default, as many as packed
+    holds) written out directly from the PackedLiterals packed, padded
+    with zeros.
+    '''
+    element = _typemap[packed.type]
+    values = packed.values
+
+    if packed.type == 'float':
+      # Doubles in LLVM's exact hexadecimal form
+      values = (f"0x{bits:016X}" for bits in array('Q', values.tobytes()))
+
+    ty = ir.ArrayType(element, size or len(packed))
+    prefix = f"{element} "
+    text = ', '.join(prefix + str(value) for value in values)
+    zero = "0.0" if packed.type == 'float' else "0"
+    text += f", {prefix}{zero}" * (ty.count - len(packed))
+
+    return ir.FormattedConstant(ty, f"[{text}]")
+
+  def table(self, packed, name):
+    '''
+    Private constant named name holding the PackedLiterals packed.
+    '''
+    initializer = self.packed(packed)
+    constant = ir.GlobalVariable(self.module, initializer.type, name=name)
+    constant.linkage = "private"
+    constant.global_constant = True
+    constant.initializer = initializer
+    self.tables[name] = (packed, constant)
+
+    # Declared along with every table, so a function whose IR text is
+    # reused with its tables still finds the intrinsic it calls
+    self.memcpy()
+
+    return constant
+
+  def address(self, node):
+    '''
+    Pointer to what the location node refers to: the alloca of the
+    local declaration the resolver bound it to, or else the global
+    variable of its name.
+    '''
+    symbol = node.symbol
+
+    if symbol is not None and symbol.depth:
+      return self.locals[symbol.id]
+
+    return self.globals.get(node.name)
+
+  def memcpy(self):
+    i8_ptr = char_type.as_pointer()
+    return self.module.declare_intrinsic('llvm.memcpy', [i8_ptr, i8_ptr, ir.IntType(64)])
 
   def visit(self, node: VarDecl):
-    ty = _typemap[node.type]
+    ty = llvm_type(node.declared_type)
 
     if self.init_global:
       global_var = ir.GlobalVariable(self.module, ty, name=f"{node.name}.global")
       global_var.linkage = "common"
       global_var.initializer = ir.Constant(ty, 0)
-      self.symbols[f"{node.name}.global"] = global_var
+      self.globals[node.name] = global_var
       return
     
     ptr = self.builder.alloca(ty, name=node.name)
 
     if node.value:
-      val = node.value.accept(self)
+      val = yield node.value
       self.builder.store(val, ptr)
 
-    self.symbols[node.name] = ptr
+    self.locals[node.id] = ptr
     
   def visit(self, node: ArrayDecl):
-    ty = _typemap[node.type]
-    size = node.size.accept(self)
+    ty = llvm_type(node.declared_type.base)
+    size = yield node.size
 
     if self.init_global:
-      global_var = ir.GlobalVariable(self.module, ty, name=f"{node.name}.global")
-      global_var.linkage = "common"
-      global_var.initializer = ir.Constant(ty, 0)
-      self.symbols[f"{node.name}.global"] = global_var
+      count = node.declared_type.size
+
+      if count is None:
+        global_var = ir.GlobalVariable(self.module, ty, name=f"{node.name}.global")
+        global_var.linkage = "common"
+        global_var.initializer = ir.Constant(ty, 0)
+        self.globals[node.name] = global_var
+        return
+
+      # The whole array, addressed through a pointer to its first element
+      # like a local one. A packed table is its initializer as it is.
+      if isinstance(node.value, PackedLiterals):
+        initializer = self.packed(node.value, max(count, len(node.value)))
+        global_var = ir.GlobalVariable(self.module, initializer.type, name=f"{node.name}.global")
+        global_var.initializer = initializer
+      else:
+        global_var = ir.GlobalVariable(self.module, ir.ArrayType(ty, count), name=f"{node.name}.global")
+        global_var.linkage = "common"
+        global_var.initializer = ir.Constant(global_var.value_type, None)
+
+      zero = ir.Constant(int_type, 0)
+      self.globals[node.name] = global_var.gep([zero, zero])
       return
 
     arr_ptr = self.builder.alloca(ty, size, name=node.name)
-    self.symbols[node.name] = arr_ptr
-
-    if node.value:
+    self.locals[node.id] = arr_ptr
+
+    if isinstance(node.value, PackedLiterals):
+      # One copy of the whole initializer out of a constant table
+      table = self.table(node.value, self.module.get_unique_name(f"{self.builder.function.name}.{node.name}.init"))
+      i8_ptr = char_type.as_pointer()
+      nbytes = ir.Constant(ir.IntType(64), len(node.value) * _itemsize[node.value.type])
+      self.builder.call(self.memcpy(), [self.builder.bitcast(arr_ptr, i8_ptr), table.bitcast(i8_ptr), nbytes, ir.Constant(bool_type, 0)])
+    elif node.value:
       for i, val_node in enumerate(node.value):
-        value = val_node.accept(self)
+        value = yield val_node
         index = ir.Constant(int_type, i)
         element_ptr = self.builder.gep(arr_ptr, [index])
         self.builder.store(value, element_ptr)
   
   def visit(self, node: ArrayLoc):
-    arr_ptr = self.symbols.get(node.name)
-    index = node.index.accept(self)
+    arr_ptr = self.address(node)
+    index = yield node.index
     element_ptr = self.builder.gep(arr_ptr, [index])
     return self.builder.load(element_ptr)
 
@@ -122,29 +266,27 @@ class CodeGenerator(Visitor):
         return ir.Constant(bool_type, 1 if node.value == True else 0)
       case "char":
         return ir.Constant(char_type, ord(node.value))
+      case "string":
+        return self.string(node.value)
         
   def visit(self, node: VarLoc):
-    ptr = self.symbols.get(node.name)
-    if ptr is None:
-      ptr = self.symbols.get(f"{node.name}.global")
+    ptr = self.address(node)
     return self.builder.load(ptr, name=node.name)
 
   def visit(self, node: BinOper):
-    left = node.left.accept(self)
-    right = node.right.accept(self)
+    left = yield node.left
+    right = yield node.right
 
     return binary_operation(left, right, node.oper, self.builder)
   
   def visit(self, node: UnaryOper):
-    expr = node.expr.accept(self)
+    expr = yield node.expr
 
     return unary_operation(expr, node.oper, self.builder)
   
   def visit(self, node: FuncDecl):
-    param_types = [_typemap[p.type] for p in node.params]
-
-    ty = _typemap[node.type]
-    func_ty = ir.FunctionType(ty, param_types)
+    func_ty = llvm_type(node.declared_type)
+    ty = func_ty.return_type
     func = ir.Function(self.module, func_ty, name=node.name)
 
     self.symbols[node.name] = func
@@ -156,7 +298,7 @@ class CodeGenerator(Visitor):
       arg.name = param.name
       ptr = self.builder.alloca(arg.type, name=param.name)
       self.builder.store(arg, ptr)
-      self.symbols[param.name] = ptr
+      self.locals[param.id] = ptr
 
     if node.name == "main":
       init_func = self.module.globals.get("_global_init")
@@ -164,18 +306,18 @@ class CodeGenerator(Visitor):
         self.builder.call(init_func, [])
 
     for decl in node.body:
-      decl.accept(self)
+      yield decl
 
     if ty == void_type:
       self.builder.ret_void()
   
   def visit(self, node: ReturnStmt):
-    retval = node.value.accept(self)
+    retval = yield node.value
     self.builder.ret(retval)
   
   def visit(self, node: IfStmt):
     func = self.builder.function
-    cond = node.condition.accept(self)
+    cond = yield node.condition
 
     then_block = func.append_basic_block(name="if.then")
     merge_block = func.append_basic_block(name="if.merge")
@@ -186,14 +328,14 @@ class CodeGenerator(Visitor):
       self.builder.cbranch(cond, then_block, else_block)
 
       self.builder.position_at_end(else_block)
-      node.else_branch.accept(self)
+      yield node.else_branch
       if not self.builder.block.is_terminated:
         self.builder.branch(merge_block)
     else:
       self.builder.cbranch(cond, then_block, merge_block)
 
     self.builder.position_at_end(then_block)
-    node.then_branch.accept(self)
+    yield node.then_branch
 
     if not self.builder.block.is_terminated:
       self.builder.branch(merge_block)
@@ -209,18 +351,18 @@ class CodeGenerator(Visitor):
     self.builder.branch(cond_block)
     self.builder.position_at_end(cond_block)
 
-    cond_val = node.condition.accept(self)
+    cond_val = yield node.condition
 
     self.builder.cbranch(cond_val, body_block, after_block)
     self.builder.position_at_end(body_block)
 
-    node.body.accept(self)
+    yield node.body
 
     self.builder.branch(cond_block)
     self.builder.position_at_end(after_block)
 
   def visit(self, node: ForStmt):
-    node.init.accept(self)
+    yield node.init
 
     func = self.builder.function
     cond_block = func.append_basic_block(name="for.cond")
@@ -230,22 +372,22 @@ class CodeGenerator(Visitor):
     self.builder.branch(cond_block)
     self.builder.position_at_end(cond_block)
 
-    cond_val = node.condition.accept(self)
+    cond_val = yield node.condition
 
     self.builder.cbranch(cond_val, body_block, after_block)
     self.builder.position_at_end(body_block)
 
-    node.body.accept(self)
+    yield node.body
 
-    val = node.incr.accept(self)
+    val = yield node.incr
 
     var = None
     if hasattr(node.incr, "expr"):
-      var = node.incr.expr.name
+      var = node.incr.expr
     else:
-      var = node.incr.target.name
+      var = node.incr.target
 
-    ptr = self.symbols.get(var)
+    ptr = self.address(var)
     self.builder.store(val, ptr)
 
     self.builder.branch(cond_block)
@@ -260,34 +402,33 @@ class CodeGenerator(Visitor):
     self.builder.branch(body_block)
     self.builder.position_at_end(body_block)
 
-    node.body.accept(self)
+    yield node.body
 
     self.builder.branch(cond_block)
 
     self.builder.position_at_end(cond_block)
-    cond_val = node.condition.accept(self)
+    cond_val = yield node.condition
     self.builder.cbranch(cond_val, body_block, after_block)
 
     self.builder.position_at_end(after_block)
 
   def visit(self, node: BlockStmt):
     for stmt in node.body:
-      stmt.accept(self)
+      yield stmt
   
   def visit(self, node: Assignment):
-    value = node.value.accept(self)
-    ptr = self.symbols[node.target.name]
+    value = yield node.value
+    ptr = self.address(node.target)
 
     if (node.target.__class__.__name__ == "ArrayLoc"):
-      arr_ptr = self.symbols.get(node.target.name)
-      index = node.target.index.accept(self)
-      ptr = self.builder.gep(arr_ptr, [index])
+      index = yield node.target.index
+      ptr = self.builder.gep(ptr, [index])
 
     self.builder.store(value, ptr)
   
   def visit(self, node: PrintStmt):
     for v in node.value:
-      value = v.accept(self)
+      value = yield v
       ty = value.type
 
       if ty == int_type:
@@ -298,11 +439,17 @@ class CodeGenerator(Visitor):
         self.builder.call(self.printb, [value])
       elif ty == char_type:
         self.builder.call(self.printc, [value])
+      elif ty == char_type.as_pointer():
+        self.builder.call(self.prints, [value])
 
   def visit(self, node: FuncCall):
     func = self.symbols.get(node.name)
 
-    arg_values = [arg.accept(self) for arg in node.args]
+    arg_values = []
+
+    for arg in node.args:
+      arg_values.append((yield arg))
+
     result = self.builder.call(func, arg_values, name=f"call_{node.name}")
 
     return result
\ No newline at end of file
@@ -6,58 +6,50 @@ bool_type  = ir.IntType(1)
 char_type  = ir.IntType(8)
 void_type  = ir.VoidType()
 
+# (operand type, operator) -> emitter of the instruction, built once
+
+_binary = {}
+
+for oper in ("<", "<=", ">", ">=", "==", "!="):
+  _binary[int_type, oper]   = lambda b, l, r, oper = oper: b.icmp_signed(oper, l, r)
+  _binary[float_type, oper] = lambda b, l, r, oper = oper: b.fcmp_ordered(oper, l, r)
+  _binary[char_type, oper]  = lambda b, l, r, oper = oper: b.icmp_signed(oper, l, r)
+
+_binary.update({
+  (int_type, "+"):    lambda b, l, r: b.add(l, r),
+  (int_type, "-"):    lambda b, l, r: b.sub(l, r),
+  (int_type, "*"):    lambda b, l, r: b.mul(l, r),
+  (int_type, "/"):    lambda b, l, r: b.sdiv(l, r),
+  (int_type, "%"):    lambda b, l, r: b.srem(l, r),
+  (float_type, "+"):  lambda b, l, r: b.fadd(l, r),
+  (float_type, "-"):  lambda b, l, r: b.fsub(l, r),
+  (float_type, "*"):  lambda b, l, r: b.fmul(l, r),
+  (float_type, "/"):  lambda b, l, r: b.fdiv(l, r),
+  (bool_type, "&&"):  lambda b, l, r: b.and_(l, r),
+  (bool_type, "||"):  lambda b, l, r: b.and_(l, r),
+  (bool_type, "=="):  lambda b, l, r: b.icmp_signed("==", l, r),
+  (bool_type, "!="):  lambda b, l, r: b.icmp_signed("!=", l, r),
+})
+
+_unary = {
+  (int_type, "+"):    lambda b, e: b.add(e, ir.Constant(int_type, 0)),
+  (int_type, "-"):    lambda b, e: b.sub(ir.Constant(int_type, 0), e),
+  (int_type, "++"):   lambda b, e: b.add(e, ir.Constant(int_type, 1)),
+  (int_type, "--"):   lambda b, e: b.sub(e, ir.Constant(int_type, 1)),
+  (float_type, "+"):  lambda b, e: b.fadd(e, ir.Constant(float_type, 0)),
+  (float_type, "-"):  lambda b, e: b.fsub(ir.Constant(float_type, 0), e),
+  (bool_type, "!"):   lambda b, e: b.xor(e, ir.Constant(bool_type, 1)),
+}
+
 def binary_operation(left, right, oper, builder):
-  if left.type == int_type and right.type == int_type:
-    match oper:
-      case "+":  return builder.add(left, right)
-      case "-":  return builder.sub(left, right)
-      case "*":  return builder.mul(left, right)
-      case "/":  return builder.sdiv(left, right)
-      case "%":  return builder.srem(left, right)
-      case "<":  return builder.icmp_signed("<", left, right)
-      case "<=": return builder.icmp_signed("<=", left, right)
-      case ">":  return builder.icmp_signed(">", left, right)
-      case ">=": return builder.icmp_signed(">=", left, right)
-      case "==": return builder.icmp_signed("==", left, right)
-      case "!=": return builder.icmp_signed("!=", left, right)
-  elif left.type == float_type and right.type == float_type: 
-    match oper:
-      case "+":  return builder.fadd(left, right)
-      case "-":  return builder.fsub(left, right)
-      case "*":  return builder.fmul(left, right)
-      case "/":  return builder.fdiv(left, right)
-      case "<":  return builder.fcmp_ordered("<", left, right)
-      case "<=": return builder.fcmp_ordered("<=", left, right)
-      case ">":  return builder.fcmp_ordered(">", left, right)
-      case ">=": return builder.fcmp_ordered(">=", left, right)
-      case "==": return builder.fcmp_ordered("==", left, right)
-      case "!=": return builder.fcmp_ordered("!=", left, right)
-  elif left.type == bool_type and right.type == bool_type:
-    match oper:
-      case "&&": return builder.and_(left, right)
-      case "||": return builder.and_(left, right)
-      case "==": return builder.icmp_signed("==", left, right)
-      case "!=": return builder.icmp_signed("!=", left, right)
-  elif left.type == char_type and right.type == char_type:
-    match oper:
-      case "<":  return builder.icmp_signed("<", left, right)
-      case "<=": return builder.icmp_signed("<=", left, right)
-      case ">":  return builder.icmp_signed(">", left, right)
-      case ">=": return builder.icmp_signed(">=", left, right)
-      case "==": return builder.icmp_signed("==", left, right)
-      case "!=": return builder.icmp_signed("!=", left, right)
-  
+  if left.type == right.type:
+    emit = _binary.get((left.type, oper))
+
+    if emit is not None:
+      return emit(builder, left, right)
+
 def unary_operation(expr, oper, builder):
-  if expr.type == int_type:
-    match oper:
-      case "+":  return builder.add(expr, ir.Constant(int_type, 0))
-      case "-":  return builder.sub(ir.Constant(int_type, 0), expr)
-      case "++": return builder.add(expr, ir.Constant(int_type, 1))
-      case "--": return builder.sub(expr, ir.Constant(int_type, 1))
-  elif expr.type == float_type:
-    match oper:
-      case "+": return builder.fadd(expr, ir.Constant(float_type, 0))
-      case "-": return builder.fsub(ir.Constant(float_type, 0), expr)
-  elif expr.type == bool_type:
-    match oper:
-      case "!": return builder.xor(expr, ir.Constant(bool_type, 1))
\ No newline at end of file
+  emit = _unary.get((expr.type, oper))
+
+  if emit is not None:
+    return emit(builder, expr)
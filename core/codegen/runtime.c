@@ -19,4 +19,8 @@ void _printb(int x) {
 void _printc(char c) {
   printf("%c", c);
   fflush(stdout);
+}
+
+void _prints(const char *s) {
+  printf("%s", s);
 }
\ No newline at end of file
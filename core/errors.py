@@ -1,18 +1,13 @@
-from rich.markup import escape
-from rich        import print 
+from core.session import current_session
 
-_errors_detected = 0
+# Diagnostics are recorded on the active CompilerSession, so separate
+# compilations (threads, server workers, batch jobs) never share counts.
 
 def error(message, lineno = None, error_type = None):
-  global _errors_detected
-  _errors_detected += 1
-
-  print(f"[red][bold]{error_type + " " if error_type else ""}Error at {lineno}: [/]{message}[/]")
+  current_session().error(message, lineno, error_type)
  
 def errors_detected():
-  global _errors_detected
-  return _errors_detected
+  return current_session().errors
 
 def clear_errors():
-  global _errors_detected
-  _errors_detected = 0
\ No newline at end of file
+  current_session().clear()
\ No newline at end of file
@@ -0,0 +1,39 @@
+'''
+Interning pool for identifiers and literals.
+
+The lexer creates a new string for every occurrence of a name. Each
+CompilerSession has an InternPool, and the parser replaces every name
+and string literal with the pool's copy, so all occurrences share one
+object. Dictionaries keyed by them (symbol tables, the code generator's
+symbols) then find keys by identity, without comparing characters. A
+string also gets a small integer id on request, which names the
+constants emitted for it.
+'''
+
+class InternPool:
+  def __init__(self):
+    self.shared = {}    # text -> the shared copy of it
+    self.ids = {}       # shared text -> id
+    self.strings = []   # id -> shared text
+
+  def __len__(self):
+    return len(self.shared)
+
+  def intern(self, text):
+    '''
+    The pool's copy of text, which becomes text itself on first sight.
+    '''
+    return self.shared.setdefault(text, text)
+
+  def id(self, text):
+    '''
+    Integer id of text, numbered in order of first request.
+    '''
+    text = self.intern(text)
+    number = self.ids.get(text)
+
+    if number is None:
+      number = self.ids[text] = len(self.strings)
+      self.strings.append(text)
+
+    return number
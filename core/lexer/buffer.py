@@ -0,0 +1,241 @@
+'''
+Compact token storage.
+
+A TokenBuffer keeps the tokens of a source in four typed arrays (kind,
+start, end and line number) instead of one Token object per token,
+about 13 bytes per token. Token text is sliced from the source only
+when asked for, and literal values are converted again on access the
+same way the lexer converted them. Iterating a buffer yields ordinary
+Token objects one at a time, so the parser can consume it directly.
+
+Edits (see core.lexer.incremental) splice relexed tokens into a copy of
+a buffer. The tokens after an edit all move by the same number of
+characters and lines, so the move is recorded as 'pending' and added on
+access instead of being applied to every one of them.
+'''
+from array     import array
+from bisect    import bisect_left
+from itertools import chain
+
+from sly.lex import Token
+
+from core.lexer.lexer   import Lexer, new_lexer
+from core.lexer.scanner import Scanner
+from core.lexer.utils   import unescape_char, unescape_string
+
+TYPES = sorted(Lexer.tokens) + list(Lexer.literals)
+KINDS = {name: kind for kind, name in enumerate(TYPES)}
+
+def _char(text):
+  try:
+    return unescape_char(text[1:-1])
+  except ValueError:
+    # Already reported by the lexer, which kept the token without a value
+    return None
+
+_values = {
+  KINDS['INTEGER_LITERAL']: int,
+  KINDS['FLOAT_LITERAL']  : float,
+  KINDS['CHAR_LITERAL']   : _char,
+  KINDS['STRING_LITERAL'] : lambda text: unescape_string(text[1:-1]),
+}
+
+class TokenBuffer:
+  def __init__(self, source):
+    '''
+    Create an empty buffer for tokens of source (str or bytes-like);
+    token offsets index into it.
+    '''
+    offset = 'i' if len(source) < 1 << 31 else 'q'
+
+    self.source = source
+    self.lineno = 1
+    self.kinds = array('B')
+    self.starts = array(offset)
+    self.ends = array(offset)
+    self.lines = array('i')
+
+    # (index, offset, lines): tokens from index on are really that many
+    # characters and lines further than their stored start, end and line
+    self.pending = None
+
+    # Kept by core.lexer.incremental once the buffer has been edited
+    self.hazards = None
+
+    # (first, last, stop) when core.lexer.incremental made this buffer:
+    # the tokens [first:last) of the old buffer became [first:stop)
+    self.relexed = None
+
+    # Kept by core.parser.incremental: one past the ';' that ends each
+    # top-level declaration
+    self.bounds = None
+
+  @classmethod
+  def scan(cls, source, lexer = None, lineno = 1):
+    '''
+    Tokenize source with lexer (the session's lexer by default) into a
+    new buffer.
+    '''
+    lexer = lexer or new_lexer()
+
+    # The scanner works on bytes: keep the encoded text the offsets refer to
+    if isinstance(lexer, Scanner) and isinstance(source, str):
+      source = source.encode('utf-8')
+
+    buffer = cls(source)
+    buffer.lineno = lineno
+
+    for tok in lexer.tokenize(source, lineno):
+      buffer.append(tok)
+
+    return buffer
+
+  def append(self, tok):
+    self.kinds.append(KINDS[tok.type])
+    self.starts.append(tok.index)
+    self.ends.append(tok.end)
+    self.lines.append(tok.lineno)
+
+  def splice(self, source, first, last, tokens, offset, lines):
+    '''
+    A new buffer over source, with the tokens [first:last) of this one
+    replaced by tokens and the ones after them moved by offset
+    characters and lines. Only the tokens between this buffer's pending
+    move and the splice are rewritten.
+    '''
+    fresh = TokenBuffer(source)
+
+    for tok in tokens:
+      fresh.append(tok)
+
+    buffer = TokenBuffer(source)
+    buffer.lineno = self.lineno
+
+    for name in ('kinds', 'starts', 'ends', 'lines'):
+      column = getattr(self, name)
+      code = getattr(fresh, name).typecode
+
+      if column.typecode != code:
+        column = array(code, column)
+
+      setattr(buffer, name, column[:first] + getattr(fresh, name) + column[last:])
+
+    index, moved, moved_lines = self.pending or (len(self), 0, 0)
+    middle = first + len(fresh)
+
+    # Store every token before the splice where it really is, and every
+    # one after it relative to the (combined) pending move
+    if index < first:
+      span, shift, shift_lines = slice(index, first), moved, moved_lines
+    elif index > last:
+      span, shift, shift_lines = slice(middle, middle + index - last), -moved, -moved_lines
+    else:
+      span = None
+
+    if span:
+      for column, by in ((buffer.starts, shift), (buffer.ends, shift), (buffer.lines, shift_lines)):
+        column[span] = array(column.typecode, map(by.__add__, column[span]))
+
+    if middle < len(buffer) and (moved + offset or moved_lines + lines):
+      buffer.pending = (middle, moved + offset, moved_lines + lines)
+
+    return buffer
+
+  def moved(self, i):
+    '''
+    (offset, lines) the pending move adds to token i.
+    '''
+    pending = self.pending
+    return pending[1:] if pending and i >= pending[0] else (0, 0)
+
+  def start(self, i):
+    return self.starts[i] + self.moved(i)[0]
+
+  def end(self, i):
+    return self.ends[i] + self.moved(i)[0]
+
+  def line(self, i):
+    return self.lines[i] + self.moved(i)[1]
+
+  def find(self, position):
+    '''
+    Index of the first token that starts at or after position.
+    '''
+    index, offset, _ = self.pending or (len(self), 0, 0)
+    i = bisect_left(self.starts, position, 0, index)
+
+    return i if i < index else bisect_left(self.starts, position - offset, index)
+
+  def rows(self, start = 0, stop = None):
+    '''
+    (kind, start, end, line) of the tokens [start:stop), by default of
+    every token.
+    '''
+    stop = len(self) if stop is None else stop
+    columns = (self.kinds, self.starts, self.ends, self.lines)
+    index, offset, lines = self.pending or (stop, 0, 0)
+    index = min(max(index, start), stop)
+
+    if start == 0 and index == len(self):
+      return zip(*columns)
+
+    before = zip(*(column[start:index] for column in columns))
+
+    if index == stop:
+      return before
+
+    after = zip(*(column[index:stop] for column in columns))
+
+    return chain(before, ((kind, start + offset, end + offset, line + lines) for kind, start, end, line in after))
+
+  def __len__(self):
+    return len(self.kinds)
+
+  def type(self, i):
+    return TYPES[self.kinds[i]]
+
+  def text(self, i):
+    text = self.source[self.start(i):self.end(i)]
+    return text if isinstance(text, str) else text.decode('utf-8')
+
+  def value(self, i):
+    convert = _values.get(self.kinds[i])
+    return convert(self.text(i)) if convert else self.text(i)
+
+  def __getitem__(self, i):
+    if i < 0:
+      i += len(self)
+
+    tok = Token()
+    tok.type = TYPES[self.kinds[i]]
+    tok.value = self.value(i)
+    tok.lineno = self.line(i)
+    tok.index = self.start(i)
+    tok.end = self.end(i)
+    return tok
+
+  def __iter__(self):
+    return self.tokens()
+
+  def tokens(self, start = 0, stop = None):
+    '''
+    Token objects of the tokens [start:stop), by default of every token.
+    '''
+    source = self.source
+    binary = not isinstance(source, str)
+
+    for kind, start, end, lineno in self.rows(start, stop):
+      text = source[start:end]
+
+      if binary:
+        text = text.decode('utf-8')
+
+      convert = _values.get(kind)
+
+      tok = Token()
+      tok.type = TYPES[kind]
+      tok.value = convert(text) if convert else text
+      tok.lineno = lineno
+      tok.index = start
+      tok.end = end
+      yield tok
@@ -0,0 +1,166 @@
+'''
+Incremental relexing.
+
+relex() turns the TokenBuffer of a source and an edit of that source
+(offset, removed length, inserted text) into the TokenBuffer of the
+edited source. It produces exactly the tokens a full relex would, but
+only lexes from the nearest safe restart point before the edit until
+the new tokens fall back in step with the old ones; the tokens after
+that are the old ones, moved by the size of the edit.
+
+A restart point is safe when the edit cannot have changed how anything
+before it was lexed. Most rules look at most a few characters past the
+token they match, but a few look arbitrarily far ahead:
+
+  - a '"' that turned out not to start a string was scanned up to the
+    point where the string failed;
+  - an unterminated '/*' was scanned to the end of the file;
+  - with the SLY Lexer, whose comment rule is greedy, every '/*'
+    comment was scanned to the end of the file to find the last '*/'.
+
+Such places are found once per buffer and kept up to date across
+edits ('hazards'); the restart point moves back before any of them that
+looked at the edited text. Lexical errors are reported again only for
+the relexed range.
+'''
+import math
+import re
+
+from core.lexer.buffer  import TokenBuffer
+from core.lexer.lexer   import new_lexer
+from core.lexer.scanner import Scanner
+
+# How far past the end of a token the lexer rules may have looked
+REACH = 8
+
+_hazards = {
+  str  : re.compile(r'"|/\*'),
+  bytes: re.compile(rb'"|/\*'),
+}
+
+_open_strings = {
+  str  : re.compile(r'"([^"\\]|\\.)*'),
+  bytes: re.compile(rb'"([^"\\]|\\.)*'),
+}
+
+def hazards(tokens, greedy, start = 0, stop = None):
+  '''
+  (position, reach) of every place in tokens.source[start:stop] where
+  lexing may have looked further than REACH ahead, reach being the last
+  character looked at (math.inf for the end of the file). greedy tells
+  whether '/*' comments extend to the last '*/'.
+  '''
+  source = tokens.source
+  kind = str if isinstance(source, str) else bytes
+  size = len(source)
+  stop = size if stop is None else stop
+  quote = '"' if kind is str else b'"'
+  found = []
+
+  # One past stop, for a '/' just before it
+  for m in _hazards[kind].finditer(source, start, min(stop + 1, size)):
+    position = m.start()
+
+    if position >= stop:
+      break
+
+    i = tokens.find(position + 1) - 1
+
+    if i >= 0 and position < tokens.end(i):
+      # Inside a token, where only the '/' of an unterminated comment
+      # was looked past
+      if tokens.type(i) == '/' and m.end() - position == 2:
+        found.append((position, math.inf))
+
+      continue
+
+    if m.end() - position == 2:
+      close = source.find(b'*/' if kind is bytes else '*/', position + 2)
+      found.append((position, math.inf if greedy or close < 0 else close + 1))
+      continue
+
+    # A string that would have matched here was never tried: this quote
+    # is inside a comment or was skipped along with an invalid identifier
+    end = _open_strings[kind].match(source, position).end()
+
+    if end >= size or source[end:end + 1] != quote:
+      found.append((position, end if end < size else math.inf))
+
+  return found
+
+def relex(tokens, offset, removed, inserted, lexer = None):
+  '''
+  TokenBuffer of tokens.source with 'removed' characters at offset
+  replaced by inserted. lexer (the session's lexer by default) must be
+  of the kind tokens was scanned with.
+  '''
+  lexer = lexer or new_lexer()
+  greedy = not isinstance(lexer, Scanner)
+  source = tokens.source
+
+  if not isinstance(source, str):
+    if isinstance(inserted, str):
+      inserted = inserted.encode('utf-8')
+
+    source = bytes(source)
+
+  if tokens.hazards is None:
+    tokens.hazards = hazards(tokens, greedy)
+
+  edited = source[:offset] + inserted + source[offset + removed:]
+  delta = len(inserted) - removed
+  edit_end = offset + len(inserted)
+
+  # Restart after the last token that ends far enough before the edit
+  # and before every hazard that looked at the edited text
+  limit = offset - REACH
+
+  for position, reach in tokens.hazards:
+    if position >= offset:
+      break
+
+    if reach >= offset - 1:
+      limit = min(limit, position)
+      break
+
+  first = tokens.find(max(limit, 0))
+
+  if first and tokens.end(first - 1) > limit:
+    first -= 1
+
+  restart = tokens.end(first - 1) if first else 0
+  lineno = tokens.line(first - 1) if first else tokens.lineno
+
+  # Relex until a token starts where an old token after the edit did:
+  # from there on the text and the lexer's state are the same
+  last = tokens.find(offset + removed)
+  count = len(tokens)
+  fresh = []
+  lines = 0
+
+  for tok in lexer.tokenize(edited, lineno, restart):
+    if tok.index >= edit_end:
+      position = tok.index - delta
+
+      while last < count and tokens.start(last) < position:
+        last += 1
+
+      if last < count and tokens.start(last) == position:
+        lines = tok.lineno - tokens.line(last)
+        break
+
+    fresh.append(tok)
+  else:
+    last = count
+
+  buffer = tokens.splice(edited, first, last, fresh, delta, lines)
+  buffer.relexed = (first, last, first + len(fresh))
+
+  # Hazards before the restart point are unchanged, those after the
+  # relexed range moved with their tokens
+  resumed = tokens.start(last) if last < count else len(source)
+  buffer.hazards = [hazard for hazard in tokens.hazards if hazard[0] < restart]
+  buffer.hazards += hazards(buffer, greedy, restart, resumed + delta)
+  buffer.hazards += [(position + delta, reach + delta) for position, reach in tokens.hazards if position >= resumed]
+
+  return buffer
@@ -1,10 +1,10 @@
+import mmap
+import re
 import sly
 
 from core.lexer.utils import unescape_char, unescape_string
-from core.errors      import error, errors_detected
-
-from rich.console import Console 
-from rich.table   import Table
+from core.errors      import error
+from core.session     import current_session
 
 class Lexer(sly.Lexer):
   tokens = {
@@ -112,18 +112,143 @@ class Lexer(sly.Lexer):
   def error(self, token):
     error(f"Illegal character {token.value[0]}", token.lineno, "Lexical")
     self.index += 1
-  
-def tokenize(code):
-  lexer = Lexer()
 
-  table = Table(show_lines = True)
-  table.add_column("Type", justify = "center")
-  table.add_column("Value", justify = "center")
-  table.add_column("Line number", justify = "center")
+  # == Streaming ==
+
+  # Pages of a memory-mapped source are released once the scanner is
+  # this many bytes past them
+  RELEASE = 1 << 22
+
+  def tokenize(self, text, lineno = 1, index = 0):
+    if isinstance(text, str):
+      return super().tokenize(text, lineno, index)
+
+    return self.stream(text, lineno, index)
 
-  for token in lexer.tokenize(code):
-    table.add_row(token.type, str(token.value), str(token.lineno))
+  @classmethod
+  def _bytes_re(cls):
+    if '_master_bytes_re' not in cls.__dict__:
+      cls._master_bytes_re = re.compile(cls._master_re.pattern.encode(), cls._master_re.flags & ~re.UNICODE)
 
-  if errors_detected() == 0:
-    console = Console()
-    console.print(table)
\ No newline at end of file
+    return cls._master_bytes_re
+
+  def stream(self, buffer, lineno = 1, index = 0):
+    '''
+    Tokenize a UTF-8 bytes-like buffer, usually a memory-mapped file,
+    lazily and without decoding it as a whole: only the text of each
+    token is decoded. Produces the same tokens as tokenize() on the
+    decoded text, except that 'index' and 'end' count bytes.
+    '''
+    master = self._bytes_re()
+    ignore = self.ignore.encode()
+    literals = self.literals.encode()
+    funcs = self._token_funcs
+    remapping = self._remapping
+    ignored = self._ignored_tokens
+
+    release = buffer.madvise if isinstance(buffer, mmap.mmap) and hasattr(mmap, 'MADV_DONTNEED') else None
+    released = 0
+    size = len(buffer)
+
+    try:
+      while index < size:
+        if release and index - released >= self.RELEASE:
+          upto = index - index % mmap.PAGESIZE
+          release(mmap.MADV_DONTNEED, released, upto - released)
+          released = upto
+
+        char = buffer[index]
+
+        if char in ignore:
+          index += 1
+          continue
+
+        tok = sly.lex.Token()
+        tok.lineno = lineno
+        tok.index = index
+        m = master.match(buffer, index)
+
+        if m:
+          tok.end = index = m.end()
+          tok.value = m.group().decode('utf-8')
+          tok.type = m.lastgroup
+
+          if tok.type in remapping:
+            tok.type = remapping[tok.type].get(tok.value, tok.type)
+
+          if tok.type in funcs:
+            self.index = index
+            self.lineno = lineno
+            tok = funcs[tok.type](self, tok)
+            index = self.index
+            lineno = self.lineno
+
+            # Token functions skip whole characters, not bytes
+            while index < size and 0x80 <= buffer[index] < 0xC0:
+              index += 1
+
+            if not tok:
+              continue
+
+          if tok.type in ignored:
+            continue
+
+          yield tok
+        elif char in literals:
+          tok.value = chr(char)
+          tok.end = index = index + 1
+          tok.type = tok.value
+          yield tok
+        else:
+          # Report whole characters, not the bytes they are encoded in
+          value = bytes(buffer[index:index + 4]).decode('utf-8', 'replace')[0]
+          width = len(value.encode('utf-8')) if value != '\ufffd' else 1
+
+          self.index = index
+          self.lineno = lineno
+          tok.type = 'ERROR'
+          tok.value = value
+          tok = self.error(tok)
+
+          if tok is not None:
+            tok.end = self.index
+            yield tok
+
+          index = self.index + width - 1
+          lineno = self.lineno
+    finally:
+      self.index = index
+      self.lineno = lineno
+  
+def new_lexer():
+  '''
+  The lexer selected for the current session: the hand-written
+  Scanner when the 'scanner' option is set, the SLY Lexer otherwise.
+  '''
+  if current_session().options.get('scanner'):
+    from core.lexer.scanner import Scanner
+    return Scanner()
+
+  return Lexer()
+
+def lex(code):
+  '''
+  Tokens of code from the session's lexer. With the 'token_buffer'
+  option they are first collected into a compact TokenBuffer.
+  '''
+  lexer = new_lexer()
+
+  if current_session().options.get('token_buffer'):
+    from core.lexer.buffer import TokenBuffer
+    return iter(TokenBuffer.scan(code, lexer))
+
+  return lexer.tokenize(code)
+
+def tokenize(code, format = 'table', file = None):
+  '''
+  Write the tokens of code to file (stdout by default) in one of the
+  formats of core.lexer.output.
+  '''
+  from core.lexer.output import FORMATS
+
+  FORMATS[format](lex(code), file)
@@ -0,0 +1,155 @@
+'''
+Token output formats of main.py --scan.
+
+  jsonl   one JSON object per line and token:
+            {"type": "ID", "value": "x", "line": 3, "start": 10, "end": 11}
+  binary  a header followed by one record per token (see binary())
+  table   a rich table, built in memory and printed at the end; only
+          meant for small inputs
+
+jsonl and binary are written as the lexer produces tokens, so their
+memory use does not grow with the input. read_binary() decodes the
+binary format.
+'''
+import json
+import struct
+import sys
+
+from json.encoder import encode_basestring_ascii
+
+from core.errors import errors_detected
+
+MAGIC = b'BMTOK\x01'
+
+# kind, line, start, end; followed by the token value as UTF-8 text,
+# its length in one byte or, from 255 bytes on, 0xFF and four more bytes
+RECORD = struct.Struct('<BIII')
+LENGTH = struct.Struct('<I')
+
+# Output is collected and written in chunks of about this many bytes
+CHUNK = 1 << 16
+
+def _json(value):
+  if isinstance(value, str):
+    return encode_basestring_ascii(value)
+
+  if isinstance(value, int):
+    return str(value)
+
+  return json.dumps(value)
+
+def _text(value):
+  # A character literal with a bad escape has no value
+  if value is None:
+    return b''
+
+  return (value if isinstance(value, str) else repr(value)).encode('utf-8', 'surrogatepass')
+
+def jsonl(tokens, file = None):
+  file = file or sys.stdout
+  lines = []
+  size = 0
+
+  for tok in tokens:
+    line = (f'{{"type": "{tok.type}", "value": {_json(tok.value)}, '
+            f'"line": {tok.lineno}, "start": {tok.index}, "end": {tok.end}}}\n')
+    lines.append(line)
+    size += len(line)
+
+    if size >= CHUNK:
+      file.write(''.join(lines))
+      lines.clear()
+      size = 0
+
+  file.write(''.join(lines))
+  file.flush()
+
+def binary(tokens, file = None):
+  '''
+  Write the header, which names every token type in the order of their
+  kind numbers (a count byte, then a length byte and the ASCII name of
+  each), and a record for every token.
+  '''
+  from core.lexer.buffer import KINDS, TYPES
+
+  file = file or sys.stdout.buffer
+  chunk = bytearray(MAGIC)
+  chunk.append(len(TYPES))
+
+  for name in TYPES:
+    chunk.append(len(name))
+    chunk += name.encode('ascii')
+
+  pack = RECORD.pack
+
+  for tok in tokens:
+    text = _text(tok.value)
+    chunk += pack(KINDS[tok.type], tok.lineno, tok.index, tok.end)
+
+    if len(text) < 0xFF:
+      chunk.append(len(text))
+    else:
+      chunk.append(0xFF)
+      chunk += LENGTH.pack(len(text))
+
+    chunk += text
+
+    if len(chunk) >= CHUNK:
+      file.write(chunk)
+      chunk.clear()
+
+  file.write(chunk)
+  file.flush()
+
+def read_binary(file):
+  '''
+  Yield (type, value, line, start, end) for every record of a binary
+  token stream, the value as text.
+  '''
+  data = file.read()
+
+  if not data.startswith(MAGIC):
+    raise ValueError('not a binary token stream')
+
+  at = len(MAGIC) + 1
+  types = []
+
+  for _ in range(data[len(MAGIC)]):
+    size = data[at]
+    types.append(data[at + 1:at + 1 + size].decode('ascii'))
+    at += 1 + size
+
+  while at < len(data):
+    kind, line, start, end = RECORD.unpack_from(data, at)
+    at += RECORD.size
+    size = data[at]
+    at += 1
+
+    if size == 0xFF:
+      size, = LENGTH.unpack_from(data, at)
+      at += LENGTH.size
+
+    yield types[kind], data[at:at + size].decode('utf-8', 'surrogatepass'), line, start, end
+    at += size
+
+def table(tokens, file = None):
+  from rich.console import Console
+  from rich.table   import Table
+
+  table = Table(show_lines = True)
+  table.add_column("Type", justify = "center")
+  table.add_column("Value", justify = "center")
+  table.add_column("Line number", justify = "center")
+
+  for token in tokens:
+    table.add_row(token.type, str(token.value), str(token.lineno))
+
+  if errors_detected() == 0:
+    console = Console(file = file)
+    console.print(table)
+
+FORMATS = {
+  'jsonl' : jsonl,
+  'binary': binary,
+  'table' : table,
+}
@@ -0,0 +1,285 @@
+'''
+Hand-written scanner for B-Minor (main.py --scanner).
+
+An alternative to the SLY Lexer that produces the same tokens (type,
+value and line number) and reports the same lexical errors, including
+the quirks of the SLY rules: '!=' is scanned as NOT followed by '=',
+strings may span lines without advancing the line count, and so on.
+
+Instead of trying every rule's regular expression in turn, it
+dispatches on the first character of each token and never rescans the
+input, so it runs in linear time on any input. The one intended
+difference is multiline comments: they end at the first '*/', where
+the SLY rule is greedy and swallows everything up to the last '*/' of
+the file.
+
+The input is scanned as UTF-8 bytes, so str sources are encoded first
+and memory-mapped files are read in place (see Lexer.stream). Token
+'index' and 'end' count bytes.
+'''
+import mmap
+import re
+
+from sly.lex import Token
+
+from core.lexer.lexer import Lexer
+from core.lexer.utils import unescape_char, unescape_string
+from core.errors      import error
+
+_ident    = re.compile(rb"[a-zA-Z_][a-zA-Z0-9_]*")
+_number   = re.compile(rb"[0-9]+(\.[0-9]+|[a-zA-Z][a-zA-Z0-9_]*)?")
+_fraction = re.compile(rb"\.[0-9]+")
+_hexchar  = re.compile(rb"\\0x[0-9a-fA-F]{2}'")
+_unquoted = re.compile(rb'[^"\\]*')
+
+_keywords = Lexer._remapping['ID']
+
+# Character classes, indexed by byte
+SKIP, NEWLINE, IDENT, DIGIT, DOT, CHAR, STRING, SLASH, OPERATOR, LITERAL, ILLEGAL = range(11)
+
+_classes = [ILLEGAL] * 256
+
+for c in b" \t\r":
+  _classes[c] = SKIP
+
+for c in b"abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ_":
+  _classes[c] = IDENT
+
+for c in b"0123456789":
+  _classes[c] = DIGIT
+
+for c in Lexer.literals.encode():
+  _classes[c] = LITERAL
+
+for c in b"!<>=&|+-":
+  _classes[c] = OPERATOR
+
+_classes[ord("\n")] = NEWLINE
+_classes[ord(".")]  = DOT
+_classes[ord("'")]  = CHAR
+_classes[ord('"')]  = STRING
+_classes[ord("/")]  = SLASH
+
+# Operators in the order the SLY rules try them. '!=' is missing on
+# purpose: NOT is defined before NE, so the Lexer never produces NE.
+_pairs   = {b"<=": "LE", b">=": "GE", b"==": "EQ", b"&&": "LAND", b"||": "LOR", b"++": "INC", b"--": "DEC"}
+_singles = {b"!": "NOT", b"<": "LT", b">": "GT"}
+
+_printable = range(0x20, 0x7F)
+_escapes   = b"abefnrtv\\'\""
+
+class Scanner:
+  def __init__(self):
+    self.lineno = 1
+    self.index = 0
+
+  def tokenize(self, text, lineno = 1, index = 0):
+    if isinstance(text, str):
+      text = text.encode('utf-8')
+
+    classes = _classes
+    size = len(text)
+
+    release = text.madvise if isinstance(text, mmap.mmap) and hasattr(mmap, 'MADV_DONTNEED') else None
+    released = 0
+
+    # Every '/*' at or after this offset is unclosed, and so is every
+    # '"' before this one: remembering where the last search failed
+    # keeps bad input from being rescanned.
+    unclosed_comment = size
+    unclosed_string = -1
+
+    try:
+      while index < size:
+        if release and index - released >= Lexer.RELEASE:
+          upto = index - index % mmap.PAGESIZE
+          release(mmap.MADV_DONTNEED, released, upto - released)
+          released = upto
+
+        kind = classes[text[index]]
+
+        if kind is SKIP:
+          index += 1
+          continue
+
+        if kind is NEWLINE:
+          end = index + 1
+
+          while end < size and text[end] == 10:
+            end += 1
+
+          lineno += end - index
+          index = end
+          continue
+
+        tok = Token()
+        tok.lineno = lineno
+        tok.index = index
+
+        if kind is IDENT:
+          end = _ident.match(text, index).end()
+          tok.value = text[index:end].decode('ascii')
+          tok.type = _keywords.get(tok.value, 'ID')
+
+        elif kind is DIGIT:
+          m = _number.match(text, index)
+          end = m.end()
+          tail = m.group(1)
+
+          if tail and tail[0] != 46:
+            # Like the Lexer, also skip the character after the identifier
+            error(f"Illegal identiifer '{text[index:end].decode('ascii')}'", lineno, "Lexical")
+            index = end + 1
+
+            while index < size and 0x80 <= text[index] < 0xC0:
+              index += 1
+
+            continue
+
+          if tail:
+            tok.type = 'FLOAT_LITERAL'
+            tok.value = float(text[index:end])
+          else:
+            tok.type = 'INTEGER_LITERAL'
+            tok.value = int(text[index:end])
+
+        elif kind is DOT:
+          m = _fraction.match(text, index)
+
+          if not m:
+            index = self.illegal(text, index, lineno)
+            continue
+
+          end = m.end()
+          tok.type = 'FLOAT_LITERAL'
+          tok.value = float(text[index:end])
+
+        elif kind is CHAR:
+          end = self.char(text, index, size)
+
+          if end is None:
+            index = self.illegal(text, index, lineno)
+            continue
+
+          tok.type = 'CHAR_LITERAL'
+
+          try:
+            tok.value = unescape_char(text[index + 1:end - 1].decode('ascii'))
+          except ValueError as err:
+            error(str(err), lineno, "Lexical")
+            tok.value = None
+
+        elif kind is STRING:
+          end = None
+
+          if index > unclosed_string:
+            end = self.string(text, index + 1, size)
+
+            if end < 0:
+              unclosed_string = -end
+              end = None
+
+          if end is None:
+            index = self.illegal(text, index, lineno)
+            continue
+
+          tok.type = 'STRING_LITERAL'
+          tok.value = unescape_string(text[index + 1:end - 1].decode('utf-8'))
+
+        elif kind is SLASH:
+          follow = text[index + 1:index + 2]
+
+          if follow == b"/":
+            end = text.find(b"\n", index)
+            index = size if end < 0 else end
+            continue
+
+          if follow == b"*":
+            close = text.find(b"*/", index + 2) if index + 2 < unclosed_comment else -1
+
+            if close >= 0:
+              end = close + 2
+              lineno += text[index:end].count(b"\n")
+              index = end
+              continue
+
+            unclosed_comment = min(unclosed_comment, index + 2)
+
+          end = index + 1
+          tok.type = tok.value = "/"
+
+        elif kind is OPERATOR:
+          pair = text[index:index + 2]
+          single = pair[:1]
+
+          if pair in _pairs:
+            end = index + 2
+            tok.type = _pairs[pair]
+            tok.value = pair.decode('ascii')
+          elif single in _singles:
+            end = index + 1
+            tok.type = _singles[single]
+            tok.value = single.decode('ascii')
+          elif single in (b"=", b"+", b"-"):
+            end = index + 1
+            tok.type = tok.value = single.decode('ascii')
+          else:
+            index = self.illegal(text, index, lineno)
+            continue
+
+        elif kind is LITERAL:
+          end = index + 1
+          tok.type = tok.value = chr(text[index])
+
+        else:
+          index = self.illegal(text, index, lineno)
+          continue
+
+        tok.end = index = end
+        yield tok
+    finally:
+      self.index = index
+      self.lineno = lineno
+
+  def char(self, text, index, size):
+    '''
+    End of the character literal at index, or None. A printable
+    character is tried before an escape, as in the Lexer's rule.
+    '''
+    if index + 2 < size and text[index + 1] in _printable and text[index + 2] == 39:
+      return index + 3
+
+    if index + 3 < size and text[index + 1] == 92 and text[index + 2] in _escapes and text[index + 3] == 39:
+      return index + 4
+
+    m = _hexchar.match(text, index + 1)
+    return m.end() if m else None
+
+  def string(self, text, index, size):
+    '''
+    End of the string literal whose contents start at index, or minus
+    the offset where it turned out to be unterminated.
+    '''
+    while True:
+      index = _unquoted.match(text, index).end()
+
+      if index >= size:
+        return -index
+
+      if text[index] == 34:
+        return index + 1
+
+      # A backslash escapes any character but a newline
+      if index + 1 >= size or text[index + 1] == 10:
+        return -index
+
+      index += 2
+
+  def illegal(self, text, index, lineno):
+    '''
+    Report the character at index and return the offset after it.
+    '''
+    value = bytes(text[index:index + 4]).decode('utf-8', 'replace')[0]
+    error(f"Illegal character {value}", lineno, "Lexical")
+
+    return index + (len(value.encode('utf-8')) if value != '\ufffd' else 1)
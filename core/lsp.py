@@ -0,0 +1,390 @@
+'''
+Language server for B-Minor over stdio (main.py --lsp).
+
+Speaks the part of the Language Server Protocol an editor needs for
+diagnostics, go-to-definition and hover. Every open document keeps an
+IncrementalCompiler (see core.watch) holding the tokens, AST and
+symbol tables of each top-level declaration, so a keystroke only
+re-lexes, re-parses and re-checks the declaration it touched. A
+declaration with lexical or syntax errors is reported and left out,
+the rest of the document is still analyzed.
+
+Positions are counted in characters, which matches the UTF-16 offsets
+of the protocol for the ASCII sources B-Minor accepts.
+'''
+import io
+import json
+import re
+import sys
+
+from bisect      import bisect_right
+from collections import defaultdict
+
+from core.session      import CompilerSession
+from core.watch        import IncrementalCompiler
+from core.parser.model import *
+
+# JSON-RPC error codes
+METHOD_NOT_FOUND = -32601
+INTERNAL_ERROR   = -32603
+
+def read_message(stream):
+  '''
+  Read one message from stream, or return None at end of input.
+  '''
+  length = None
+
+  while True:
+    line = stream.readline()
+
+    if not line:
+      return None
+
+    line = line.strip()
+
+    if not line:
+      break
+
+    name, _, value = line.decode('ascii').partition(':')
+
+    if name.strip().lower() == 'content-length':
+      length = int(value)
+
+  if length is None:
+    return None
+
+  return json.loads(stream.read(length))
+
+def write_message(stream, message):
+  data = json.dumps(message).encode('utf-8')
+  stream.write(b'Content-Length: %d\r\n\r\n' % len(data) + data)
+  stream.flush()
+
+def definition(decl, name, line, env):
+  '''
+  The declaration the identifier name on the given line refers to inside
+  the top-level declaration decl: the one core.semantic.resolver bound a
+  location or call to, else a declaration of that name on the line.
+  Globals are taken from env, since the node bound may have been parsed
+  again since decl was checked.
+  '''
+  declared = None
+  stack = [decl]
+
+  while stack:
+    n = stack.pop()
+
+    if isinstance(n, Node):
+      if getattr(n, 'name', None) == name and n.lineno == line:
+        if isinstance(n, Reference):
+          symbol = getattr(n, 'symbol', None)
+
+          if symbol is not None and symbol.depth == 0:
+            symbol = env.get(symbol.name)
+
+          return symbol
+
+        if declared is None and isinstance(n, (Declaration, Param)):
+          declared = n
+
+      stack.extend(reversed(values(n)))
+    elif isinstance(n, list):
+      stack.extend(reversed(n))
+
+  return declared
+
+def describe(n):
+  '''
+  The declaration of n as it would be written in B-Minor.
+  '''
+  if isinstance(n, FuncDecl):
+    params = ", ".join(describe(p) for p in n.params)
+    return f"{n.name}: function {n.type} ({params})"
+
+  if isinstance(n, (ArrayDecl, ArrayParam)):
+    size = n.size.value if isinstance(n.size, Literal) else ""
+    return f"{n.name}: array [{size}] {n.type}"
+
+  return f"{n.name}: {n.type}"
+
+class Document:
+  def __init__(self, uri, text, version = None):
+    self.uri = uri
+    self.text = text
+    self.version = version
+    self.compiler = IncrementalCompiler(uri)
+    self.units = []
+    self.offsets = []
+    self.owners = {}
+    self.env = None
+    self.diagnostics = []
+    self.starts = None
+
+  def apply(self, change):
+    '''
+    Apply one entry of 'contentChanges' of a didChange notification.
+    '''
+    if 'range' not in change:
+      self.text = change['text']
+    else:
+      start = self.offset(change['range']['start'])
+      end = self.offset(change['range']['end'])
+      self.text = self.text[:start] + change['text'] + self.text[end:]
+
+  def offset(self, position):
+    starts = self.line_starts()
+    line = position['line']
+
+    if line >= len(starts):
+      return len(self.text)
+
+    return min(starts[line] + position['character'], len(self.text))
+
+  def position(self, offset):
+    starts = self.line_starts()
+    line = bisect_right(starts, offset) - 1
+    return {'line': line, 'character': offset - starts[line]}
+
+  def line_starts(self):
+    if self.starts is None:
+      self.starts = [0] + [m.end() for m in re.finditer('\n', self.text)]
+
+    return self.starts
+
+  def analyze(self):
+    '''
+    Bring tokens, AST, symbol tables and diagnostics up to date with
+    the text. Returns the statistics of the incremental compiler.
+    '''
+    session = CompilerSession(self.uri, file = io.StringIO(), pool = self.compiler.pool)
+    stats = defaultdict(int)
+
+    self.starts = None
+    self.units = self.compiler.parse(self.text, stats, session)
+    self.env = self.compiler.check(self.units, session, stats)
+    self.diagnostics = session.diagnostics
+
+    self.offsets = [u.offset for u in self.units]
+    self.owners = {id(u.decl): u for u in self.units}
+
+    return stats
+
+  def lsp_diagnostics(self):
+    starts = self.line_starts()
+    items = []
+
+    for error_type, lineno, message in self.diagnostics:
+      line = min(lineno, len(starts)) - 1 if isinstance(lineno, int) else len(starts) - 1
+      end = (starts[line + 1] - 1 if line + 1 < len(starts) else len(self.text)) - starts[line]
+
+      item = {
+        'range': {'start': {'line': line, 'character': 0}, 'end': {'line': line, 'character': end}},
+        'severity': 1,
+        'source': 'bminor',
+        'message': message,
+      }
+
+      if error_type:
+        item['code'] = error_type
+
+      items.append(item)
+
+    return items
+
+  def identifier_at(self, position):
+    '''
+    Return (unit, token, line) of the identifier under position.
+    '''
+    offset = self.offset(position)
+    i = bisect_right(self.offsets, offset) - 1
+
+    if i < 0:
+      return None
+
+    unit = self.units[i]
+    index = offset - unit.offset
+
+    for tok in unit.tokens:
+      if tok.type == 'ID' and tok.index <= index <= tok.end:
+        return unit, tok, unit.line + unit.text.count('\n', 0, tok.index)
+
+    return None
+
+  def definition_at(self, position):
+    '''
+    Return (unit, declaration node) of the identifier under position.
+    '''
+    found = self.identifier_at(position)
+
+    if found is None:
+      return None
+
+    unit, tok, line = found
+    decl = definition(unit.decl, tok.value, line, self.env)
+
+    if decl is None:
+      return None
+
+    return self.owners.get(id(decl), unit), decl
+
+  def name_range(self, unit, n):
+    '''
+    Range of the name of declaration n inside unit.
+    '''
+    for tok in unit.tokens:
+      if tok.type == 'ID' and tok.value == n.name and unit.line + unit.text.count('\n', 0, tok.index) == n.lineno:
+        return {'start': self.position(unit.offset + tok.index), 'end': self.position(unit.offset + tok.end)}
+
+    start = {'line': n.lineno - 1, 'character': 0}
+    return {'start': start, 'end': start}
+
+class LanguageServer:
+  def __init__(self, reader, writer):
+    self.reader = reader
+    self.writer = writer
+    self.documents = {}
+    self.shutdown = False
+
+    self.requests = {
+      'initialize'             : self.initialize,
+      'shutdown'               : self.on_shutdown,
+      'textDocument/definition': self.definition,
+      'textDocument/hover'     : self.hover,
+    }
+
+    self.notifications = {
+      'initialized'           : lambda params: None,
+      'exit'                  : self.on_exit,
+      'textDocument/didOpen'  : self.did_open,
+      'textDocument/didChange': self.did_change,
+      'textDocument/didClose' : self.did_close,
+    }
+
+  def send(self, message):
+    message['jsonrpc'] = '2.0'
+    write_message(self.writer, message)
+
+  def notify(self, method, params):
+    self.send({'method': method, 'params': params})
+
+  def dispatch(self, message):
+    method = message.get('method')
+    params = message.get('params') or {}
+
+    if 'id' not in message:
+      handler = self.notifications.get(method)
+
+      try:
+        if handler:
+          handler(params)
+      except SystemExit:
+        raise
+      except Exception as err:
+        print(f"bminor-lsp: {method}: {err!r}", file = sys.stderr)
+
+      return
+
+    handler = self.requests.get(method)
+
+    if handler is None:
+      self.send({'id': message['id'], 'error': {'code': METHOD_NOT_FOUND, 'message': f"Unknown method {method}"}})
+      return
+
+    try:
+      self.send({'id': message['id'], 'result': handler(params)})
+    except Exception as err:
+      self.send({'id': message['id'], 'error': {'code': INTERNAL_ERROR, 'message': repr(err)}})
+
+  def serve(self):
+    while True:
+      message = read_message(self.reader)
+
+      if message is None:
+        return 0 if self.shutdown else 1
+
+      self.dispatch(message)
+
+  # == Lifecycle ==
+
+  def initialize(self, params):
+    return {
+      'capabilities': {
+        'textDocumentSync'  : {'openClose': True, 'change': 2},
+        'definitionProvider': True,
+        'hoverProvider'     : True,
+      },
+      'serverInfo': {'name': 'bminor', 'version': '0.1'},
+    }
+
+  def on_shutdown(self, params):
+    self.shutdown = True
+
+  def on_exit(self, params):
+    sys.exit(0 if self.shutdown else 1)
+
+  # == Document synchronization ==
+
+  def publish(self, document):
+    self.notify('textDocument/publishDiagnostics', {
+      'uri': document.uri,
+      'version': document.version,
+      'diagnostics': document.lsp_diagnostics(),
+    })
+
+  def did_open(self, params):
+    item = params['textDocument']
+    document = Document(item['uri'], item['text'], item.get('version'))
+    self.documents[document.uri] = document
+
+    document.analyze()
+    self.publish(document)
+
+  def did_change(self, params):
+    document = self.documents[params['textDocument']['uri']]
+    document.version = params['textDocument'].get('version')
+
+    for change in params['contentChanges']:
+      document.apply(change)
+      document.starts = None
+
+    document.analyze()
+    self.publish(document)
+
+  def did_close(self, params):
+    uri = params['textDocument']['uri']
+    self.documents.pop(uri, None)
+    self.notify('textDocument/publishDiagnostics', {'uri': uri, 'diagnostics': []})
+
+  # == Language features ==
+
+  def definition(self, params):
+    document = self.documents.get(params['textDocument']['uri'])
+    found = document and document.definition_at(params['position'])
+
+    if not found:
+      return None
+
+    unit, decl = found
+    return {'uri': document.uri, 'range': document.name_range(unit, decl)}
+
+  def hover(self, params):
+    document = self.documents.get(params['textDocument']['uri'])
+    found = document and document.definition_at(params['position'])
+
+    if not found:
+      return None
+
+    _, decl = found
+    unit, tok, _ = document.identifier_at(params['position'])
+
+    return {
+      'contents': {'kind': 'markdown', 'value': f"```bminor\n{describe(decl)}\n```"},
+      'range': {
+        'start': document.position(unit.offset + tok.index),
+        'end': document.position(unit.offset + tok.end),
+      },
+    }
+
+def main():
+  server = LanguageServer(sys.stdin.buffer, sys.stdout.buffer)
+  sys.exit(server.serve())
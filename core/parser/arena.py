@@ -0,0 +1,315 @@
+'''
+Flat AST storage.
+
+An Arena keeps a parsed tree in parallel typed arrays, one entry per
+node in preorder, instead of one object per node:
+
+  kinds   node class, as an index into CLASSES
+  lines   line number (0 when the node has none)
+  types   type the checker gave an expression, as an index into the
+          arena's table of types (0 when it has none)
+  first   where the node's fields start in edges
+
+Every field of a node is one entry of edges, in declaration order. An
+entry is a reference whose low two bits tell what it holds and whose
+other bits are an index: a node, a constant (names, operators, literal
+values and anything else that is not a node, kept once each in
+'constants'), or a list or tuple, whose length and items follow each
+other in edges. Children always come after their parent, so a plain
+loop over the columns visits the whole tree without recursion.
+
+Arena.from_tree() and to_tree() convert to and from the object tree
+without losing anything, line numbers and checker types included.
+
+view() gives a read-only node that reads its fields from the arena on
+access. Views are instances of subclasses of the node classes, so the
+checker, the code generator and any other Visitor walk an arena
+directly, without building the object tree; the types the checker
+assigns go to the types column, and what the resolver binds names to
+to a dictionary of the arena, keyed by node.
+'''
+import contextlib
+import gc
+
+from array       import array
+from dataclasses import fields
+
+import core.parser.model as model
+
+from core.parser.model import Expression, Node
+
+CLASSES = [cls for cls in vars(model).values() if isinstance(cls, type) and issubclass(cls, Node) and cls is not Node]
+KINDS = {cls: kind for kind, cls in enumerate(CLASSES)}
+
+NODE, CONSTANT, LIST, TUPLE = range(4)
+
+_names = {cls: tuple(f.name for f in fields(cls)) for cls in CLASSES}
+
+# Slots the resolver fills in
+_resolved = ('id', 'depth', 'declared_type', 'symbol', 'function')
+_arity = [len(_names[cls]) for cls in CLASSES]
+
+@contextlib.contextmanager
+def _collector_paused():
+  '''
+  Pause the cyclic garbage collector, which would only slow down
+  converting trees: they have no cycles, and a conversion allocates an
+  object or tuple for every node.
+  '''
+  enabled = gc.isenabled()
+  gc.disable()
+
+  try:
+    yield
+  finally:
+    if enabled:
+      gc.enable()
+
+class Arena:
+  def __init__(self):
+    self.kinds = array('B')
+    self.lines = array('i')
+    self.types = array('B')
+    self.first = array('i')
+    self.edges = array('i')
+    self.constants = []
+    self.typenames = [None]   # type id -> type object; 0 means no type
+    self._constants = {}      # (type, value) -> index in constants
+    self._typeids = {}        # type -> type id
+    self._views = {}          # node class -> class of its views
+    self.resolved = {}        # (slot, node index) -> what the resolver put there
+
+  def __len__(self):
+    return len(self.kinds)
+
+  @property
+  def nbytes(self):
+    '''
+    Bytes held by the columns.
+    '''
+    return sum(len(column) * column.itemsize for column in (self.kinds, self.lines, self.types, self.first, self.edges))
+
+  # == Building ==
+
+  def constant(self, value):
+    if type(value) is array:
+      # Packed literals: unhashable, and never shared anyway
+      self.constants.append(value)
+      return len(self.constants) - 1
+
+    key = (type(value), value)
+    index = self._constants.get(key)
+
+    if index is None:
+      index = self._constants[key] = len(self.constants)
+      self.constants.append(value)
+
+    return index
+
+  def typeid(self, t):
+    typeid = self._typeids.get(t)
+
+    if typeid is None:
+      typeid = self._typeids[t] = len(self.typenames)
+      self.typenames.append(t)
+
+    return typeid
+
+  @classmethod
+  def from_tree(cls, root):
+    '''
+    Arena holding the tree under root (usually a Program), which is
+    node 0.
+    '''
+    arena = cls()
+    edges = arena.edges
+
+    # (node, index in edges of the reference to it)
+    stack = [(root, None)]
+
+    with _collector_paused():
+      while stack:
+        node, at = stack.pop()
+        index = len(arena.kinds)
+
+        if at is not None:
+          edges[at] = index << 2 | NODE
+
+        names = _names[type(node)]
+        arena.kinds.append(KINDS[type(node)])
+        arena.lines.append(node.lineno or 0)
+        arena.types.append(arena.typeid(node.type) if 'type' not in names and hasattr(node, 'type') else 0)
+        arena.first.append(len(edges))
+
+        # Children in this node's fields, in field order; references to
+        # them are filled in when they are numbered
+        children = []
+        pending = [(getattr(node, name), len(edges) + i) for i, name in enumerate(names)]
+        pending.reverse()
+        edges.frombytes(bytes(edges.itemsize * len(names)))
+
+        while pending:
+          value, slot = pending.pop()
+
+          if isinstance(value, Node):
+            children.append((value, slot))
+          elif isinstance(value, (list, tuple)):
+            edges[slot] = len(edges) << 2 | (LIST if isinstance(value, list) else TUPLE)
+            edges.append(len(value))
+            start = len(edges)
+            edges.frombytes(bytes(edges.itemsize * len(value)))
+            pending.extend((value[i], start + i) for i in range(len(value) - 1, -1, -1))
+          else:
+            edges[slot] = arena.constant(value) << 2 | CONSTANT
+
+        # Pushed in reverse, so the first child is numbered next
+        children.reverse()
+        stack.extend(children)
+
+    arena._constants = {}
+    return arena
+
+  # == Reading ==
+
+  def value(self, ref, make):
+    '''
+    What the reference ref holds, with each node given by make(index).
+    '''
+    tag, index = ref & 3, ref >> 2
+
+    if tag == NODE:
+      return make(index)
+
+    if tag == CONSTANT:
+      return self.constants[index]
+
+    items = [self.value(item, make) for item in self.edges[index + 1:index + 1 + self.edges[index]]]
+    return items if tag == LIST else tuple(items)
+
+  def fields(self, index):
+    '''
+    References of the fields of node index, in declaration order.
+    '''
+    first = self.first[index]
+    return self.edges[first:first + _arity[self.kinds[index]]]
+
+  def children(self, index):
+    '''
+    Indices of the nodes directly under node index, in field order.
+    '''
+    edges = self.edges
+    found = []
+    refs = list(self.fields(index))
+    refs.reverse()
+
+    while refs:
+      ref = refs.pop()
+      tag = ref & 3
+
+      if tag == NODE:
+        found.append(ref >> 2)
+      elif tag != CONSTANT:
+        start = (ref >> 2) + 1
+        refs.extend(reversed(edges[start:start + edges[start - 1]]))
+
+    return found
+
+  def to_tree(self, root = 0):
+    '''
+    The object tree under node root.
+    '''
+    kinds, lines, types, first, edges = self.kinds, self.lines, self.types, self.first, self.edges
+    constants, typenames = self.constants, self.typenames
+    nodes = [None] * len(kinds)
+
+    with _collector_paused():
+      # Children come after their parent, so building from the last
+      # node back always finds a node's children already built
+      for index in range(len(kinds) - 1, root - 1, -1):
+        kind = kinds[index]
+        start = first[index]
+        args = []
+
+        for ref in edges[start:start + _arity[kind]]:
+          tag = ref & 3
+
+          if tag == NODE:
+            args.append(nodes[ref >> 2])
+          elif tag == CONSTANT:
+            args.append(constants[ref >> 2])
+          else:
+            args.append(self.value(ref, nodes.__getitem__))
+
+        node = nodes[index] = CLASSES[kind](*args)
+        node.lineno = lines[index] or None
+
+        if types[index]:
+          node.type = typenames[types[index]]
+
+    return nodes[root]
+
+  def view(self, index = 0):
+    '''
+    Read-only node index, backed by the arena.
+    '''
+    cls = CLASSES[self.kinds[index]]
+    view_cls = self._views.get(cls) or self._views.setdefault(cls, _view_class(cls))
+    view = view_cls.__new__(view_cls)
+    view._arena = self
+    view._index = index
+    return view
+
+def _field(position):
+  def get(self):
+    arena = self._arena
+    return arena.value(arena.edges[arena.first[self._index] + position], arena.view)
+
+  return property(get)
+
+def _lineno(self):
+  return self._arena.lines[self._index] or None
+
+def _get_type(self):
+  typeid = self._arena.types[self._index]
+
+  if not typeid:
+    raise AttributeError(f"'{type(self).__name__}' object has no attribute 'type'")
+
+  return self._arena.typenames[typeid]
+
+def _set_type(self, t):
+  self._arena.types[self._index] = self._arena.typeid(t)
+
+def _del_type(self):
+  self._arena.types[self._index] = 0
+
+def _slot(name):
+  def get(self):
+    try:
+      return self._arena.resolved[name, self._index]
+    except KeyError:
+      raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'") from None
+
+  def set(self, value):
+    self._arena.resolved[name, self._index] = value
+
+  return property(get, set)
+
+def _view_class(cls):
+  '''
+  Subclass of the node class cls whose instances read from an arena.
+  '''
+  names = _names[cls]
+  namespace = {'__slots__': ('_arena', '_index'), 'lineno': property(_lineno)}
+
+  for position, name in enumerate(names):
+    namespace[name] = _field(position)
+
+  if 'type' not in names and issubclass(cls, Expression):
+    namespace['type'] = property(_get_type, _set_type, _del_type)
+
+  for name in _resolved:
+    if hasattr(cls, name) and name not in names:
+      namespace[name] = _slot(name)
+
+  return type(cls.__name__, (cls,), namespace)
@@ -0,0 +1,164 @@
+'''
+Binary AST cache.
+
+store() writes the checked Program of a source next to it (prog.bminor
+-> prog.bminor.ast), and load() gives it back on later runs without
+lexing, parsing or checking the source again. A Program is only stored
+when it parsed and checked without errors, so what load() returns is
+ready for code generation, checker types included.
+
+The file holds the columns of a core.parser.arena.Arena:
+
+  header      magic, format version, key, and the length in bytes of
+              each column and of the constants
+  columns     kinds, lines, types, first and edges, as raw arrays
+  constants   the arena's constants and the keys of its types, marshalled
+
+The key is a SHA-256 of the format version, the compiler version (a
+hash of the lexer, parser and checker sources), the machine's byte
+order and the source text, so any change to either side makes the file
+stale, and a stale file is simply parsed over. The file is memory
+mapped and each column is copied straight out of the mapping.
+'''
+import hashlib
+import marshal
+import mmap
+import os
+import struct
+import sys
+import tempfile
+
+from array                 import array
+from core.parser.arena     import Arena
+from core.semantic.typesys import from_key
+from core.session          import current_session
+
+FORMAT_VERSION = 3
+MAGIC = b'BMAST\0'
+SUFFIX = '.ast'
+
+_COLUMNS = ('kinds', 'lines', 'types', 'first', 'edges')
+_header = struct.Struct(f'<6sH32s{len(_COLUMNS) + 1}Q')
+
+_version = None
+
+def compiler_version():
+  '''
+  Hash of the sources of every stage that shapes a checked AST.
+  '''
+  global _version
+
+  if _version is None:
+    core = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    h = hashlib.sha256()
+
+    for stage in ('lexer', 'parser', 'semantic'):
+      directory = os.path.join(core, stage)
+
+      for name in sorted(os.listdir(directory)):
+        if name.endswith('.py'):
+          with open(os.path.join(directory, name), 'rb') as file:
+            h.update(name.encode() + b'\0' + file.read())
+
+    _version = h.hexdigest()
+
+  return _version
+
+def key(source):
+  '''
+  Digest of source (str or bytes-like) for this compiler and format.
+  '''
+  h = hashlib.sha256(f"{FORMAT_VERSION}:{compiler_version()}:{sys.byteorder}\n".encode())
+  h.update(source.encode('utf-8') if isinstance(source, str) else source)
+  return h.digest()
+
+def path(filename):
+  return filename + SUFFIX
+
+def dumps(program, digest):
+  '''
+  Bytes of the cache file holding program for a source with key digest.
+  '''
+  arena = Arena.from_tree(program)
+  columns = [getattr(arena, name).tobytes() for name in _COLUMNS]
+  # marshal has no arrays: packed literals go as (typecode, bytes)
+  constants = [(value.typecode, value.tobytes()) if type(value) is array else value for value in arena.constants]
+  keys = [None if t is None else t.key for t in arena.typenames]
+  constants = marshal.dumps((constants, keys))
+  header = _header.pack(MAGIC, FORMAT_VERSION, digest, *map(len, columns), len(constants))
+
+  return b''.join([header, *columns, constants])
+
+def loads(data, digest):
+  '''
+  The Program in data (bytes-like), or None if data is not a cache file
+  for a source with key digest.
+  '''
+  if len(data) < _header.size:
+    return None
+
+  magic, version, stored, *sizes = _header.unpack_from(data)
+
+  if magic != MAGIC or version != FORMAT_VERSION or stored != digest or _header.size + sum(sizes) != len(data):
+    return None
+
+  arena = Arena()
+  offset = _header.size
+
+  with memoryview(data) as view:
+    for name, size in zip(_COLUMNS, sizes):
+      getattr(arena, name).frombytes(view[offset:offset + size])
+      offset += size
+
+    constants, keys = marshal.loads(view[offset:])
+
+  # Names and strings are shared through the session's pool, as if the
+  # parser had made them
+  intern = current_session().pool.intern
+  arena.constants = [intern(value) if type(value) is str else array(*value) if type(value) is tuple else value
+                     for value in constants]
+  arena.typenames = [None if key is None else from_key(key) for key in keys]
+
+  return arena.to_tree()
+
+def load(filename, source):
+  '''
+  The checked Program cached for source, read from filename, or None
+  when there is none for this exact source and compiler.
+  '''
+  try:
+    with open(path(filename), 'rb') as file, mmap.mmap(file.fileno(), 0, access = mmap.ACCESS_READ) as data:
+      return loads(data, key(source))
+  except (OSError, ValueError, EOFError, TypeError, struct.error):
+    return None
+
+def store(filename, source, program):
+  '''
+  Cache program, which must have parsed and checked without errors, as
+  the Program of source, read from filename.
+  '''
+  target = path(filename)
+
+  # Written to a temporary file and renamed, so concurrent compilers
+  # never read a partially written file. mkstemp makes it private; it
+  # gets the permissions of the source it sits next to.
+  tmp = None
+
+  try:
+    fd, tmp = tempfile.mkstemp(dir = os.path.dirname(target) or '.', suffix = '.tmp')
+
+    with os.fdopen(fd, 'wb') as file:
+      file.write(dumps(program, key(source)))
+
+    os.chmod(tmp, os.stat(filename).st_mode & 0o666)
+    os.replace(tmp, target)
+    tmp = None
+  except OSError:
+    pass
+  finally:
+    # Whatever failed, no temporary file is left behind
+    if tmp is not None:
+      try:
+        os.unlink(tmp)
+      except OSError:
+        pass
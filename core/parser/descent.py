@@ -0,0 +1,499 @@
+'''
+Hand-written parser for B-Minor (main.py --descent).
+
+An alternative to the SLY Parser that builds the same core.parser.model
+nodes, with the same line numbers, and reports the same syntax errors.
+Declarations and statements are parsed by recursive descent. Binary
+operators are parsed by precedence climbing (a Pratt parser): a single
+loop covers the expr2 to expr7 levels of the grammar, where the LALR
+parser makes a reduction at every level for every operand.
+
+The grammar has no conflicts, so the LALR parser reports an error at
+the first token that cannot continue a valid program. This parser
+checks every token against exactly the tokens the grammar allows at
+that point, so it stops at the same token. It also pulls tokens from
+the lexer one at a time, as the LALR parser does, which keeps lexical
+and syntax errors in the same order. Recovery works like SLY's for a
+grammar without error rules:
+  - the offending token is dropped and parsing restarts at a new
+    declaration;
+  - errors are not reported again until three tokens have been
+    accepted;
+  - the program holds only the declarations parsed since the last
+    restart;
+  - running out of input in the middle of a declaration gives None.
+
+Lists and chains of binary operators are parsed in loops; only nesting
+(parentheses, blocks, unary operators, chained assignments) uses the
+Python stack. Nesting deeper than Python's recursion limit allows,
+which the LALR parser handles, is reported as a syntax error and gives
+None.
+'''
+from sly.lex import Token
+
+from core.errors        import error
+from core.parser.model  import *
+from core.parser.parser import _L, Initializer, syntax_error
+from core.session       import current_session
+
+_END = Token()
+_END.type = '$end'
+_END.value = None
+_END.lineno = None
+
+# Binary operators and their precedence, from the expr2 to the expr7
+# rules of the grammar. All of them are left associative.
+_binary = {
+  'LOR' : 1,
+  'LAND': 2,
+  'EQ'  : 3, 'NE': 3, 'LT': 3, 'LE': 3, 'GT': 3, 'GE': 3,
+  '+'   : 4, '-' : 4,
+  '*'   : 5, '/' : 5, '%': 5,
+  '^'   : 6,
+}
+
+_opers = {'LOR': '||', 'LAND': '&&'}
+
+# Tokens that start an operand (the expr9 rule)
+_primary = {'ID', 'INTEGER_LITERAL', 'FLOAT_LITERAL', 'STRING_LITERAL', 'CHAR_LITERAL', 'TRUE', 'FALSE', '('}
+
+_types = {
+  'INTEGER': 'integer',
+  'FLOAT'  : 'float',
+  'STRING' : 'string',
+  'CHAR'   : 'char',
+  'BOOLEAN': 'boolean',
+  'VOID'   : 'void',
+}
+
+# Tokens SLY would have shifted before a syntax error is reported again
+_RECOVER = 3
+
+class _Error(Exception):
+  pass
+
+class DescentParser:
+  def __init__(self):
+    # Names and string literals share the session's copies
+    self.intern = current_session().pool.intern
+
+  # == Tokens ==
+
+  def advance(self):
+    '''
+    Accept the current token and return it.
+    '''
+    tok = self.tok
+    self.shifted += 1
+    self.tok = next(self.tokens, _END)
+    return tok
+
+  def expect(self, type):
+    if self.tok.type != type:
+      raise _Error()
+
+    return self.advance()
+
+  def parse(self, tokens):
+    try:
+      return self.program(tokens)
+    except RecursionError:
+      error("Nesting too deep", self.tok.lineno if self.tok is not _END else "EOF", "Syntax")
+      return None
+
+  def program(self, tokens):
+    self.tokens = tokens
+    self.tok = next(tokens, _END)
+    self.shifted = 0
+    recovered = None
+
+    while True:
+      decls = []
+
+      try:
+        while self.tok.type == 'ID':
+          decls.append(self.decl(self.advance()))
+
+        if self.tok is _END:
+          return _L(Program(decls), decls[0].lineno if decls else None)
+
+        raise _Error()
+      except _Error:
+        if recovered is None or self.shifted - recovered >= _RECOVER:
+          syntax_error(self.tok if self.tok is not _END else None)
+
+        if self.tok is _END:
+          return None
+
+        # The offending token is dropped without being accepted
+        self.tok = next(self.tokens, _END)
+        recovered = self.shifted
+
+  # == Declarations ==
+
+  def decl(self, name):
+    '''
+    The declaration of name, whose ID token has been accepted.
+    '''
+    self.expect(':')
+    type = self.tok.type
+
+    if type in _types:
+      self.advance()
+
+      if self.tok.type == '=':
+        self.advance()
+        value = self.expr()
+        self.expect(';')
+        return _L(VarDecl(name=self.intern(name.value), type=_types[type], value=value), name.lineno)
+
+      self.expect(';')
+      return _L(VarDecl(name=self.intern(name.value), type=_types[type]), name.lineno)
+
+    if type == 'ARRAY':
+      array = self.array()
+
+      if self.tok.type == '=':
+        self.advance()
+        self.expect('{')
+        value = self.opt_expr_list('}', Initializer()).value()
+        self.advance()
+        self.expect(';')
+        return _L(ArrayDecl(name=self.intern(name.value), type=array[0], size=array[1], value=value), name.lineno)
+
+      self.expect(';')
+      return _L(ArrayDecl(name=self.intern(name.value), type=array[0], size=array[1]), name.lineno)
+
+    if type == 'FUNCTION':
+      self.advance()
+      type = self.tok.type
+
+      if type in _types:
+        self.advance()
+        result = _types[type]
+      elif type == 'ARRAY':
+        result = self.array()[0]
+      else:
+        raise _Error()
+
+      self.expect('(')
+      params = self.params()
+      self.advance()
+
+      if self.tok.type == '=':
+        self.advance()
+        self.expect('{')
+        body = []
+
+        while self.tok.type != '}':
+          body.append(self.stmt())
+
+        self.advance()
+        self.expect(';')
+        return _L(FuncDecl(name=self.intern(name.value), type=result, params=params, body=body), name.lineno)
+
+      self.expect(';')
+      return _L(FuncDecl(name=self.intern(name.value), type=result, params=params, body=[]), name.lineno)
+
+    raise _Error()
+
+  def array(self):
+    '''
+    An array type as type_array_sized gives it: (element type, size),
+    where the element type of a nested array is itself such a pair.
+    '''
+    self.advance()
+    self.expect('[')
+    size = self.opt_expr(']')
+    self.advance()
+    type = self.tok.type
+
+    if type in _types:
+      self.advance()
+      return (_types[type], size)
+
+    if type == 'ARRAY':
+      return (self.array(), size)
+
+    raise _Error()
+
+  def params(self):
+    '''
+    The parameters up to the closing ')', which is left to the caller.
+    '''
+    params = []
+
+    if self.tok.type == ')':
+      return params
+
+    while True:
+      name = self.expect('ID')
+      self.expect(':')
+      type = self.tok.type
+
+      if type in _types:
+        self.advance()
+        params.append(_L(VarParam(name=self.intern(name.value), type=_types[type]), name.lineno))
+      elif type == 'ARRAY':
+        array = self.array()
+        params.append(_L(ArrayParam(name=self.intern(name.value), type=array[0], size=array[1]), name.lineno))
+      else:
+        raise _Error()
+
+      if self.tok.type != ',':
+        if self.tok.type != ')':
+          raise _Error()
+
+        return params
+
+      self.advance()
+
+  # == Statements ==
+
+  def stmt(self):
+    type = self.tok.type
+
+    if type == 'ID':
+      name = self.advance()
+
+      if self.tok.type == ':':
+        return self.decl(name)
+
+      value = self.name(name)
+      self.expect(';')
+      return value
+
+    if type == 'IF':
+      lineno = self.advance().lineno
+      self.expect('(')
+      condition = self.opt_expr(')')
+      self.advance()
+      then_branch = self.block()
+
+      if self.tok.type == 'ELSE':
+        self.advance()
+        return _L(IfStmt(condition=condition, then_branch=then_branch, else_branch=self.block()), lineno)
+
+      return _L(IfStmt(condition=condition, then_branch=then_branch), lineno)
+
+    if type == 'FOR':
+      lineno = self.advance().lineno
+      self.expect('(')
+      init = self.opt_expr(';')
+      self.advance()
+      condition = self.opt_expr(';')
+      self.advance()
+      incr = self.opt_expr(')')
+      self.advance()
+      return _L(ForStmt(init=init, condition=condition, incr=incr, body=self.block()), lineno)
+
+    if type == 'WHILE':
+      lineno = self.advance().lineno
+      self.expect('(')
+      condition = self.opt_expr(')')
+      self.advance()
+      return _L(WhileStmt(condition=condition, body=self.block()), lineno)
+
+    if type == 'DO':
+      lineno = self.advance().lineno
+      body = self.block()
+      self.expect('WHILE')
+      self.expect('(')
+      condition = self.opt_expr(')')
+      self.advance()
+      self.expect(';')
+      return _L(DoWhileStmt(body=body, condition=condition), lineno)
+
+    if type == 'PRINT':
+      lineno = self.advance().lineno
+      value = self.opt_expr_list(';')
+      self.advance()
+      return _L(PrintStmt(value=value), lineno)
+
+    if type == 'RETURN':
+      lineno = self.advance().lineno
+      value = self.opt_expr(';')
+      self.advance()
+      return _L(ReturnStmt(value=value), lineno)
+
+    if type == '{':
+      return self.block()
+
+    value = self.expr()
+    self.expect(';')
+    return value
+
+  def block(self):
+    lineno = self.expect('{').lineno
+    body = [self.stmt()]
+
+    while self.tok.type != '}':
+      body.append(self.stmt())
+
+    self.advance()
+    return _L(BlockStmt(body=body), lineno)
+
+  # == Expressions ==
+
+  def opt_expr(self, close):
+    '''
+    An optional expression before the token close, which is checked
+    but left to the caller.
+    '''
+    if self.tok.type == close:
+      return None
+
+    value = self.expr()
+
+    if self.tok.type != close:
+      raise _Error()
+
+    return value
+
+  def opt_expr_list(self, close, values = None):
+    '''
+    A possibly empty comma separated list of expressions before the
+    token close, which is checked but left to the caller, appended to
+    values (a new list by default).
+    '''
+    if values is None:
+      values = []
+
+    if self.tok.type == close:
+      return values
+
+    while True:
+      values.append(self.expr())
+      type = self.tok.type
+
+      if type != ',':
+        if type != close:
+          raise _Error()
+
+        return values
+
+      self.advance()
+
+  def expr(self):
+    '''
+    An expression of the expr1 rule: assignments and increments, whose
+    targets must be a plain lval, or a binary expression.
+    '''
+    tok = self.tok
+    type = tok.type
+
+    if type == 'ID':
+      return self.name(self.advance())
+
+    if type == 'INC' or type == 'DEC':
+      self.advance()
+      target = self.lval(self.expect('ID'))
+      return _L(UnaryOper(oper="++" if type == 'INC' else "--", expr=target), tok.lineno)
+
+    return self.binary(self.unary(), tok.lineno, 1)
+
+  def name(self, name):
+    '''
+    An expression of the expr1 rule starting with name, an accepted ID
+    token.
+    '''
+    if self.tok.type == '(':
+      return self.binary(self.call(name), name.lineno, 1)
+
+    target = self.lval(name)
+    type = self.tok.type
+
+    if type == '=':
+      self.advance()
+      return _L(Assignment(target=target, value=self.expr()), name.lineno)
+
+    if type == 'INC' or type == 'DEC':
+      self.advance()
+      return _L(UnaryOper(oper="++" if type == 'INC' else "--", expr=target), name.lineno)
+
+    return self.binary(target, name.lineno, 1)
+
+  def binary(self, left, lineno, level):
+    '''
+    Extend left, an operand starting on line lineno, with every binary
+    operator of at least the given precedence that follows it.
+    '''
+    binary = _binary
+
+    while True:
+      tok = self.tok
+      prec = binary.get(tok.type)
+
+      if prec is None or prec < level:
+        return left
+
+      self.advance()
+      start = self.tok.lineno
+      right = self.binary(self.unary(), start, prec + 1)
+      left = _L(BinOper(oper=_opers.get(tok.type, tok.value), left=left, right=right), lineno)
+
+  def unary(self):
+    '''
+    An operand of the binary operators (the expr8 rule).
+    '''
+    tok = self.tok
+    type = tok.type
+
+    if type == '-' or type == 'NOT':
+      self.advance()
+      return _L(UnaryOper(oper=tok.value, expr=self.unary()), tok.lineno)
+
+    if type not in _primary:
+      raise _Error()
+
+    self.advance()
+
+    if type == 'ID':
+      if self.tok.type == '(':
+        return self.call(tok)
+
+      return self.lval(tok)
+
+    if type == 'INTEGER_LITERAL':
+      return _L(Literal(value=int(tok.value), type="integer"), tok.lineno)
+
+    if type == 'FLOAT_LITERAL':
+      return _L(Literal(value=float(tok.value), type="float"), tok.lineno)
+
+    if type == 'STRING_LITERAL':
+      value = tok.value
+      if len(value) >= 2 and value[0] == '"' and value[-1] == value[0]:
+        value = value[1:-1]
+      return _L(Literal(value=self.intern(value), type="string"), tok.lineno)
+
+    if type == 'CHAR_LITERAL':
+      value = tok.value
+      if len(value) >= 2 and value[0] == "'" and value[-1] == value[0]:
+        value = value[1:-1]
+      return _L(Literal(value=value, type="char"), tok.lineno)
+
+    if type == 'TRUE':
+      return _L(Literal(value=True, type="boolean"), tok.lineno)
+
+    if type == 'FALSE':
+      return _L(Literal(value=False, type="boolean"), tok.lineno)
+
+    # '(' expr ')'
+    value = self.expr()
+    self.expect(')')
+    return value
+
+  def lval(self, name):
+    if self.tok.type == '[':
+      self.advance()
+      index = self.expr()
+      self.expect(']')
+      return _L(ArrayLoc(name=self.intern(name.value), index=index), name.lineno)
+
+    return _L(VarLoc(name=self.intern(name.value)), name.lineno)
+
+  def call(self, name):
+    self.advance()
+    args = self.opt_expr_list(')')
+    self.advance()
+    return _L(FuncCall(name=self.intern(name.value), args=args), name.lineno)
@@ -2,6 +2,29 @@ from core.parser.model import *
 
 from graphviz import Digraph
 
+class _Lines:
+  # Stands in for the list of statements of a Digraph, writing each one
+  # out as graphviz adds it
+  __slots__ = ('append',)
+
+  def __init__(self, file):
+    self.append = file.write
+
+class DotWriter(Digraph):
+  '''
+  Digraph that writes every statement to file as soon as it is added,
+  quoted exactly as graphviz quotes it, instead of keeping the whole
+  graph in memory. close() ends the graph.
+  '''
+  def __init__(self, file, name = 'AST'):
+    super().__init__(name)
+    self.file = file
+    file.write(next(iter(self)))
+    self.body = _Lines(file)
+
+  def close(self):
+    self.file.write('}\n')
+
 class ASTPrinter(Visitor):
   node_defaults = {
     'shape' : 'box',
@@ -20,8 +43,8 @@ class ASTPrinter(Visitor):
     'lightgrey'
   ]
 
-  def __init__(self):
-    self.dot = Digraph('AST')
+  def __init__(self, file = None):
+    self.dot = Digraph('AST') if file is None else DotWriter(file)
     self.dot.attr('node', **self.node_defaults)
     self.dot.attr('edge', **self.edge_defaults)
     self._seq = 0
@@ -35,17 +58,67 @@ class ASTPrinter(Visitor):
     return f'n{self._seq:02d}'
     
   @classmethod
-  def render(cls, n: Node):
-    dot = cls()
-    n.accept(dot)
+  def render(cls, n: Node, file = None, depth = None):
+    '''
+    Graph of the tree under n: a Digraph, or a DotWriter that has
+    written it to file. With depth, nodes more than depth levels below
+    n are drawn as one elided box each instead of being visited.
+    '''
+    dot = cls(file)
+
+    if depth is None:
+      n.accept(dot)
+    else:
+      dot.limited(dot.visit(n), depth)
+
+    if file is not None:
+      dot.dot.close()
+
     return dot.dot
-    
+
+  def limited(self, result, depth):
+    '''
+    drive() for render(), answering requests for nodes deeper than
+    depth with an elided box.
+    '''
+    if type(result) is not GeneratorType:
+      return result
+
+    stack = [result]
+    value = None
+
+    while stack:
+      try:
+        request = stack[-1].send(value)
+      except StopIteration as stop:
+        stack.pop()
+        value = stop.value
+        continue
+
+      if len(stack) > depth:
+        value = self.elided(request[0] if type(request) is tuple else request)
+        continue
+
+      value = self.visit(*request) if type(request) is tuple else self.visit(request)
+
+      if type(value) is GeneratorType:
+        stack.append(value)
+        value = None
+
+    return value
+
+  def elided(self, n: Node):
+    name = self.name
+    self.dot.node(name, label=f"{n.__class__.__name__} ...", style='dashed')
+
+    return name
+
   def visit(self, n: Program):
     name = self.name
     self.dot.node(name, label='Program')
 
     for stmt in n.body:
-      self.dot.edge(name, stmt.accept(self))
+      self.dot.edge(name, (yield stmt))
 
     return name
   
@@ -59,7 +132,7 @@ class ASTPrinter(Visitor):
     self.dot.edge(name, var_type)
 
     if n.value:
-      self.dot.edge(name, n.value.accept(self))
+      self.dot.edge(name, (yield n.value))
 
     return name
   
@@ -73,7 +146,7 @@ class ASTPrinter(Visitor):
     self.dot.edge(name, array_type)
 
     for value in n.value:
-      self.dot.edge(name, value.accept(self))
+      self.dot.edge(name, (yield value))
 
     return name
 
@@ -87,7 +160,7 @@ class ASTPrinter(Visitor):
     self.dot.edge(name, function_type)
 
     for stmt in n.body:
-      self.dot.edge(name, stmt.accept(self))
+      self.dot.edge(name, (yield stmt))
 
     return name
   
@@ -108,7 +181,7 @@ class ASTPrinter(Visitor):
     self.dot.edge(name, n.type.accept(self))
     
     if n.size:
-      self.dot.edge(name, n.size.accept(self))
+      self.dot.edge(name, (yield n.size))
 
     return name
   
@@ -117,8 +190,8 @@ class ASTPrinter(Visitor):
 
     self.dot.node(name, label="Assignment")
 
-    self.dot.edge(name, n.target.accept(self))
-    self.dot.edge(name, n.value.accept(self))
+    self.dot.edge(name, (yield n.target))
+    self.dot.edge(name, (yield n.value))
 
     return name
   
@@ -134,22 +207,22 @@ class ASTPrinter(Visitor):
 
     self.dot.node(name, label=f"ArrayLoc: {n.name}")
     
-    self.dot.edge(name, n.index.accept(self))
+    self.dot.edge(name, (yield n.index))
 
     return name
   
   def visit(self, n: BinOper):
     name = self.name
     self.dot.node(name, label=f'{n.oper}', shape='circle', color=self.color_defaults[2])
-    self.dot.edge(name, n.left.accept(self))
-    self.dot.edge(name, n.right.accept(self))
+    self.dot.edge(name, (yield n.left))
+    self.dot.edge(name, (yield n.right))
 
     return name
   
   def visit(self, n: UnaryOper):
     name = self.name
     self.dot.node(name, label=f'{n.oper}', shape='circle', color=self.color_defaults[0])
-    self.dot.edge(name, n.expr.accept(self))
+    self.dot.edge(name, (yield n.expr))
 
     return name
   
@@ -178,7 +251,7 @@ class ASTPrinter(Visitor):
     self.dot.node(name, label=f"BlockStmt", color=self.color_defaults[3])
 
     for stmt in n.body:
-      self.dot.edge(name, stmt.accept(self))
+      self.dot.edge(name, (yield stmt))
     
     return name
   
@@ -188,10 +261,10 @@ class ASTPrinter(Visitor):
     self.dot.node(name, label=f"WhileStmt")
 
     if n.condition:
-      self.dot.edge(name, n.condition.accept(self))
+      self.dot.edge(name, (yield n.condition))
 
     if n.body:
-      self.dot.edge(name, n.body.accept(self))
+      self.dot.edge(name, (yield n.body))
 
     return name
 
@@ -201,10 +274,10 @@ class ASTPrinter(Visitor):
     self.dot.node(name, label=f"DoWhileStmt")
 
     if n.body:
-      self.dot.edge(name, n.body.accept(self))
+      self.dot.edge(name, (yield n.body))
 
     if n.condition:
-      self.dot.edge(name, n.condition.accept(self))
+      self.dot.edge(name, (yield n.condition))
 
     return name
 
@@ -214,16 +287,16 @@ class ASTPrinter(Visitor):
     self.dot.node(name, label=f"ForStmt")
 
     if n.init:
-      self.dot.edge(name, n.init.accept(self))
+      self.dot.edge(name, (yield n.init))
 
     if n.condition:
-      self.dot.edge(name, n.condition.accept(self))
+      self.dot.edge(name, (yield n.condition))
 
     if n.incr:
-      self.dot.edge(name, n.incr.accept(self))
+      self.dot.edge(name, (yield n.incr))
 
     if n.body:
-      self.dot.edge(name, n.body.accept(self))
+      self.dot.edge(name, (yield n.body))
 
     return name
   
@@ -233,13 +306,13 @@ class ASTPrinter(Visitor):
     self.dot.node(name, label=f"IfStmt")
 
     if n.condition:
-      self.dot.edge(name, n.condition.accept(self))
+      self.dot.edge(name, (yield n.condition))
 
     if n.then_branch is not None:
-      self.dot.edge(name, n.then_branch.accept(self))
+      self.dot.edge(name, (yield n.then_branch))
 
     if n.else_branch is not None:
-      self.dot.edge(name, n.else_branch.accept(self))
+      self.dot.edge(name, (yield n.else_branch))
 
     return name
 
@@ -249,7 +322,7 @@ class ASTPrinter(Visitor):
     self.dot.node(name, label="PrintStmt")
 
     for stmt in n.value:
-      self.dot.edge(name, stmt.accept(self))
+      self.dot.edge(name, (yield stmt))
 
     return name
   
@@ -258,7 +331,7 @@ class ASTPrinter(Visitor):
 
     self.dot.node(name, label="ReturnStmt")
 
-    self.dot.edge(name, n.value.accept(self))
+    self.dot.edge(name, (yield n.value))
 
     return name
   
@@ -268,6 +341,6 @@ class ASTPrinter(Visitor):
     self.dot.node(name, label=f"FuncCall: {n.name}")
 
     for arg in n.args:
-      self.dot.edge(name, arg.accept(self))
+      self.dot.edge(name, (yield arg))
 
     return name
\ No newline at end of file
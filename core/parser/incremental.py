@@ -0,0 +1,180 @@
+'''
+Incremental reparsing.
+
+reparse() brings the Program parsed from a TokenBuffer up to date with
+an edit of its source. The tokens are relexed (core.lexer.incremental),
+and only the top-level declarations that contain relexed tokens are
+parsed again. Their new nodes replace them in Program.body. Every other
+declaration keeps its subtree, with line numbers moved by the lines
+the edit added or removed.
+
+A declaration ends at the first ';' outside braces, so the token kinds
+alone tell where each one ends. The buffer keeps the token index one
+past each of those ';' ('bounds'), and the edited buffer inherits them
+the way it inherits the lexer's hazards.
+
+The grammar is unambiguous and a program is a sequence of declarations,
+so when the new declarations parse cleanly on their own, a full parse
+gives exactly the same tree. When they do not, the whole buffer is
+parsed again, and the syntax errors reported are those of a full parse.
+With verify=True the whole buffer is parsed anyway and both trees must
+agree, line numbers included.
+'''
+import io
+import re
+
+from bisect      import bisect_left, bisect_right
+from dataclasses import fields, is_dataclass
+
+from core.lexer.buffer      import KINDS
+from core.lexer.incremental import relex
+from core.parser.model      import Node, values
+from core.parser.parser     import new_parser
+from core.session           import CompilerSession, current_session
+
+_OPEN, _CLOSE, _SEMI = KINDS['{'], KINDS['}'], KINDS[';']
+
+# Token kinds that open or close a brace or end a declaration
+_structure = re.compile(b'[' + re.escape(bytes([_OPEN, _CLOSE, _SEMI])) + b']')
+
+def bounds(tokens, start = 0, stop = None):
+  '''
+  Index one past the ';' that ends each top-level declaration in
+  tokens[start:stop], which must start outside any braces.
+  '''
+  kinds = tokens.kinds
+  depth = 0
+  found = []
+
+  for m in _structure.finditer(kinds, start, len(kinds) if stop is None else stop):
+    kind = kinds[m.start()]
+
+    if kind == _OPEN:
+      depth += 1
+    elif kind == _CLOSE:
+      depth -= 1
+    elif depth == 0:
+      found.append(m.end())
+
+  return found
+
+def image(node):
+  '''
+  A comparable image of a tree that includes every line number.
+  '''
+  if isinstance(node, (list, tuple)):
+    return [image(item) for item in node]
+
+  if is_dataclass(node):
+    return (type(node).__name__, getattr(node, 'lineno', None),
+            [(f.name, image(getattr(node, f.name))) for f in fields(node)])
+
+  return node
+
+def _move(node, lines):
+  '''
+  Move every node of a parsed subtree down by lines.
+  '''
+  stack = [node]
+
+  while stack:
+    node = stack.pop()
+
+    if isinstance(node, Node):
+      node.lineno += lines
+      stack.extend(values(node))
+    elif isinstance(node, (list, tuple)):
+      stack.extend(node)
+
+def _parse(tokens, start, stop, session):
+  '''
+  The Program of tokens[start:stop], or None if it has syntax errors.
+  Diagnostics go to a scratch session.
+  '''
+  scratch = CompilerSession(session.filename, file = io.StringIO(), pool = session.pool, **session.options)
+
+  with scratch:
+    try:
+      program = new_parser().parse(tokens.tokens(start, stop))
+    except Exception:
+      program = None
+
+  return None if scratch.errors else program
+
+def parse(tokens):
+  '''
+  The Program of every token, or None if it has syntax errors, which
+  are reported to the current session. Records the bounds reparse()
+  needs.
+  '''
+  session = current_session()
+  errors = session.errors
+
+  try:
+    program = new_parser().parse(iter(tokens))
+  except Exception:
+    program = None
+
+  if session.errors > errors or program is None:
+    tokens.bounds = None
+    return None
+
+  tokens.bounds = bounds(tokens)
+  return program
+
+def reparse(program, tokens, offset, removed, inserted, lexer = None, verify = False):
+  '''
+  (Program, TokenBuffer) of tokens.source with 'removed' characters at
+  offset replaced by inserted. program must be what parse() gave for
+  tokens; it is updated in place. The Program is None if the edited
+  source has syntax errors.
+  '''
+  session = current_session()
+  buffer = relex(tokens, offset, removed, inserted, lexer)
+  ends = tokens.bounds
+
+  if program is None or ends is None or len(ends) != len(program.body):
+    return parse(buffer), buffer
+
+  first, last, stop = buffer.relexed
+
+  # The declarations [i:j) hold the relexed tokens, which were the
+  # tokens [begin:end) and now are [begin:end + delta)
+  i = bisect_right(ends, first)
+  j = bisect_left(ends, last)
+  begin = ends[i - 1] if i else 0
+  end = ends[j] if j < len(ends) else len(tokens)
+  delta = stop - last
+  j += 1
+
+  decls = []
+
+  if end + delta > begin:
+    region = _parse(buffer, begin, end + delta, session)
+
+    if region is None:
+      return parse(buffer), buffer
+
+    decls = region.body
+
+  lines = buffer.line(end + delta) - tokens.line(end) if end < len(tokens) else 0
+
+  if lines:
+    for decl in program.body[j:]:
+      _move(decl, lines)
+
+  program.body[i:j] = decls
+
+  if not program.body:
+    return parse(buffer), buffer
+
+  program.lineno = program.body[0].lineno
+  buffer.bounds = ends[:i] + bounds(buffer, begin, end + delta) + [e + delta for e in ends[j:]]
+
+  if verify:
+    expected = _parse(buffer, 0, len(buffer), session)
+
+    if expected is None or image(expected) != image(program):
+      raise AssertionError("incremental reparse differs from a full parse")
+
+  return program, buffer
@@ -1,31 +1,175 @@
-from dataclasses import dataclass, field
-from multimethod import multimeta 
+from array       import array
+from dataclasses import dataclass, field, fields
+from types       import GeneratorType
 from typing      import List, Union
 
-class Visitor(metaclass = multimeta):
+class DispatchError(TypeError):
   pass
 
+class _Table(dict):
+  # node class -> visit function of one Visitor class. A class with no
+  # visit of its own (a subclass, such as an arena view) gets the one of
+  # its nearest base that has one, found once and then kept.
+  __slots__ = ('owner',)
+
+  def __missing__(self, cls):
+    for base in cls.__mro__[1:]:
+      if base in self:
+        function = self[cls] = self[base]
+        return function
+
+    raise DispatchError(f"{self.owner.__name__}.visit: no method for {cls.__name__}")
+
+class _Namespace(dict):
+  # Class body that collects every 'visit' defined in it, where a plain
+  # namespace would keep only the last
+  def __init__(self):
+    super().__init__()
+    self.visits = []
+
+  def __setitem__(self, key, value):
+    if key == 'visit' and _annotation(value) is not _annotation:
+      self.visits.append(value)
+    else:
+      super().__setitem__(key, value)
+
+def _annotation(function):
+  '''
+  Class the node parameter of a visit function is annotated with, or
+  _annotation itself if it has none.
+  '''
+  code = getattr(function, '__code__', None)
+
+  if code is None or code.co_argcount < 2 or code.co_varnames[1] not in function.__annotations__:
+    return _annotation
+
+  annotation = function.__annotations__[code.co_varnames[1]]
+  return type(None) if annotation is None else annotation
+
+class VisitorMeta(type):
+  '''
+  Metaclass of visitors. The visit methods of a class body, each
+  written for the node class its second parameter is annotated with,
+  are put in a table once, when the class is created; visit() then
+  finds its method with one dictionary lookup on the node's class.
+  '''
+  @classmethod
+  def __prepare__(mcls, name, bases):
+    return _Namespace()
+
+  def __new__(mcls, name, bases, namespace):
+    cls = super().__new__(mcls, name, bases, dict(namespace))
+    table = _Table()
+    table.owner = cls
+
+    for base in reversed(cls.__mro__[1:]):
+      table.update(vars(base).get('_visits', {}))
+
+    for function in namespace.visits:
+      table[_annotation(function)] = function
+
+    cls._visits = dict(table)
+    cls._table = table
+    return cls
+
+class Visitor(metaclass = VisitorMeta):
+  '''
+  A visit method either returns its result, or is a generator that
+  yields each child it needs visited, as 'yield child' or, with extra
+  arguments, 'yield child, env', and gets the child's result back;
+  what the generator returns is its result. Node.accept() runs these
+  generators on an explicit stack, so however deep a tree is, visiting
+  it never reaches Python's recursion limit.
+
+  Methods are chosen by the class of the node alone; extra arguments
+  are passed along as they are.
+  '''
+  def visit(self, n, *args, **kwargs):
+    return self._table[type(n)](self, n, *args, **kwargs)
+
+def drive(visitor, result):
+  '''
+  Result of a visit that returned result: a generator is run to the
+  end, along with the visits of every child it yields.
+  '''
+  if type(result) is not GeneratorType:
+    return result
+
+  table = visitor._table
+  stack = [result]
+  value = None
+
+  while stack:
+    try:
+      request = stack[-1].send(value)
+    except StopIteration as stop:
+      stack.pop()
+      value = stop.value
+      continue
+
+    if type(request) is tuple:
+      value = table[type(request[0])](visitor, *request)
+    else:
+      value = table[type(request)](visitor, request)
+
+    if type(value) is GeneratorType:
+      stack.append(value)
+      value = None
+
+  return value
+
 # == Base nodes ==
 
 class Node:
+  # Every node gets a line number from the parser, and expressions get a
+  # type from the checker. They are slots rather than fields, so they stay
+  # out of __init__, repr and comparisons; the dataclasses below are
+  # slotted too, so no node carries a __dict__. The slots the resolver
+  # fills in (see core/semantic/resolver.py) are kept the same way.
+  __slots__ = ('lineno',)
+
   def accept(self, v : Visitor, *args, **kwargs):
-    return v.visit(self, *args, **kwargs)
+    return drive(v, v._table[type(self)](v, self, *args, **kwargs))
 
-@dataclass
+_names = {}   # node class -> names of its fields
+
+def values(node):
+  '''
+  Values of the fields of node, in declaration order. Slotted nodes
+  have no vars(); this is what walks over their children use instead.
+  '''
+  names = _names.get(type(node))
+
+  if names is None:
+    names = _names[type(node)] = tuple(f.name for f in fields(node))
+
+  return [getattr(node, name) for name in names]
+
+@dataclass(slots = True)
 class Statement(Node):
   pass
 
 @dataclass
 class Expression(Node):
-  pass
+  __slots__ = ('type',)
 
 @dataclass
 class Declaration(Node):
-  pass
+  __slots__ = ('id', 'depth', 'declared_type')
 
-# == Program ==
+@dataclass
+class Reference(Expression):
+  # Declaration the name of a location or call resolves to, or None
+  __slots__ = ('symbol',)
 
 @dataclass
+class Returning(Statement):
+  # FuncDecl a return statement returns from
+  __slots__ = ('function',)
+
+# == Program ==
+
+@dataclass(slots = True)
 class Program(Statement):
   body: List[Statement] = field(default_factory = list)
 
@@ -33,33 +177,35 @@ class Program(Statement):
 
 @dataclass
 class Param(Expression):
+  # Params are declarations too, with an id, a depth and a declared type
+  __slots__ = ('name', 'id', 'depth', 'declared_type')
   name: str
-  type: str 
+  type: str
 
-@dataclass
+@dataclass(slots = True)
 class VarParam(Param):
   pass
 
-@dataclass
+@dataclass(slots = True)
 class ArrayParam(Param):
   size: Expression = None
 
 # == Declarations ==
 
-@dataclass
+@dataclass(slots = True)
 class VarDecl(Declaration):
   name: str
   type: str 
   value: Expression = None
 
-@dataclass
+@dataclass(slots = True)
 class ArrayDecl(Declaration):
   name: str
   type: str
   size: Expression 
-  value: List[Expression] = field(default_factory = list)
+  value: Union[List[Expression], 'PackedLiterals'] = field(default_factory = list)
 
-@dataclass
+@dataclass(slots = True)
 class FuncDecl(Declaration):
   name: str
   type: str
@@ -68,92 +214,131 @@ class FuncDecl(Declaration):
 
 # == Statements ==
 
-@dataclass
+@dataclass(slots = True)
 class IfStmt(Statement):
   condition: Expression
   then_branch: Statement
   else_branch: Statement = None
 
-@dataclass
+@dataclass(slots = True)
 class ForStmt(Statement):
   init: Expression = None
   condition: Expression = None
   incr: Expression = None
   body: Statement = None
 
-@dataclass
+@dataclass(slots = True)
 class WhileStmt(Statement):
   condition: Expression = None
   body: Statement = None
 
-@dataclass
+@dataclass(slots = True)
 class DoWhileStmt(Statement):
   body: Statement = None
   condition: Expression = None
 
-@dataclass
-class ReturnStmt(Statement):
+@dataclass(slots = True)
+class ReturnStmt(Returning):
   value: Expression = None
 
-@dataclass
+@dataclass(slots = True)
 class PrintStmt(Statement):
   value: List[Expression] = field(default_factory = list)
 
-@dataclass
+@dataclass(slots = True)
 class BlockStmt(Statement):
   body: List[Statement] = field(default_factory = list)
 
 # == Location / Assignments ==
 
-@dataclass
-class Location(Expression):
+@dataclass(slots = True)
+class Location(Reference):
   pass
 
-@dataclass
+@dataclass(slots = True)
 class VarLoc(Location):
   name: str
 
-@dataclass
+@dataclass(slots = True)
 class ArrayLoc(Location):
   name: str
   index: Expression
 
-@dataclass
+@dataclass(slots = True)
 class Assignment(Statement):
   target: Location
   value: Expression
 
 # == Expressions ==
 
-@dataclass
+@dataclass(slots = True)
 class BinOper(Expression):
   oper: str
   left: Expression
   right: Expression
 
-@dataclass
+@dataclass(slots = True)
 class UnaryOper(Expression):
   oper: str
   expr: Expression
 
 # == Literals ==
 
-@dataclass
+@dataclass(slots = True)
 class Literal(Expression):
   value: Union[int, float, str, bool]
   type: str
 
-@dataclass
+_decoders = {'integer': int, 'float': float, 'boolean': bool, 'char': chr}
+
+@dataclass(slots = True)
+class PackedLiterals(Expression):
+  # The elements of a large array initializer that are all literals of
+  # one type, packed in a typed buffer: array('i') of integers,
+  # array('d') of floats, or bytes of booleans and char codes. A negative
+  # number was a minus sign in front of a literal, and is packed negated.
+  # lines holds flattened (index, offset) pairs: the literals from index
+  # on sit that many lines below lineno. Iterating gives back the nodes
+  # the parser made: Literal, or UnaryOper('-', Literal) for a negative.
+  values: Union[array, bytes]
+  type: str
+  lines: array = field(default_factory = lambda: array('i', [0, 0]))
+
+  def __len__(self):
+    return len(self.values)
+
+  def __iter__(self):
+    decode = _decoders[self.type]
+    lines = self.lines
+    pair = 0
+    lineno = self.lineno
+
+    for index, value in enumerate(self.values):
+      if pair < len(lines) and lines[pair] == index:
+        lineno = self.lineno + lines[pair + 1]
+        pair += 2
+
+      if value < 0:
+        literal = Literal(decode(-value), self.type)
+        literal.lineno = lineno
+        literal = UnaryOper('-', literal)
+      else:
+        literal = Literal(decode(value), self.type)
+
+      literal.lineno = lineno
+      yield literal
+
+@dataclass(slots = True)
 class Increment(Expression):
   expr: Expression
   postfix: bool = True
 
-@dataclass
+@dataclass(slots = True)
 class Decrement(Expression):
   expr: Expression
   postfix: bool = True
 
-@dataclass
-class FuncCall(Expression):
+@dataclass(slots = True)
+class FuncCall(Reference):
   name: str
   args: List[Expression] = field(default_factory = list)
\ No newline at end of file
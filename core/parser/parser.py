@@ -1,9 +1,12 @@
 import sly
 
 from core.parser.model import *
-from core.lexer.lexer  import Lexer
+from core.parser       import tables
+from core.lexer.lexer  import Lexer, lex
 from core.errors       import error
+from core.session      import current_session
 
+from array       import array
 from dataclasses import is_dataclass, fields
 from rich.tree   import Tree
 from rich        import print
@@ -12,22 +15,131 @@ def _L(node, lineno):
   node.lineno = lineno
   return node
 
+# Initializers with at least this many leading literals of one type are
+# packed
+PACK_MIN = 64
+
+_buffers = {'integer': lambda: array('i'), 'float': lambda: array('d'), 'boolean': bytearray, 'char': bytearray}
+
+def _literal(expr):
+  '''
+  (type, value) of expr if it can be packed: a literal, or a minus
+  sign in front of a nonzero integer or float literal on the same line.
+  Else None.
+  '''
+  if type(expr) is Literal:
+    return expr.type, expr.value
+
+  if (type(expr) is UnaryOper and expr.oper == '-' and type(expr.expr) is Literal
+      and expr.expr.type in ('integer', 'float') and expr.expr.value and expr.expr.lineno == expr.lineno):
+    return expr.expr.type, -expr.expr.value
+
+  return None
+
+class Initializer:
+  '''
+  The value of an array initializer, built one element at a time: a
+  list of expressions, or PackedLiterals while every element is a
+  literal (or negated literal) of the type of the first and fits its
+  buffer, once there are PACK_MIN of them.
+  '''
+  def __init__(self):
+    self.items = []
+    self.values = None    # the buffer, while packed
+
+  def append(self, expr):
+    if self.values is None:
+      self.items.append(expr)
+
+      if len(self.items) == PACK_MIN:
+        self._pack()
+    elif not self._add(expr):
+      # Back to a list of the exact nodes the parser made
+      self.items = list(self.value())
+      self.values = None
+      self.items.append(expr)
+
+  def _pack(self):
+    first = self.items[0]
+    literal = _literal(first)
+
+    if literal is None or literal[0] not in _buffers:
+      return
+
+    self.type = literal[0]
+    self.values = _buffers[self.type]()
+    self.lines = array('i')
+    self.lineno = first.lineno
+    self.offset = None
+
+    for expr in self.items:
+      if not self._add(expr):
+        self.values = None
+        return
+
+    self.items = None
+
+  def _add(self, expr):
+    '''
+    Pack the literal expr, or return False if it does not fit.
+    '''
+    literal = _literal(expr)
+
+    if literal is None or literal[0] != self.type:
+      return False
+
+    try:
+      self.values.append(ord(literal[1]) if self.type == 'char' else literal[1])
+    except (TypeError, ValueError, OverflowError):
+      return False
+
+    offset = expr.lineno - self.lineno
+
+    if offset != self.offset:
+      self.lines.extend((len(self.values) - 1, offset))
+      self.offset = offset
+
+    return True
+
+  def value(self):
+    if self.values is None:
+      return self.items
+
+    values = bytes(self.values) if type(self.values) is bytearray else self.values
+    return _L(PackedLiterals(values, self.type, self.lines), self.lineno)
+
 class Parser(sly.Parser):
   tokens = Lexer.tokens
 
+  # LALR tables are loaded from the on-disk cache when the grammar is unchanged
+  _build = classmethod(tables.build)
+
+  def __init__(self):
+    # Names and string literals share the session's copies
+    self.intern = current_session().pool.intern
+
   # == Program ==
   @_("decl_list")
   def prog(self, p):
     return _L(Program(p.decl_list), p.lineno)
   
+  # An empty production has no line number
+  @_("empty")
+  def prog(self, p):
+    return _L(Program([]), None)
+  
   # == decl_list ==
-  @_("decl decl_list")
+  # Lists are left-recursive and grow in place: each item is reduced
+  # as soon as it is complete, so the parser stack stays shallow and
+  # building a list of n items takes linear time.
+  @_("decl_list decl")
   def decl_list(self, p):
-    return [p.decl] + p.decl_list
+    p.decl_list.append(p.decl)
+    return p.decl_list
   
-  @_("empty")
+  @_("decl")
   def decl_list(self, p):
-    return []
+    return [p.decl]
   
   # == Types ==
   @_("INTEGER")
@@ -74,12 +186,12 @@ class Parser(sly.Parser):
   # == Declarations ==
   @_("ID ':' type_simple ';'")
   def decl(self, p):
-    return _L(VarDecl(name=p.ID, type=p.type_simple), p.lineno)
+    return _L(VarDecl(name=self.intern(p.ID), type=p.type_simple), p.lineno)
 
   @_("ID ':' type_array_sized ';'")
   def decl(self, p):
     return _L(ArrayDecl(
-      name=p.ID, 
+      name=self.intern(p.ID), 
       type=p.type_array_sized[0], 
       size=p.type_array_sized[1]
     ), p.lineno)
@@ -87,7 +199,7 @@ class Parser(sly.Parser):
   @_("ID ':' type_func ';'")
   def decl(self, p):
     return _L(FuncDecl(
-      name=p.ID, 
+      name=self.intern(p.ID), 
       type=p.type_func[0],
       params=p.type_func[1],
       body=[]
@@ -95,21 +207,21 @@ class Parser(sly.Parser):
   
   @_("ID ':' type_simple '=' expr ';'")
   def decl(self, p):
-    return _L(VarDecl(name=p.ID, type=p.type_simple, value=p.expr), p.lineno)
+    return _L(VarDecl(name=self.intern(p.ID), type=p.type_simple, value=p.expr), p.lineno)
   
-  @_("ID ':' type_array_sized '=' '{' opt_expr_list '}' ';'")
+  @_("ID ':' type_array_sized '=' '{' opt_init_list '}' ';'")
   def decl(self, p):
     return _L(ArrayDecl(
-      name=p.ID, 
+      name=self.intern(p.ID), 
       type=p.type_array_sized[0], 
       size=p.type_array_sized[1],
-      value=p.opt_expr_list
+      value=p.opt_init_list.value()
     ), p.lineno)
   
   @_("ID ':' type_func '=' '{' opt_stmt_list '}' ';'")
   def decl(self, p):
     return _L(FuncDecl(
-      name=p.ID, 
+      name=self.intern(p.ID), 
       type=p.type_func[0],
       params=p.type_func[1],
       body=p.opt_stmt_list
@@ -124,9 +236,10 @@ class Parser(sly.Parser):
   def opt_stmt_list(self, p):
     return []
   
-  @_("stmt stmt_list")
+  @_("stmt_list stmt")
   def stmt_list(self, p):
-    return [p.stmt] + p.stmt_list
+    p.stmt_list.append(p.stmt)
+    return p.stmt_list
   
   @_("stmt")
   def stmt_list(self, p):
@@ -189,14 +302,34 @@ class Parser(sly.Parser):
   def opt_expr_list(self, p):
     return p.expr_list
   
-  @_("expr ',' expr_list")
+  @_("expr_list ',' expr")
   def expr_list(self, p):
-    return [p.expr] + p.expr_list
+    p.expr_list.append(p.expr)
+    return p.expr_list
   
   @_("expr")
   def expr_list(self, p):
     return [p.expr]
   
+  @_("empty")
+  def opt_init_list(self, p):
+    return Initializer()
+  
+  @_("init_list")
+  def opt_init_list(self, p):
+    return p.init_list
+  
+  @_("init_list ',' expr")
+  def init_list(self, p):
+    p.init_list.append(p.expr)
+    return p.init_list
+  
+  @_("expr")
+  def init_list(self, p):
+    init = Initializer()
+    init.append(p.expr)
+    return init
+  
   @_("empty")
   def opt_expr(self, p):
     return None
@@ -235,11 +368,11 @@ class Parser(sly.Parser):
 
   @_("ID")
   def lval(self, p):
-    return _L(VarLoc(name=p.ID), p.lineno)
+    return _L(VarLoc(name=self.intern(p.ID)), p.lineno)
   
   @_("ID '[' expr ']'")
   def lval(self, p):
-    return _L(ArrayLoc(name=p.ID, index=p.expr), p.lineno)
+    return _L(ArrayLoc(name=self.intern(p.ID), index=p.expr), p.lineno)
   
   @_("expr2 LOR expr3")
   def expr2(self, p):
@@ -312,7 +445,7 @@ class Parser(sly.Parser):
 
   @_("ID '(' opt_expr_list ')'")  
   def expr9(self, p):
-    return _L(FuncCall(name=p.ID, args=p.opt_expr_list), p.lineno)
+    return _L(FuncCall(name=self.intern(p.ID), args=p.opt_expr_list), p.lineno)
 
   @_("lval") 
   def expr9(self, p):
@@ -332,7 +465,7 @@ class Parser(sly.Parser):
     value = p.STRING_LITERAL
     if len(value) >= 2 and value[0] == '"' and value[-1] == value[0]:
       value = value[1:-1]
-    return _L(Literal(value=value, type="string"), p.lineno)
+    return _L(Literal(value=self.intern(value), type="string"), p.lineno)
 
   @_("CHAR_LITERAL")
   def expr9(self, p):
@@ -360,7 +493,8 @@ class Parser(sly.Parser):
 
   @_("param_list ',' param")
   def param_list(self, p):
-    return p.param_list + [p.param]
+    p.param_list.append(p.param)
+    return p.param_list
 
   @_("param")
   def param_list(self, p):
@@ -368,55 +502,152 @@ class Parser(sly.Parser):
 
   @_("ID ':' type_simple")
   def param(self, p):
-    return _L(VarParam(name=p.ID, type=p.type_simple), p.lineno)
+    return _L(VarParam(name=self.intern(p.ID), type=p.type_simple), p.lineno)
 
   @_("ID ':' type_array_sized")
   def param(self, p):
-    return _L(ArrayParam(name=p.ID, type=p.type_array_sized[0], size=p.type_array_sized[1]), p.lineno)
+    return _L(ArrayParam(name=self.intern(p.ID), type=p.type_array_sized[0], size=p.type_array_sized[1]), p.lineno)
 
   @_("")
   def empty(self, p):
     return None
 
   def error(self, p):
-    lineno = p.lineno if p else "EOF"
-    value = repr(p.value) if p else "EOF"
-    error(f"{value}", lineno, "Syntax")
+    syntax_error(p)
+
+def syntax_error(p):
+  '''
+  Report a syntax error at token p, or at the end of input if p is None.
+  '''
+  lineno = p.lineno if p else "EOF"
+  value = repr(p.value) if p else "EOF"
+  error(f"{value}", lineno, "Syntax")
+
+def new_parser():
+  '''
+  The parser selected for the current session: the hand-written
+  DescentParser when the 'descent' option is set, the SLY Parser
+  otherwise.
+  '''
+  if current_session().options.get('descent'):
+    from core.parser.descent import DescentParser
+    return DescentParser()
+
+  return Parser()
 
 def parse(code):
-  l = Lexer()
-  p = Parser()
-  return p.parse(l.tokenize(code))
+  p = new_parser()
+  return p.parse(lex(code))
+
+def _entries(node, name, depth = None):
+  '''
+  (level, kind, name, value) of node and of everything under it, in
+  preorder, with kind 'node', 'list' or 'tuple' for what has entries
+  under it, 'field' for any other field of a node and 'item' for any
+  other value. With depth, nodes that have more than depth nodes above
+  them (counting from node) come as 'elided' and are not expanded.
+
+  PackedLiterals come as the list of elements the parser made, each
+  made only as it is reached; as 'packed', with no entries under them,
+  when depth would elide every element.
+  '''
+  stack = [(0, 0, name, node, False)]   # ..., nodes above, name, value, is a field
+
+  while stack:
+    entry = stack.pop()
+
+    if len(entry) == 3:
+      # The rest of the elements of a PackedLiterals
+      level, above, elements = entry
+      index, item = next(elements, (None, None))
+
+      if item is not None:
+        stack.append(entry)
+        stack.append((level, above, f"[{index}]", item, False))
+
+      continue
+
+    level, above, name, value, field = entry
+
+    if isinstance(value, PackedLiterals):
+      if depth is not None and above > depth:
+        yield level, 'packed', name, value
+      else:
+        yield level, 'list', name, value
+        stack.append((level + 1, above, enumerate(value)))
 
-def ast_to_tree(node, name="root"):
-  label = f"[bold blue]{name}[/]"
+      continue
 
-  if is_dataclass(node):
-    tree = Tree(f"{label} [cyan]{node.__class__.__name__}[/]")
+    if is_dataclass(value):
+      if depth is not None and above > depth:
+        yield level, 'elided', name, value
+        continue
 
-    for f in fields(node):
-      value = getattr(node, f.name)
+      yield level, 'node', name, value
+      items = [(f.name, getattr(value, f.name)) for f in fields(value)]
+      above += 1
+    elif isinstance(value, (list, tuple)):
+      yield level, 'list' if isinstance(value, list) else 'tuple', name, value
+      items = [(f"[{i}]", item) for i, item in enumerate(value)]
+    else:
+      yield level, 'field' if field else 'item', name, value
+      continue
 
-      if is_dataclass(value) or isinstance(value, (list, tuple)):
-        subtree = ast_to_tree(value, f.name)
-        tree.add(subtree)
-      else:
-        tree.add(f"[green]{f.name}[/] = [yellow]{value}[/]")
-    return tree
-
-  elif isinstance(node, list):
-    tree = Tree(f"{label} [magenta]list[/]")
-    for i, item in enumerate(node):
-      subtree = ast_to_tree(item, f"[{i}]")
-      tree.add(subtree)
-    return tree
-
-  elif isinstance(node, tuple):
-    tree = Tree(f"{label} [magenta]tuple[/]")
-    for i, item in enumerate(node):
-      subtree = ast_to_tree(item, f"[{i}]")
-      tree.add(subtree)
-    return tree
-
-  else:
-    return Tree(f"{label} = [yellow]{repr(node)}[/]")
\ No newline at end of file
+    node = is_dataclass(value)
+    stack.extend((level + 1, above, child, item, node) for child, item in reversed(items))
+
+def _label(kind, name, value):
+  if kind == 'field':
+    return f"[green]{name}[/] = [yellow]{value}[/]"
+
+  label = f"[bold blue]{name}[/]"
+
+  if kind == 'node':
+    return f"{label} [cyan]{value.__class__.__name__}[/]"
+  elif kind == 'elided':
+    return f"{label} [cyan]{value.__class__.__name__}[/] ..."
+  elif kind == 'packed':
+    return f"{label} [magenta]list[/] of {len(value)} ..."
+  elif kind == 'item':
+    return f"{label} = [yellow]{repr(value)}[/]"
+
+  return f"{label} [magenta]{kind}[/]"
+
+def _text(kind, name, value):
+  if kind == 'field':
+    return f"{name} = {value}"
+  elif kind == 'node':
+    return f"{name}: {value.__class__.__name__}"
+  elif kind == 'elided':
+    return f"{name}: {value.__class__.__name__} ..."
+  elif kind == 'packed':
+    return f"{name}: list of {len(value)} ..."
+  elif kind == 'item':
+    return f"{name} = {repr(value)}"
+
+  return f"{name}: {kind}"
+
+def ast_to_tree(node, name="root", depth=None):
+  '''
+  rich Tree of node, expanded from an explicit stack with every subtree
+  a direct child of its parent, so neither building nor printing the
+  tree recurses however deep the AST is. With depth, nodes more than
+  depth levels below node are shown but not expanded.
+  '''
+  trees = []   # the tree of each level down to the current entry
+
+  for level, kind, child, value in _entries(node, name, depth):
+    label = _label(kind, child, value)
+    del trees[level:]
+    trees.append(trees[-1].add(label) if trees else Tree(label))
+
+  return trees[0]
+
+def write_tree(node, file, name="root", depth=None):
+  '''
+  Write the entries of ast_to_tree(node, name, depth) to file as they
+  are found, one line each, indented two spaces a level and without
+  markup, so even very large trees print in time linear in their size.
+  '''
+  for level, kind, child, value in _entries(node, name, depth):
+    file.write(f"{'  ' * level}{_text(kind, child, value)}\n")
@@ -0,0 +1,123 @@
+'''
+On-disk cache for the LALR tables that SLY builds when the Parser
+class is created.
+
+Building the grammar object is cheap, but computing the LALR(1)
+action and goto tables dominates startup. The tables are pickled
+under a key derived from the productions, precedence, start symbol
+and token set, so any change to the grammar produces a new key and
+the stale entry is simply never read again.
+
+The cache lives in $BMINOR_CACHE_DIR (default ~/.cache/bminor) and
+can be disabled by setting BMINOR_NO_CACHE.
+'''
+import hashlib
+import os
+import pickle
+import tempfile
+
+import sly
+
+from sly.yacc import YaccError
+
+CACHE_VERSION = 1
+
+class CachedLRTable:
+  '''
+  Stand-in for sly.yacc.LRTable holding only what Parser.parse reads.
+  '''
+  def __init__(self, lr_action, lr_goto, defaulted_states):
+    self.lr_action = lr_action
+    self.lr_goto = lr_goto
+    self.defaulted_states = defaulted_states
+    self.sr_conflicts = []
+    self.rr_conflicts = []
+
+def cache_dir():
+  return os.environ.get('BMINOR_CACHE_DIR') or os.path.join(os.path.expanduser('~'), '.cache', 'bminor')
+
+def signature(grammar, tokens):
+  h = hashlib.sha256()
+  h.update(f"{CACHE_VERSION}:{sly.__version__}\n".encode())
+
+  for tok in sorted(tokens):
+    h.update(f"token {tok}\n".encode())
+
+  for prod in grammar.Productions:
+    h.update(f"{prod} %prec {prod.prec}\n".encode())
+
+  h.update(f"start {grammar.Start}\n".encode())
+
+  return h.hexdigest()
+
+def load(key):
+  path = os.path.join(cache_dir(), f"parsetab-{key[:32]}.pickle")
+
+  try:
+    with open(path, 'rb') as file:
+      data = pickle.load(file)
+  except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ValueError):
+    return None
+
+  if data.get('key') != key:
+    return None
+
+  return CachedLRTable(data['action'], data['goto'], data['defaulted'])
+
+def store(key, lrtable):
+  directory = cache_dir()
+  data = {
+    'key'      : key,
+    'action'   : lrtable.lr_action,
+    'goto'     : lrtable.lr_goto,
+    'defaulted': lrtable.defaulted_states,
+  }
+
+  # Written to a temporary file and renamed so concurrent compilers
+  # never observe a partially written table.
+  tmp = None
+
+  try:
+    os.makedirs(directory, exist_ok = True)
+    fd, tmp = tempfile.mkstemp(dir = directory, suffix = '.tmp')
+
+    with os.fdopen(fd, 'wb') as file:
+      pickle.dump(data, file, protocol = pickle.HIGHEST_PROTOCOL)
+
+    os.replace(tmp, os.path.join(directory, f"parsetab-{key[:32]}.pickle"))
+    tmp = None
+  except OSError:
+    pass
+  finally:
+    # Whatever failed, no temporary file is left behind
+    if tmp is not None:
+      try:
+        os.unlink(tmp)
+      except OSError:
+        pass
+
+def build(cls, definitions):
+  '''
+  Replacement for sly.Parser._build that reuses cached LR tables.
+  The grammar itself is always rebuilt because its productions hold
+  references to the rule functions of the class being created.
+  '''
+  rules = cls._Parser__collect_rules(definitions)
+
+  if not cls._Parser__validate_specification():
+    raise YaccError('Invalid parser specification')
+
+  cls._Parser__build_grammar(rules)
+
+  if os.environ.get('BMINOR_NO_CACHE'):
+    cls._Parser__build_lrtables()
+    return
+
+  key = signature(cls._grammar, cls.tokens)
+  lrtable = load(key)
+
+  if lrtable is None:
+    cls._Parser__build_lrtables()
+    store(key, cls._lrtable)
+  else:
+    cls._lrtable = lrtable
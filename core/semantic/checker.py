@@ -1,33 +1,41 @@
-from core.semantic.typesys import typenames, check_binop, check_unaryop, CheckError
-from core.semantic.symtab  import Symtab
-from core.parser.model     import *
-from core.errors           import error, errors_detected
+from core.semantic.typesys  import *
+from core.semantic.symtab   import Symtab
+from core.semantic.resolver import Resolver
+from core.parser.model      import *
+from core.errors            import error, errors_detected
+from core.session           import current_session
 
 from typing import Union, List
 from rich   import print
 
-if_counter = 0
-while_counter = 0
-for_counter = 0
-do_while_counter = 0
-
 class Check(Visitor):
+  '''
+  Each visit of an expression returns the type object it gives the
+  expression (and stores it in n.type), or None if the expression is
+  left without a type, in which case the checks that use it are
+  skipped. Literals keep the name of their type in their field.
+  '''
+  def __init__(self):
+    self.returns = set()   # ids of the functions a return statement was checked in
+
   @classmethod
   def checker(cls, n: Program):
     checker = cls()
+    resolver = Resolver()
     env = Symtab('global')
 
     for decl in n.body:
+      resolver.resolve(decl, env)
       decl.accept(checker, env)
 
     return env
 
   def visit(self, n: VarDecl, env: Symtab):
     if n.value:
-      n.value.accept(self, env)
+      value = yield n.value, env
 
-      if hasattr(n.value, "type"):
-        if check_binop('=', n.type, n.value.type) is None:
+      if value is not None:
+        if check_binop('=', n.declared_type, value) is None:
           error(f"Types do not match in '{n.name}'", n.lineno, "Semantic")
         
     try:
@@ -38,21 +46,28 @@ class Check(Visitor):
       error(f"'{n.name}' has already been declared", n.lineno, "Semantic")
   
   def visit(self, n: ArrayDecl, env: Symtab):
+    size = None
+    element = n.declared_type.base
+
     if n.size:
-      n.size.accept(self, env)
+      size = yield n.size, env
     else:
       error(f"'{n.name}' must have size", n.lineno, "Semantic")
 
-    if hasattr(n.size, "type"):
-      if n.size.type != "integer":
+    if size is not None:
+      if size is not INTEGER:
         error(f"Size of '{n.name}' must be an integer", n.lineno, "Semantic")
     
-    if n.value:
+    if isinstance(n.value, PackedLiterals):
+      # Literals of a single type: checked once for the whole buffer
+      if lookup_type(n.value.type) is not element:
+        error(f"All elements of '{n.name}' must be '{n.type}'", n.lineno, "Semantic")
+    elif n.value:
       for value in n.value:
-        value.accept(self, env)
+        value = yield value, env
 
-        if hasattr(value, "type"):
-          if value.type != n.type:
+        if value is not None:
+          if value is not element:
             error(f"All elements of '{n.name}' must be '{n.type}'", n.lineno, "Semantic")
             break
     
@@ -73,10 +88,10 @@ class Check(Visitor):
   
   def visit(self, n: ArrayParam, env: Symtab):
     if n.size:
-      n.size.accept(self, env)
+      size = yield n.size, env
 
-      if hasattr(n.size, "type"):
-        if n.size.type != "integer":
+      if size is not None:
+        if size is not INTEGER:
           error(f"Size of '{n.name}' must be an integer", n.lineno, "Semantic")
 
     try:
@@ -95,74 +110,66 @@ class Check(Visitor):
       error(f"'{n.name}' has already been declared", n.lineno, "Semantic")
     
     func_env = Symtab(n.name, env)
-    func_env.has_return = False
 
     for param in n.params:
-      param.accept(self, func_env)
+      yield param, func_env
     
     for stmt in n.body:
-      stmt.accept(self, func_env)
+      yield stmt, func_env
     
-    if len(n.body) != 0 and n.type != "void" and not getattr(func_env, "has_return", False):
+    if len(n.body) != 0 and n.declared_type.base is not VOID and n.id not in self.returns:
       error(f"'{n.name}' must have a return", n.lineno, "Semantic")
 
   def visit(self, n: UnaryOper, env: Symtab):
-    n.expr.accept(self, env)
+    expr = yield n.expr, env
 
     if hasattr(n, "type"):
-      n.type = check_unaryop(n.oper, n.expr.type)
+      n.type = check_unaryop(n.oper, expr)
 
       if n.type is None:
         error(f"Types do not match in '{n.oper}'", n.lineno, "Semantic")
+        n.type = INVALID
+
+      return n.type
     
   def visit(self, n: BinOper, env: Symtab):
-    n.left.accept(self, env)
-    n.right.accept(self, env)
+    left = yield n.left, env
+    right = yield n.right, env
 
-    if hasattr(n.left, "type") and hasattr(n.right, "type"):
-      n.type = check_binop(n.oper, n.left.type, n.right.type)
+    if left is not None and right is not None:
+      n.type = check_binop(n.oper, left, right)
 
       if n.type is None:
         error(f"Types do not match in '{n.oper}'", n.lineno, "Semantic")
+        n.type = INVALID
+
+      return n.type
   
   def visit(self, n: ReturnStmt, env: Symtab):
-    current_env = env
-    func = None
-
-    while current_env is not None:
-      if hasattr(current_env, "has_return"):  # Estamos dentro de una función
-        current_env.has_return = True
-        break
-      current_env = current_env.parent
-
-    while current_env is not None:
-        possible = current_env.get(current_env.name)
-        if possible and possible.__class__.__name__ == "FuncDecl":
-            func = possible
-            break
-        current_env = current_env.parent
+    func = n.function
+    self.returns.add(func.id)
 
     if n.value:
-      n.value.accept(self, env)
+      value = yield n.value, env
 
-      if hasattr(n.value, "type"):
-        if func.type != n.value.type:
+      if value is not None:
+        if value is not func.declared_type.base:
           error(f"'{func.name}' returns a different type", n.lineno, "Semantic")
     
   def visit(self, n: Assignment, env: Symtab):
-    target = env.get(n.target.name)
+    target = n.target.symbol
 
     if target is not None:
-      n.value.accept(self, env)
+      value = yield n.value, env
 
-      if hasattr(n.value, "type"):
-        if n.value.type is not None and target.type != n.value.type:
+      if value is not None:
+        if value is not INVALID and value is not target.declared_type.base:
           error(f"Types do not match in {n.target.name}", n.lineno, "Semantic")
     else:
       error(f"'{n.target.name}' is not defined", n.lineno, "Semantic")
     
   def visit(self, n: VarLoc, env: Symtab):
-    symbol = env.get(n.name)
+    symbol = n.symbol
 
     if symbol is None:
       error(f"'{n.name}' is not defined", n.lineno, "Semantic")
@@ -171,10 +178,11 @@ class Check(Visitor):
     if not hasattr(symbol, 'type'):
       error(f"'{n.name}' has no type information", n.lineno, "Semantic")
         
-    n.type = symbol.type
+    n.type = symbol.declared_type.base
+    return n.type
 
   def visit(self, n: ArrayLoc, env: Symtab):
-    symbol = env.get(n.name)
+    symbol = n.symbol
 
     if symbol is None:
       error(f"'{n.name}' is not defined", n.lineno, "Semantic")
@@ -183,16 +191,18 @@ class Check(Visitor):
     if not hasattr(symbol, 'type'):
       error(f"'{n.name}' has no type information", n.lineno, "Semantic")
         
-    n.type = symbol.type
+    n.type = symbol.declared_type.base
 
-    n.index.accept(self, env)
+    index = yield n.index, env
 
-    if hasattr(n.index, "type"):
-      if n.index.type != "integer":
+    if index is not None:
+      if index is not INTEGER:
         error(f"'{n.name}' index must be an integer", n.lineno, "Semantic")
 
+    return n.type
+
   def visit(self, n: FuncCall, env: Symtab):
-    symbol = env.get(n.name)
+    symbol = n.symbol
     
     if symbol is None:
       error(f"'{n.name}' is not defined", n.lineno, "Semantic")
@@ -202,114 +212,111 @@ class Check(Visitor):
       error(f"'{n.name}' has no type information", n.lineno, "Semantic")
       return
     
-    if len(n.args) != len(symbol.params):
+    signature = symbol.declared_type
+
+    if len(n.args) != len(signature.params):
       error(f"Wrong arguments in '{n.name}'", n.lineno, "Semantic")
       return
 
-    n.type = symbol.type
+    n.type = signature.base
+    args = []
 
     for arg in n.args:
-      arg.accept(self, env)
+      args.append((yield arg, env))
     
-    for i in range(0, len(n.args)):
-      if hasattr(n.args[i], "type"):
-        if n.args[i].type != symbol.params[i].type:
+    for i in range(0, len(args)):
+      if args[i] is not None:
+        if args[i] is not signature.params[i].base:
           error(f"Types do not match in '{n.name}' arguments", n.lineno, "Semantic")
-          return
+          return n.type
+
+    return n.type
   
   def visit(self, n: BlockStmt, env: Symtab):
     for stmt in n.body:
-      stmt.accept(self, env)
+      yield stmt, env
 
   def visit(self, n: IfStmt, env: Symtab):
-    global if_counter
-    name = f"if{if_counter}"
+    name = current_session().scope("if")
 
     if n.condition is not None:
-      n.condition.accept(self, env)
+      condition = yield n.condition, env
 
-      if hasattr(n.condition, "type"):
-        if n.condition.type != "boolean":
+      if condition is not None:
+        if condition is not BOOLEAN:
           error("Condition in 'if' must be boolean", n.lineno, "Semantic")
     else:
       error("'if' must have a boolean condition", n.lineno, "Semantic")
 
     if_env = Symtab(name, env)
-    if_counter += 1
 
-    n.then_branch.accept(self, if_env)
+    yield n.then_branch, if_env
 
     if n.else_branch:
       else_env = Symtab(f"{name}else", env)
-      n.else_branch.accept(self, else_env)
+      yield n.else_branch, else_env
   
   def visit(self, n: WhileStmt, env: Symtab):
-    global while_counter
-    name = f"while{while_counter}"
+    name = current_session().scope("while")
 
     if n.condition is not None:
-      n.condition.accept(self, env)
+      condition = yield n.condition, env
 
-      if hasattr(n.condition, "type"):
-        if n.condition.type != "boolean":
+      if condition is not None:
+        if condition is not BOOLEAN:
           error("Condition in 'while' must be boolean", n.lineno, "Semantic")
     else:
       error("'while' must have a boolean condition", n.lineno, "Semantic")
 
     while_env = Symtab(name, env)
-    while_counter += 1
 
-    n.body.accept(self, while_env)
+    yield n.body, while_env
   
   def visit(self, n: ForStmt, env: Symtab):
-    global for_counter
-    name = f"for{for_counter}"
+    name = current_session().scope("for")
 
     if n.init is not None:
-      n.init.accept(self, env)
+      yield n.init, env
     else:
       error("'for' must have a variable initialization", n.lineno, "Semantic")
 
     if n.condition is not None:
-      n.condition.accept(self, env)
+      condition = yield n.condition, env
 
-      if hasattr(n.condition, "type"):
-        if n.condition.type != "boolean":
+      if condition is not None:
+        if condition is not BOOLEAN:
           error("Condition in 'for' must be boolean", n.lineno, "Semantic")
     else:
       error("'for' must have a boolean condition", n.lineno, "Semantic")
 
     if n.incr is not None:
-      n.incr.accept(self, env)
+      yield n.incr, env
     else:
       error("'for' must have a variable increment or decrement", n.lineno, "Semantic")
 
     for_env = Symtab(name, env)
-    for_counter += 1
 
-    n.body.accept(self, for_env)
+    yield n.body, for_env
 
   def visit(self, n: DoWhileStmt, env: Symtab):
-    global do_while_counter
-    name = f"do_while{do_while_counter}"
+    name = current_session().scope("do_while")
 
     if n.condition is not None:
-      n.condition.accept(self, env)
+      condition = yield n.condition, env
 
-      if hasattr(n.condition, "type"):
-        if n.condition.type != "boolean":
+      if condition is not None:
+        if condition is not BOOLEAN:
           error("Condition in 'do-while' must be boolean", n.lineno, "Semantic")
     else:
       error("'do-while' must have a boolean condition", n.lineno, "Semantic")
 
     do_while_env = Symtab(name, env)
-    do_while_counter += 1
 
-    n.body.accept(self, do_while_env)
+    yield n.body, do_while_env
   
   def visit(self, n: PrintStmt, env: Symtab):
     for v in n.value:
-      v.accept(self, env)
+      yield v, env
     
   def visit(self, n: Literal, env: Symtab):
-    pass
\ No newline at end of file
+    return lookup_type(n.type)
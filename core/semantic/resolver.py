@@ -0,0 +1,234 @@
+'''
+Name resolution.
+
+Runs over each top-level declaration right before the checker does, and
+binds every name in it to the declaration it refers to, so the checker
+and the code generator read what a name means off the node instead of
+searching symbol tables for it.
+'''
+from itertools import count
+
+from core.parser.model     import *
+from core.semantic.symtab  import Symtab
+from core.semantic.typesys import declared_type
+
+class Resolver(Visitor):
+  '''
+  Every declaration, params included, gets an id, unique among the
+  declarations this resolver has seen, its declared type, and the depth
+  of its scope: 0 for globals, 1 for the params and body of a function,
+  one more for each if, else and loop body below that. Every location, call and
+  assignment target gets the declaration its name resolves to as its
+  symbol (None if it resolves to nothing), and every return statement
+  the function it returns from.
+
+  Scopes follow the checker's: a name is visible from where the checker
+  adds it to its table (a variable after its initializer, a function
+  before its params and body) and the first declaration of a name in a
+  scope is the one that counts. Each name maps to the stack of the
+  declarations in scope that have it, innermost last, so resolving one
+  is a dictionary lookup however deep the scopes are nested. Earlier
+  globals come from the checker's global table, which is only read.
+  '''
+  def __init__(self):
+    self.ids = count()
+    self.bindings = {}      # name -> declarations in scope with that name
+    self.scopes = []        # names bound in each open scope
+    self.globals = {}
+    self.function = None
+
+  @classmethod
+  def resolver(cls, n: Program):
+    '''
+    Resolve a whole program without checking it, as a checked AST
+    loaded from the cache needs before code generation.
+    '''
+    resolver = cls()
+    env = Symtab('global')
+
+    for decl in n.body:
+      resolver.resolve(decl, env)
+
+      # Where the checker would add decl
+      if decl.name not in env.entries:
+        env[decl.name] = decl
+
+    return env
+
+  def resolve(self, decl, env: Symtab):
+    '''
+    Resolve the top-level declaration decl, which the checker is about
+    to add to the global table env.
+    '''
+    self.globals = env.entries
+    self.open()
+
+    try:
+      decl.accept(self)
+    finally:
+      while self.scopes:
+        self.close()
+
+  # == Scopes ==
+
+  def open(self):
+    self.scopes.append(set())
+
+  def close(self):
+    for name in self.scopes.pop():
+      stack = self.bindings[name]
+      stack.pop()
+
+      if not stack:
+        del self.bindings[name]
+
+  def declare(self, n):
+    n.id = next(self.ids)
+    n.depth = len(self.scopes) - 1
+    n.declared_type = declared_type(n)
+    scope = self.scopes[-1]
+
+    if n.name in scope or (n.depth == 0 and n.name in self.globals):
+      return
+
+    scope.add(n.name)
+    self.bindings.setdefault(n.name, []).append(n)
+
+  def lookup(self, name):
+    stack = self.bindings.get(name)
+    return stack[-1] if stack else self.globals.get(name)
+
+  # == Declarations ==
+
+  def visit(self, n: VarDecl):
+    if n.value:
+      yield n.value
+
+    self.declare(n)
+
+  def visit(self, n: ArrayDecl):
+    if n.size:
+      yield n.size
+
+    if n.value and not isinstance(n.value, PackedLiterals):
+      for value in n.value:
+        yield value
+
+    self.declare(n)
+
+  def visit(self, n: VarParam):
+    self.declare(n)
+
+  def visit(self, n: ArrayParam):
+    if n.size:
+      yield n.size
+
+    self.declare(n)
+
+  def visit(self, n: FuncDecl):
+    self.declare(n)
+
+    function = self.function
+    self.function = n
+    self.open()
+
+    for param in n.params:
+      yield param
+
+    for stmt in n.body:
+      yield stmt
+
+    self.close()
+    self.function = function
+
+  # == Statements ==
+
+  def visit(self, n: IfStmt):
+    if n.condition is not None:
+      yield n.condition
+
+    self.open()
+    yield n.then_branch
+    self.close()
+
+    if n.else_branch:
+      self.open()
+      yield n.else_branch
+      self.close()
+
+  def visit(self, n: WhileStmt):
+    if n.condition is not None:
+      yield n.condition
+
+    self.open()
+    yield n.body
+    self.close()
+
+  def visit(self, n: ForStmt):
+    for expr in (n.init, n.condition, n.incr):
+      if expr is not None:
+        yield expr
+
+    self.open()
+    yield n.body
+    self.close()
+
+  def visit(self, n: DoWhileStmt):
+    if n.condition is not None:
+      yield n.condition
+
+    self.open()
+    yield n.body
+    self.close()
+
+  def visit(self, n: ReturnStmt):
+    n.function = self.function
+
+    if n.value:
+      yield n.value
+
+  def visit(self, n: PrintStmt):
+    for value in n.value:
+      yield value
+
+  def visit(self, n: BlockStmt):
+    for stmt in n.body:
+      yield stmt
+
+  def visit(self, n: Assignment):
+    yield n.target
+    yield n.value
+
+  # == Expressions ==
+
+  def visit(self, n: VarLoc):
+    n.symbol = self.lookup(n.name)
+
+  def visit(self, n: ArrayLoc):
+    n.symbol = self.lookup(n.name)
+    yield n.index
+
+  def visit(self, n: FuncCall):
+    n.symbol = self.lookup(n.name)
+
+    for arg in n.args:
+      yield arg
+
+  def visit(self, n: BinOper):
+    yield n.left
+    yield n.right
+
+  def visit(self, n: UnaryOper):
+    yield n.expr
+
+  def visit(self, n: Increment):
+    yield n.expr
+
+  def visit(self, n: Decrement):
+    yield n.expr
+
+  def visit(self, n: Literal):
+    pass
+
+  def visit(self, n: PackedLiterals):
+    pass
@@ -68,23 +68,31 @@ class Symtab:
     traversing upwards through the main symbol tables if it is not 
     found in the current one.
 		'''
-		if name in self.entries:
-			return self.entries[name]
-		elif self.parent:
-			return self.parent.get(name)
+		table = self
+
+		while table:
+			if name in table.entries:
+				return table.entries[name]
+
+			table = table.parent
 
 		return None
 		
 	def print(self):
-		table = Table(title = f"\nSymbol Table: '{self.name}'")
-		table.add_column('key', style='cyan')
-		table.add_column('value', style='bright_green')
-		
-		for k, v in self.entries.items():
-			value = f"{v.__class__.__name__}({v.name})" if isinstance(v, Node) else f"{v}"
-			table.add_row(k, value)
+		'''
+    Print this table and every table nested in it, parents first.
+		'''
+		stack = [self]
 
-		print(table)
-		
-		for child in self.children:
-			child.print()
\ No newline at end of file
+		while stack:
+			symtab = stack.pop()
+			table = Table(title = f"\nSymbol Table: '{symtab.name}'")
+			table.add_column('key', style='cyan')
+			table.add_column('value', style='bright_green')
+			
+			for k, v in symtab.entries.items():
+				value = f"{v.__class__.__name__}({v.name})" if isinstance(v, Node) else f"{v}"
+				table.add_row(k, value)
+
+			print(table)
+			stack.extend(reversed(symtab.children))
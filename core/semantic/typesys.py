@@ -1,8 +1,107 @@
+from core.parser.model import Literal, ArrayDecl, ArrayParam, FuncDecl
+
 class CheckError(Exception):
 	pass
 	
 typenames = { 'integer', 'float', 'char', 'boolean', 'string' }
 
+class Type:
+	'''
+	A B-Minor type. Types are hash-consed: lookup_type(), array_type() and
+	function_type() build each one once and hand out that same object
+	afterwards, so two types are equal exactly when they are the same
+	object, and the checker compares them with 'is'. Every type gets an
+	id, in order of creation; the primitive types come first, so their
+	ids index the operator tables below.
+	'''
+	__slots__ = ('id', 'key', 'name', 'base')
+
+	def __new__(cls, key, name):
+		self = _types[key] = super().__new__(cls)
+		self.id = len(_types) - 1
+		self.key = key
+		self.name = name
+		self.base = self
+		return self
+
+	def __str__(self):
+		return self.name
+
+	def __repr__(self):
+		return f"<type {self.name}>"
+
+	def __reduce__(self):
+		# Copies and unpickled types are the interned ones
+		return (from_key, (self.key,))
+
+class PrimitiveType(Type):
+	__slots__ = ()
+
+class ArrayType(Type):
+	'''
+	base is the element type, as ArrayDecl.type spells it; size is None
+	when it is not an integer literal.
+	'''
+	__slots__ = ('size',)
+
+class FunctionType(Type):
+	'''
+	base is the result type, as FuncDecl.type spells it; params holds
+	the declared type of each parameter.
+	'''
+	__slots__ = ('params',)
+
+_types = {}   # key -> type: a primitive's name, or a tuple of the keys of its parts
+
+def lookup_type(name):
+	'''
+	The primitive type called name, or None if there is none.
+	'''
+	return _primitives.get(name)
+
+def array_type(element, size = None):
+	key = ('array', element.key, size)
+	array = _types.get(key)
+
+	if array is None:
+		array = ArrayType(key, f"array [{'' if size is None else size}] {element}")
+		array.base = element
+		array.size = size
+
+	return array
+
+def function_type(result, params):
+	params = tuple(params)
+	key = ('function', result.key, tuple(param.key for param in params))
+	function = _types.get(key)
+
+	if function is None:
+		function = FunctionType(key, f"function {result} ({', '.join(map(str, params))})")
+		function.base = result
+		function.params = params
+
+	return function
+
+def from_key(key):
+	'''
+	The type whose key is key (what the AST cache stores of a type).
+	'''
+	if key in _types:
+		return _types[key]
+
+	if key[0] == 'array':
+		return array_type(from_key(key[1]), key[2])
+
+	return function_type(from_key(key[1]), map(from_key, key[2]))
+
+_primitives = {name: PrimitiveType(name, name) for name in ('integer', 'float', 'char', 'boolean', 'string', 'void')}
+
+INTEGER, FLOAT, CHAR, BOOLEAN, STRING, VOID = _primitives.values()
+
+# Type of an operation whose operator does not apply to its operands.
+# It is in no table, so every check involving it fails in turn.
+INVALID = PrimitiveType('invalid', 'invalid')
+
 # Capabilities
 _bin_ops = {
 	# Integer operations
@@ -76,23 +175,59 @@ _unary_ops = {
 	('!', 'boolean') : 'boolean',
 }
 
-# Check if a binary operator is supported. Returns the
-# result type or None (if not supported). Type checker
-# uses this function.
+# Tables of the capabilities above, indexed by operator and then by the
+# ids of the operand types
+_binary = {}
+_unary = {}
+
+for (left, op, right), result in _bin_ops.items():
+	rows = _binary.setdefault(op, [[None] * len(_types) for _ in _types])
+	rows[_primitives[left].id][_primitives[right].id] = _primitives[result]
+
+for (op, operand), result in _unary_ops.items():
+	_unary.setdefault(op, [None] * len(_types))[_primitives[operand].id] = _primitives[result]
+
+# Declared types
 
-def loockup_type(name):
+def _spelled(spelling):
+	# A type as the parser leaves it in a declaration: a primitive's
+	# name, or (element, size) for an array
+	if type(spelling) is tuple:
+		element, size = spelling
+		return array_type(_spelled(element), _size(size))
+
+	return _primitives[spelling]
+
+def _size(size):
+	if isinstance(size, Literal) and size.type == 'integer':
+		return size.value
+
+	return None
+
+def declared_type(n):
 	'''
-  Given the name of a primitive type, the appropriate "type" object is searched for.
-  Initially, types are just names, but later they can become
-  more advanced objects.
+	Type declared by the declaration or param n.
 	'''
-	if name in typenames:
-		return name
-	else:
-		return None
-		
+	if isinstance(n, FuncDecl):
+		return function_type(_spelled(n.type), map(declared_type, n.params))
+
+	if isinstance(n, (ArrayDecl, ArrayParam)):
+		return array_type(_spelled(n.type), _size(n.size))
+
+	return _spelled(n.type)
+
+# Result type of a binary or unary operator applied to operands of the
+# given types, or None if it does not apply to them. The type checker
+# uses these functions.
+
 def check_binop(op, left_type, right_type):
-	return _bin_ops.get((left_type, op, right_type))
+	try:
+		return _binary[op][left_type.id][right_type.id]
+	except (KeyError, IndexError, AttributeError):
+		return None
 
 def check_unaryop(op, operand_type):
-	return _unary_ops.get((op, operand_type))
\ No newline at end of file
+	try:
+		return _unary[op][operand_type.id]
+	except (KeyError, IndexError, AttributeError):
+		return None
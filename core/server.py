@@ -0,0 +1,113 @@
+'''
+usage: server.py [-h] [--socket PATH] [--workers N]
+
+Long-lived B-Minor compile server.
+
+The lexer, parser tables, checker and code generator are loaded once
+in a pool of worker processes. Requests arrive over a Unix domain
+socket, are compiled concurrently (at most --workers at a time) and
+the captured output is sent back to the client.
+
+Wire format: every message is a 4-byte big-endian length followed by
+a UTF-8 JSON object.
+
+  request : {"mode", "filename", "source", "options", "output", "cwd", "color", "width"}
+  response: {"output", "status", "errors"}
+'''
+import argparse
+import asyncio
+import json
+import os
+import signal
+import sys
+
+from concurrent.futures import ProcessPoolExecutor
+
+from core.client import HEADER, socket_path
+from core.worker import MODES, warm_up, compile_request
+
+async def read_message(reader):
+  size, = HEADER.unpack(await reader.readexactly(HEADER.size))
+  return json.loads(await reader.readexactly(size))
+
+def encode_message(message):
+  data = json.dumps(message).encode('utf-8')
+  return HEADER.pack(len(data)) + data
+
+class Server:
+  def __init__(self, path, workers):
+    self.path = path
+    self.pool = ProcessPoolExecutor(max_workers = workers, initializer = warm_up)
+
+  async def handle(self, reader, writer):
+    loop = asyncio.get_running_loop()
+
+    try:
+      request = await read_message(reader)
+
+      if request.get('mode') not in MODES:
+        response = {'output': f"Unknown mode {request.get('mode')!r}\n", 'status': 2}
+      else:
+        response = await loop.run_in_executor(self.pool, compile_request, request)
+
+      writer.write(encode_message(response))
+      await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionError):
+      pass
+    finally:
+      writer.close()
+
+  async def serve(self):
+    if os.path.exists(self.path):
+      os.unlink(self.path)
+
+    server = await asyncio.start_unix_server(self.handle, path = self.path)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+
+    for sig in (signal.SIGINT, signal.SIGTERM):
+      loop.add_signal_handler(sig, stop.set)
+
+    print(f"bminor-server listening on {self.path}", file = sys.stderr)
+
+    async with server:
+      await stop.wait()
+
+    self.pool.shutdown(cancel_futures = True)
+
+    if os.path.exists(self.path):
+      os.unlink(self.path)
+
+def parse_args():
+  cli = argparse.ArgumentParser(
+    prog = 'server.py',
+    description = 'Warm compile server for B-Minor programs'
+  )
+
+  cli.add_argument(
+    '--socket',
+    type = str,
+    default = socket_path(),
+    help = 'Unix socket to listen on'
+  )
+
+  cli.add_argument(
+    '--workers',
+    type = int,
+    default = os.cpu_count(),
+    help = 'Maximum number of concurrent compilations'
+  )
+
+  return cli.parse_args()
+
+def main():
+  args = parse_args()
+
+  # Workers forked after this point start with every stage imported
+  warm_up()
+
+  asyncio.run(Server(args.socket, args.workers).serve())
+
+if __name__ == '__main__':
+  main()
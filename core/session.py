@@ -0,0 +1,110 @@
+'''
+Per-compilation state.
+
+A CompilerSession owns what used to be module globals (the error
+counter and the counters that name the checker's scopes) together
+with the options and the interning pool (core.intern) of one
+compilation. The active session is kept in a context variable, so
+every thread or asyncio task can run its own compilation without
+disturbing the others. Code running outside any
+session falls back to a process-wide default session, which is what
+the single-file CLI uses.
+'''
+import contextvars
+
+from collections import Counter
+
+from core.intern import InternPool
+
+import rich
+
+from rich.console import Console
+
+class CompilerSession:
+  def __init__(self, filename = None, file = None, color = None, width = None, pool = None, **options):
+    '''
+    Create a session for one compilation. Diagnostics are printed to
+    'file' when given, otherwise to the global rich console. Sessions
+    that make up one long-running compilation can share a 'pool'. Extra
+    keyword arguments are kept in 'options' for the stages to consult.
+    '''
+    self.filename = filename
+    self.options = options
+    self.pool = pool if pool is not None else InternPool()
+    self.errors = 0
+    self.diagnostics = []
+    self.counters = Counter()
+    self.console = Console(file = file, force_terminal = color, width = width) if file is not None else None
+    self._tokens = []
+
+  def __enter__(self):
+    self._tokens.append(_current.set(self))
+    return self
+
+  def __exit__(self, *exc):
+    _current.reset(self._tokens.pop())
+
+  def print(self, *objects, **kwargs):
+    (self.console or rich.get_console()).print(*objects, **kwargs)
+
+  def error(self, message, lineno = None, error_type = None):
+    self.errors += 1
+    self.diagnostics.append((error_type, lineno, message))
+
+    self.print(f"[red][bold]{error_type + " " if error_type else ""}Error at {lineno}: [/]{message}[/]")
+
+  def clear(self):
+    self.errors = 0
+    self.diagnostics.clear()
+
+  def scope(self, kind):
+    '''
+    Return the next scope name of the given kind ('if0', 'while3', ...).
+    '''
+    name = f"{kind}{self.counters[kind]}"
+    self.counters[kind] += 1
+    return name
+
+  # == Pipeline ==
+
+  def parse(self, source):
+    from core.parser.parser import parse
+
+    with self:
+      return parse(source)
+
+  def check(self, ast):
+    from core.semantic.checker import Check
+
+    with self:
+      return Check.checker(ast)
+
+  def codegen(self, ast):
+    from core.codegen.codegen import CodeGenerator
+
+    with self:
+      cg = CodeGenerator()
+      cg.visit(ast)
+      return cg.module
+
+  def compile(self, source):
+    '''
+    Run the whole pipeline and return the LLVM module, or None if any
+    stage reported errors.
+    '''
+    ast = self.parse(source)
+
+    if self.errors:
+      return None
+
+    self.check(ast)
+
+    if self.errors:
+      return None
+
+    return self.codegen(ast)
+
+_current = contextvars.ContextVar('bminor_session', default = CompilerSession())
+
+def current_session():
+  return _current.get()
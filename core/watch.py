@@ -0,0 +1,454 @@
+'''
+Watch mode: poll source files and rebuild them incrementally.
+
+A program is split into its top-level declarations at every ';' found
+at brace depth zero (outside comments and literals). Each declaration
+is lexed and parsed on its own and cached by its source text, so an
+edit only re-parses the declarations it touched; declarations that
+merely moved get their line numbers shifted.
+
+The checker visits declarations in order against a fresh global
+symbol table, but skips every unchanged declaration whose referenced
+global symbols look the same to it as last time: its diagnostics are
+replayed and its cached symbol tables re-attached. Scope names of
+reused tables keep the numbering of the build that created them. Code
+generation reuses the IR text of every function whose declaration is
+unchanged and whose referenced names resolve to the same LLVM values
+as in the previous build. Every build of a file shares one interning
+pool, so the string constants a reused function refers to keep their
+names.
+
+Lexical or syntax errors fall back to a full build, so diagnostics
+are always exactly those a fresh compilation would print.
+
+Declarations are lexed and parsed by the lexer and parser the
+compiler's options select (see core.cli.options); tokens are always
+kept in a TokenBuffer.
+'''
+import io
+import os
+import re
+import time
+
+from collections import defaultdict
+from dataclasses import is_dataclass, fields
+
+from core.batch             import collect
+from core.intern            import InternPool
+from core.session           import CompilerSession
+from core.lexer.lexer       import new_lexer
+from core.lexer.buffer      import TokenBuffer
+from core.parser.parser     import new_parser, parse
+from core.parser.model      import *
+from core.semantic.checker  import Check
+from core.semantic.resolver import Resolver
+from core.semantic.symtab   import Symtab
+from core.codegen.codegen   import CodeGenerator, llvm_type
+
+from llvmlite    import ir
+from rich.markup import escape
+from rich        import print
+
+# Tokens that matter when looking for declaration boundaries. Comments
+# and literals use the lexer's own patterns (including its greedy
+# multiline comment) so both always agree on where tokens start.
+_boundary = re.compile(r'''
+    //.*
+  | /\*[\s\S]*\*/
+  | "([^"\\]|\\.)*"
+  | '([\x20-\x7E]|\\([abefnrtv\\'"]|0x[0-9a-fA-F]{2}))'
+  | [{};]
+''', re.VERBOSE)
+
+def split(source):
+  '''
+  Yield (offset, line, text) for every top-level declaration of
+  source. The last chunk holds whatever follows the final declaration.
+  '''
+  depth = 0
+  start = 0
+  line = 1
+
+  for m in _boundary.finditer(source):
+    tok = m.group()
+
+    if tok == '{':
+      depth += 1
+    elif tok == '}':
+      depth -= 1
+    elif tok == ';' and depth == 0:
+      text = source[start:m.end()]
+      yield start, line, text
+      line += text.count('\n')
+      start = m.end()
+
+  yield start, line, source[start:]
+
+def walk(node):
+  stack = [node]
+
+  while stack:
+    node = stack.pop()
+
+    if isinstance(node, list):
+      stack.extend(node)
+    elif is_dataclass(node):
+      yield node
+      stack.extend(values(node))
+
+_declared = {}
+
+def declares_type(cls):
+  if cls not in _declared:
+    _declared[cls] = 'type' in {f.name for f in fields(cls)}
+
+  return _declared[cls]
+
+class _Recorder(dict):
+  '''
+  Symbol dictionary that remembers which names were written and which
+  were looked up with get().
+  '''
+  def __init__(self):
+    super().__init__()
+    self.written = set()
+    self.read = set()
+
+  def __setitem__(self, key, value):
+    self.written.add(key)
+    super().__setitem__(key, value)
+
+  def get(self, key, default = None):
+    self.read.add(key)
+    return super().get(key, default)
+
+def _describe(value):
+  return None if value is None else (value.get_reference(), str(value.type))
+
+def _symbol(node):
+  '''
+  Everything the checker reads from a symbol table entry.
+  '''
+  if node is None:
+    return None
+
+  return (node.__class__.__name__, node.declared_type)
+
+def _replay(session, diagnostics, delta):
+  for error_type, lineno, message in diagnostics:
+    session.error(message, lineno + delta if isinstance(lineno, int) else lineno, error_type)
+
+class Unit:
+  '''
+  One top-level declaration and everything cached for it.
+  '''
+  def __init__(self, text, line, decl, tokens):
+    self.text = text
+    self.line = line
+    self.offset = 0
+    self.decl = decl
+    self.tokens = tokens    # TokenBuffer over text
+    self.nodes = list(walk(decl))
+    self.names = sorted({n.name for n in self.nodes if isinstance(n, (Location, FuncCall))})
+    self.globals = sorted(set(self.names) | {decl.name})
+    self.check = None  # (signature, line, diagnostics, symbol tables) of the last check
+    self.ir = None     # (signature, text, exports, string ids) of the last generated function
+
+    # Expression nodes whose 'type' is attached by the checker
+    self.untyped = [n for n in self.nodes if not declares_type(n.__class__)]
+
+  def move(self, line):
+    for n in self.nodes:
+      if getattr(n, 'lineno', None) is not None:
+        n.lineno += line - self.line
+
+    self.line = line
+
+  def reset_types(self):
+    '''
+    Drop the types the checker attached, so re-checking a reused
+    declaration starts from exactly what the parser produced.
+    '''
+    for n in self.untyped:
+      if hasattr(n, 'type'):
+        del n.type
+
+class IncrementalCompiler:
+  def __init__(self, filename, **options):
+    self.filename = filename
+    self.options = options   # session options every build is made with
+    self.units = defaultdict(list)
+    self.failed = {}     # text -> (line, diagnostics) of declarations that did not parse
+    self.pool = InternPool()
+    self.resolver = Resolver()   # one for every build, so symbol ids never repeat
+    self.env = None
+    self.last = None     # (source, ir text, diagnostics) of the previous build
+
+  def parse(self, source, stats, session = None):
+    '''
+    Return the units of source, or None if any new declaration has
+    lexical or syntax errors. The cache is only replaced on success.
+
+    When a session is given, declarations that fail are reported to it
+    and left out instead, so the rest of the program can be analyzed.
+    '''
+    pool = defaultdict(list, {text: list(units) for text, units in self.units.items()})
+    cache = defaultdict(list)
+    failed = {}
+    units = []
+
+    for offset, line, text in split(source):
+      if pool[text]:
+        unit = pool[text].pop()
+
+        if unit.line != line:
+          unit.move(line)
+
+        stats['reused'] += 1
+      elif session is not None and text in self.failed:
+        failed[text] = self.failed[text]
+        _replay(session, failed[text][1], line - failed[text][0])
+        continue
+      else:
+        # Diagnostics go to a scratch session: a failing declaration
+        # triggers a full build that reports them in source order.
+        scratch = CompilerSession(self.filename, file = io.StringIO(), pool = self.pool, **self.options)
+
+        with scratch:
+          tokens = TokenBuffer.scan(text, new_lexer(), line)
+
+          if not len(tokens) and not scratch.errors:
+            continue
+
+          try:
+            program = new_parser().parse(iter(tokens))
+          except Exception:
+            program = None
+
+        if scratch.errors or program is None or len(program.body) != 1:
+          if session is None:
+            return None
+
+          # Errors at the end of input are at the end of this declaration
+          end = line + text.rstrip().count('\n')
+          failed[text] = (line, [(t, end if l == "EOF" else l, m) for t, l, m in scratch.diagnostics])
+          _replay(session, failed[text][1], 0)
+          stats['failed'] += 1
+          continue
+
+        unit = Unit(text, line, program.body[0], tokens)
+        stats['parsed'] += 1
+
+      unit.offset = offset
+      cache[text].append(unit)
+      units.append(unit)
+
+    self.units = cache
+    self.failed = failed
+    return units
+
+  def check(self, units, session, stats):
+    '''
+    Check units in source order and return the global symbol table.
+    A unit is only visited again if its declaration is new or one of
+    the global symbols it references changed.
+    '''
+    checker = Check()
+    env = Symtab('global')
+
+    with session:
+      for unit in units:
+        decl = unit.decl
+        signature = tuple(_symbol(env.entries.get(name)) for name in unit.globals)
+
+        if unit.check and unit.check[0] == signature:
+          _, line, diagnostics, children = unit.check
+          _replay(session, diagnostics, unit.line - line)
+
+          if decl.name not in env.entries:
+            env.entries[decl.name] = decl
+
+          for child in children:
+            child.parent = env
+
+          env.children.extend(children)
+          stats['reused_check'] += 1
+          continue
+
+        unit.check = None
+        unit.reset_types()
+
+        errors = len(session.diagnostics)
+        tables = len(env.children)
+        self.resolver.resolve(decl, env)
+        decl.accept(checker, env)
+
+        unit.check = (signature, unit.line, session.diagnostics[errors:], env.children[tables:])
+        stats['checked'] += 1
+
+    return env
+
+  def codegen(self, units, stats):
+    cg = CodeGenerator()
+    cg.symbols = _Recorder()
+    cg.strings = _Recorder()
+
+    cg.emit_globals([u.decl for u in units if not isinstance(u.decl, FuncDecl)])
+
+    texts = {}
+
+    for unit in units:
+      if not isinstance(unit.decl, FuncDecl):
+        continue
+
+      decl = unit.decl
+      signature = tuple((n, _describe(cg.symbols.get(n)), _describe(cg.globals.get(n))) for n in unit.names)
+
+      if unit.ir and unit.ir[0] == signature:
+        _, texts[decl.name], exports, strings, tables = unit.ir
+
+        for key in strings:
+          cg.string(self.pool.strings[key])
+
+        for name, packed in tables:
+          cg.table(packed, name)
+
+        func = ir.Function(cg.module, llvm_type(decl.declared_type), name = decl.name)
+
+        cg.symbols.update(exports)
+        cg.symbols[decl.name] = func
+        stats['reused_ir'] += 1
+        continue
+
+      cg.symbols.written = set()
+      cg.strings.read = set()
+      known = len(cg.tables)
+      decl.accept(cg)
+
+      func = cg.symbols[decl.name]
+      exports = {k: cg.symbols[k] for k in cg.symbols.written if k != decl.name}
+      tables = [(name, packed) for name, (packed, _) in list(cg.tables.items())[known:]]
+      unit.ir = (signature, str(func), exports, cg.strings.read, tables)
+      stats['generated'] += 1
+
+    module = cg.module
+    lines = [
+      f'; ModuleID = "{module.name}"',
+      f'target triple = "{module.triple}"',
+      f'target datalayout = "{module.data_layout}"',
+      '',
+    ]
+    lines += [texts.get(v.name) or str(v) for v in module.globals.values()]
+
+    return "\n".join(lines)
+
+  def full(self, source, session):
+    with session:
+      try:
+        ast = parse(source)
+      except Exception:
+        ast = None
+
+    if session.errors:
+      return None
+
+    self.env = session.check(ast)
+
+    if session.errors:
+      return None
+
+    return str(session.codegen(ast))
+
+  def rebuild(self, source, session):
+    '''
+    Compile source reusing whatever the previous build left behind.
+    Returns (ir text or None, statistics).
+    '''
+    stats = defaultdict(int)
+    session.pool = self.pool
+
+    if self.last and self.last[0] == source:
+      for diagnostic in self.last[2]:
+        session.error(diagnostic[2], diagnostic[1], diagnostic[0])
+
+      return self.last[1], stats
+
+    text = self.build(source, session, stats)
+    self.last = (source, text, list(session.diagnostics))
+
+    return text, stats
+
+  def build(self, source, session, stats):
+    units = self.parse(source, stats)
+
+    if units is None:
+      stats['full'] = 1
+      return self.full(source, session)
+
+    self.env = self.check(units, session, stats)
+
+    if session.errors:
+      return None
+
+    with session:
+      return self.codegen(units, stats)
+
+def watch(paths, output, options = None, interval = 0.25):
+  options = options or {}
+  compilers = {}
+  seen = {}
+
+  print(f"[bold]Watching {', '.join(escape(p) for p in paths)} (Ctrl+C to stop)[/]")
+
+  try:
+    while True:
+      for path, name in collect(paths):
+        try:
+          st = os.stat(path)
+        except OSError:
+          continue
+
+        stamp = (st.st_mtime_ns, st.st_size)
+
+        if seen.get(path) == stamp:
+          continue
+
+        seen[path] = stamp
+
+        with open(path, encoding = 'utf-8') as file:
+          source = file.read()
+
+        compiler = compilers.setdefault(path, IncrementalCompiler(path, **options))
+        session = CompilerSession(path, **options)
+
+        start = time.perf_counter()
+
+        try:
+          text, stats = compiler.rebuild(source, session)
+        except Exception as err:
+          print(f"[red][bold]FAIL[/] {escape(path)}: {escape(repr(err))}[/]")
+          continue
+
+        elapsed = (time.perf_counter() - start) * 1000
+
+        if stats['full']:
+          detail = "full rebuild"
+        else:
+          detail = (f"parsed {stats['parsed']}/{stats['parsed'] + stats['reused']} decls, "
+                    f"generated {stats['generated']}/{stats['generated'] + stats['reused_ir']} functions")
+
+        if text is None:
+          print(f"[red][bold]FAIL[/] {escape(path)}[/] [dim]{elapsed:.1f} ms, {detail}[/]")
+          continue
+
+        target = os.path.join(output, os.path.splitext(name)[0] + '.ll')
+        os.makedirs(os.path.dirname(target) or '.', exist_ok = True)
+
+        with open(target, 'w', encoding = 'utf-8') as file:
+          file.write(text)
+
+        print(f"[green][bold]ok[/][/]   {escape(path)} -> [blue]{escape(target)}[/] [dim]{elapsed:.1f} ms, {detail}[/]")
+
+      time.sleep(interval)
+  except KeyboardInterrupt:
+    pass
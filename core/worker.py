@@ -0,0 +1,44 @@
+'''
+Worker-side helpers shared by the compile server and batch mode.
+Everything here runs inside a pool process and must be picklable.
+'''
+import contextlib
+import io
+import os
+import traceback
+
+import rich
+
+from core.cli     import MODES, run_mode
+from core.session import CompilerSession
+
+def warm_up():
+  '''
+  Import every compiler stage so SLY tables, llvmlite and graphviz are
+  ready before the first request reaches this process.
+  '''
+  import core.lexer.lexer
+  import core.parser.parser
+  import core.parser.dot_render
+  import core.semantic.checker
+  import core.codegen.codegen
+
+def compile_request(request):
+  '''
+  Run one request inside a worker, capturing everything it prints.
+  '''
+  buffer = io.StringIO()
+  status = 0
+  session = CompilerSession(request['filename'], **request.get('options', {}))
+
+  with contextlib.redirect_stdout(buffer), session:
+    rich.reconfigure(force_terminal = request.get('color', False), width = request.get('width'))
+
+    try:
+      os.chdir(request.get('cwd') or os.getcwd())
+      run_mode(request['mode'], request['filename'], request['source'], request.get('output'))
+    except Exception:
+      buffer.write(traceback.format_exc())
+      status = 1
+
+  return {'output': buffer.getvalue(), 'status': status, 'errors': session.errors}
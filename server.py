@@ -0,0 +1,4 @@
+import core.server as server
+
+if __name__ == "__main__":
+  server.main()
\ No newline at end of file